@@ -43,11 +43,16 @@ setup(
         "requests",
         "phonenumbers",
         "email-validator",
+        "contextvars; python_version < '3.7'",
     ],
     extras_require={
+        "async": [
+            "aiohttp >= 3.8.0",
+        ],
         "dev": [
             "pytest >= 8.2.2",
             "requests >= 2.0.0",
+            "aiohttp >= 3.8.0",
             "types-requests >= 2.2.2",
             "flake8 >= 7.1.0",
             "ruff >= 0.4.10",
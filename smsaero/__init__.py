@@ -12,67 +12,99 @@ This module also provides several exception classes for handling errors that may
 
 Classes:
     SmsAero: Provides methods for interacting with the SMS Aero API.
+    AsyncSmsAero: Asyncio counterpart of SmsAero, available from `smsaero.aio` (requires `aiohttp`).
     SmsAeroException: The base class for all exceptions raised by this module.
     SmsAeroConnectionException: Raised when a connection error occurs.
     SmsAeroNoMoneyException: Raised when there is not enough money on the account to perform an operation.
 """
 
-from typing import Union, List, Dict, Optional
+from typing import Any, Union, Iterable, Iterator, List, Dict, Optional
 
 import datetime
-import logging
 import time
 
-from urllib.parse import urljoin, quote_plus, urlparse
+from urllib.parse import urlparse
 
 
-from email_validator import validate_email, EmailNotValidError
-from requests.models import Response
-from requests import exceptions
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE
 
-import phonenumbers
 import requests
 
+from smsaero.bulk import BulkResult, send_chunks
+from smsaero.cache import ResponseCache
+from smsaero.cost import CostEstimate, EstimateMixin
+from smsaero.errors import SmsAeroException, SmsAeroConnectionException, SmsAeroNoMoneyException
+from smsaero.export import CsvExporter, FileExporter, NdjsonExporter
+from smsaero.gates import GateHealth, ProtocolMemory
+from smsaero.hedging import HedgePolicy
+from smsaero.idempotency import IdempotencyStore
+from smsaero.options import ClientOptions
+from smsaero.pagination import PaginationMixin
+from smsaero.ratelimit import FileTokenBucket, RateLimiter, TokenBucket
+from smsaero.response import RequestResult
+from smsaero.retry import RetryBudget, RetryPolicy
+from smsaero.segments import TextAnalysis
+from smsaero.status import StatusEvent, StatusTracker
+from smsaero.transport import Transport
+from smsaero.validation import (
+    INVALID,
+    UNPARSABLE,
+    PhoneValidationCache,
+    Reject,
+    ValidationReport,
+    number_verdict,
+    validate_numbers,
+)
+
 
 __all__ = [
     "SmsAero",
+    "BulkResult",
+    "CostEstimate",
+    "CsvExporter",
+    "FileExporter",
+    "ClientOptions",
+    "GateHealth",
+    "HedgePolicy",
+    "IdempotencyStore",
+    "NdjsonExporter",
+    "PhoneValidationCache",
+    "RateLimiter",
+    "TokenBucket",
+    "FileTokenBucket",
+    "ProtocolMemory",
+    "Reject",
+    "RequestResult",
+    "ResponseCache",
+    "RetryBudget",
+    "RetryPolicy",
+    "StatusEvent",
+    "StatusTracker",
+    "TextAnalysis",
+    "ValidationReport",
     "SmsAeroException",
     "SmsAeroConnectionException",
     "SmsAeroNoMoneyException",
 ]
 
 
-class SmsAeroException(Exception):
-    """Super class of all SmsAero Errors."""
-
-
-class SmsAeroConnectionException(SmsAeroException):
-    """A Connection error occurred."""
-
-
-class SmsAeroNoMoneyException(SmsAeroException):
-    """No money on the account."""
-
-
-logger = logging.getLogger(__name__)
-
-
-class SmsAero:
+class SmsAero(EstimateMixin, PaginationMixin, Transport):
     """
     The SmsAero class provides methods for interacting with the SmsAero API.
 
     This class provides methods for sending SMS messages, checking the status of sent messages,
     managing contacts, managing groups, managing the blacklist, and more.
+
+    An instance is safe to share between threads and asyncio tasks: the last response is kept
+    per thread (per task), so `get_response()` and `get_last_result()` never return another caller's data.
     """
 
-    # List of available gateway URLs
-    GATE_URLS = [
-        "@gate.smsaero.ru/v2/",
-        "@gate.smsaero.org/v2/",
-        "@gate.smsaero.net/v2/",
-    ]
     # Default signature for the messages
     SIGNATURE = "SMS Aero"
+    # Tariff channel of the default signature
+    SIGNATURE_CHANNEL = "FREE SIGN"
+    # Default number of recipients sent in one request by send_sms_bulk
+    BULK_CHUNK_SIZE = 50
 
     def __init__(
         self,
@@ -83,6 +115,12 @@ class SmsAero:
         allow_phone_validation: bool = True,
         url_gate: Optional[str] = None,
         test_mode: bool = False,
+        session: Optional[requests.Session] = None,
+        pool_connections: int = DEFAULT_POOLSIZE,
+        pool_maxsize: int = DEFAULT_POOLSIZE,
+        pool_block: bool = DEFAULT_POOLBLOCK,
+        keep_alive: bool = True,
+        options: Optional[ClientOptions] = None,
     ):
         """
         Initializes the SmsAero class.
@@ -95,16 +133,17 @@ class SmsAero:
         allow_phone_validation (bool, optional): Whether to allow phone number validation.
         url_gate (str, optional): The gateway URL. For example, '@local.host/v2/'.
         test_mode (bool, optional): Whether to enable test mode.
+        session (requests.Session, optional): A pre-built session to use as is. The pool options below are ignored.
+        pool_connections (int, optional): The number of connection pools to cache per gate.
+        pool_maxsize (int, optional): The maximum number of connections kept open per gate.
+            Set it to the number of threads sharing the instance.
+        pool_block (bool, optional): Whether to wait for a free connection when the pool is full.
+        keep_alive (bool, optional): Whether to reuse connections between requests (with TCP keep-alive probes).
+        options (ClientOptions, optional): The optional collaborators of the client, such as the gate health tracker.
+            May be shared by several clients.
         """
-        self.__user = email
-        self.__akey = api_key
-        self.__gate = url_gate
         self.__sign = signature
-        self.__sess = requests.session()
-        self.__sess.headers.update({"User-Agent": "SAPythonClient/3.1.0"})
-        self.__time = timeout
         self.__pnum = allow_phone_validation
-        self.__resp: Optional[Response] = None
         self.__test = test_mode
 
         self.init_validate(
@@ -117,43 +156,18 @@ class SmsAero:
             test_mode,
         )
 
-        self.check_and_format_user_gate()
-
-    def check_and_format_user_gate(self):
-        """
-        This method checks and formats the `self.__gate` attribute to ensure it starts with '@' and ends with '/v2/'.
-        If `self.__gate` does not start with '@', it prepends '@' to it.
-        If `self.__gate` does not end with '/v2/', it appends '/v2/' to it.
-        The method does not return any value but modifies the `self.__gate` attribute in-place.
-        """
-
-        if not self.__gate:
-            return
-
-        parsed_url = urlparse(self.__gate)
-
-        if not parsed_url.path.startswith("@"):
-            parsed_url = parsed_url._replace(path="@" + parsed_url.path)
-        if parsed_url.path.endswith("/v2"):
-            parsed_url = parsed_url._replace(path=parsed_url.path + "/")
-        elif not parsed_url.path.endswith("/v2/"):
-            parsed_url = parsed_url._replace(path=parsed_url.path + "/v2/")
-
-        self.__gate = parsed_url.geturl()
-
-    def get_gate(self):
-        """
-        Returns the gateway URL.
-        """
-        return self.__gate
-
-    def get_gate_urls(self) -> List[str]:
-        """
-        Returns a list of gateway URLs for sending requests.
-        If a gateway URL was specified during initialization, it returns a list with only that URL.
-        Otherwise, it returns a list of all available gateway URLs.
-        """
-        return [self.__gate] if self.__gate else self.GATE_URLS
+        super().__init__(
+            email,
+            api_key,
+            url_gate,
+            timeout,
+            session,
+            pool_connections,
+            pool_maxsize,
+            pool_block,
+            keep_alive,
+            options,
+        )
 
     @staticmethod
     def fill_nums(number: Union[int, List[int]]) -> Dict:
@@ -166,98 +180,6 @@ class SmsAero:
             raise ValueError("Number cannot be empty")
         return {"numbers" if isinstance(number, list) else "number": number}
 
-    @staticmethod
-    def check_response(response: Response) -> Dict:
-        """
-        Checks the response from the server.
-
-        If the response contains an error message, it raises an appropriate exception.
-        If the response is successful, it returns the data from the response.
-
-        Parameters:
-        response (Response): The response from the server.
-
-        Returns:
-        Dict: The data from the response if the request was successful.
-        """
-        try:
-            content = response.json()
-        except ValueError as e:
-            raise SmsAeroException("Unexpected format is received") from e
-
-        if content.get("result") == "no credits":
-            raise SmsAeroNoMoneyException(content["result"])
-        if content.get("result") == "reject":
-            raise SmsAeroException(content["reason"])
-        if not content.get("success"):
-            raise SmsAeroException(content.get("message") or "Unknown error")
-
-        return content.get("data")
-
-    def build_url(self, proto: str, selector: str, gate: str, page: Optional[int] = None) -> str:
-        """
-        Builds a URL for the request.
-
-        Parameters:
-        proto (str): The protocol for the URL (e.g., 'http' or 'https').
-        selector (str): The selector for the URL.
-        gate (str): The gateway for the URL.
-        page (Optional[int], optional): The page number for the URL.
-
-        Returns:
-        str: The built URL.
-        """
-        url = urljoin(f"{proto}://{quote_plus(self.__user)}:{self.__akey}{gate}", selector)
-        if page:
-            url = urljoin(url, f"?page={int(page)}")
-        return url
-
-    def get_response(self) -> Dict:
-        """
-        Retrieves the response from the server.
-
-        Returns:
-        Dict: The server's response in JSON format.
-        """
-        if not self.__resp:
-            raise SmsAeroException("No response received")
-        return self.__resp.json()
-
-    def request(
-        self,
-        selector: str,
-        data: Optional[Dict] = None,
-        page: Optional[int] = None,
-        proto: str = "https",
-    ) -> Dict:
-        """
-        Sends a request to the server.
-
-        Parameters:
-        selector (str): The selector for the URL.
-        data (Dict[str, Any], optional): The data to be sent in the request. If not specified, no data will be sent.
-        page (int, optional): The page number for the URL. If not specified, no page number will be added to the URL.
-        proto (str, optional): The protocol for the URL (e.g., 'http' or 'https'). Default is 'https'.
-
-        Returns:
-        Dict: The data from the response if the request was successful.
-        """
-        for gate in self.get_gate_urls():
-            try:
-                url = self.build_url(proto, selector, gate, page)
-                logger.debug("Sending request to %s with data %s", url, data)
-                self.__resp = self.__sess.post(url, json=data or {}, timeout=self.__time)
-                logger.debug("Received response: %s", self.__resp.json())
-                return self.check_response(self.__resp)
-            except exceptions.SSLError:
-                # switch to http when got ssl error
-                proto = "http"
-                continue
-            except requests.RequestException:
-                # next gate
-                continue
-        raise SmsAeroConnectionException
-
     def enable_test_mode(self):
         """
         Enables test mode.
@@ -299,16 +221,21 @@ class SmsAero:
         date_to_send: Optional[datetime.datetime] = None,
         callback_url: Optional[str] = None,
         callback_format: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Dict:
         """
         Sends a message to the specified number or numbers.
 
+        With an idempotency store, the same message sent again to the same numbers within the window of the store
+        is not sent: the response of the first send is returned. Pass a different `idempotency_key` to send it again.
+
         Parameters:
         number (Union[int, List[int]]): The recipient's phone number or a list of phone numbers.
         text (str): The text of the message.
         sign (str, optional): The signature for the message.
         date_to_send (datetime, optional): The date and time when the message should be sent.
         callback_url (str, optional): The URL to which the server will send a request when the message status changes.
+        idempotency_key (str, optional): Tells apart the sends of the same message, e.g. the ID of an order.
 
         Returns:
         Dict: The server's response in JSON format.
@@ -334,7 +261,51 @@ class SmsAero:
             data["callbackFormat"] = callback_format
         if date_to_send:
             data.update({"dateSend": int(time.mktime(date_to_send.timetuple()))})
-        return self.request("sms/testsend" if self.__test else "sms/send", data)
+        return self.send_once("sms/testsend" if self.__test else "sms/send", data, idempotency_key)
+
+    def send_sms_bulk(
+        self,
+        numbers: Iterable[int],
+        text: str,
+        sign: Optional[str] = None,
+        date_to_send: Optional[datetime.datetime] = None,
+        callback_url: Optional[str] = None,
+        callback_format: Optional[str] = None,
+        chunk_size: int = BULK_CHUNK_SIZE,
+        concurrency: int = 4,
+    ) -> Iterator[BulkResult]:
+        """
+        Sends a message to a large number of recipients.
+
+        The numbers are read lazily, split into chunks of `chunk_size` and every chunk is sent by `send_sms`
+        in a pool of `concurrency` threads sharing this instance's session. Errors of a chunk do not stop the
+        others: they are reported in the chunk's result.
+
+        Parameters:
+        numbers (Iterable[int]): The recipients' phone numbers. May be a generator.
+        text (str): The text of the message.
+        sign (str, optional): The signature for the message.
+        date_to_send (datetime, optional): The date and time when the message should be sent.
+        callback_url (str, optional): The URL to which the server will send a request when the message status changes.
+        callback_format (str, optional): The format of the callback request.
+        chunk_size (int, optional): The maximum number of recipients in one request.
+        concurrency (int, optional): The maximum number of requests in flight.
+
+        Returns:
+        Iterator[BulkResult]: The result of every chunk, in completion order.
+
+        Example:
+        for chunk in smsaero.send_sms_bulk(numbers, "Hello, World!"):
+            if not chunk.ok:
+                logger.error("Chunk %d failed: %s", chunk.position, chunk.error)
+        """
+        self.send_sms_bulk_validate(text, sign, date_to_send, callback_url, chunk_size, concurrency)
+        return send_chunks(
+            lambda chunk: self.send_sms(chunk, text, sign, date_to_send, callback_url, callback_format),
+            numbers,
+            chunk_size,
+            concurrency,
+        )
 
     def sms_status(self, sms_id: int) -> Dict:
         """
@@ -914,7 +885,7 @@ class SmsAero:
         """
         return self.request("number/operator", self.fill_nums(number))
 
-    def viber_send(
+    def viber_send(  # pylint: disable=too-many-locals
         self,
         sign: str,
         channel: str,
@@ -929,10 +900,14 @@ class SmsAero:
         channel_sms: Optional[str] = None,
         text_sms: Optional[str] = None,
         price_sms: Optional[int] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Dict:
         """
         Sends a Viber message.
 
+        With an idempotency store, the same message sent again to the same recipients within the window
+        of the store is not sent, as in `send_sms`.
+
         Parameters:
         sign (str): The signature of the message.
         channel (str): The channel of the message.
@@ -947,6 +922,7 @@ class SmsAero:
         channel_sms (str, optional): The channel of the SMS fallback.
         text_sms (str, optional): The text of the SMS fallback.
         price_sms (int, optional): The price of the SMS fallback.
+        idempotency_key (str, optional): Tells apart the sends of the same message.
 
         Returns:
         Dict: The server's response in JSON format.
@@ -1004,7 +980,7 @@ class SmsAero:
         }
         if number:
             data.update(self.fill_nums(number))
-        return self.request("viber/send", data)
+        return self.send_once("viber/send", data, idempotency_key)
 
     def viber_sign_list(self) -> Dict:
         """
@@ -1113,6 +1089,7 @@ class SmsAero:
         code: int,
         sign: Optional[str] = None,
         text: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Dict:
         """
         Sends a Telegram code to the specified number or numbers.
@@ -1122,6 +1099,7 @@ class SmsAero:
         code (int): The Telegram code (4 to 8 digits).
         sign (str, optional): The SMS sender name.
         text (str, optional): The SMS message text.
+        idempotency_key (str, optional): Tells apart the sends of the same code, with an idempotency store.
 
         When using text and sign parameters, if the Telegram code is not delivered,
         an SMS will be sent with the specified values.
@@ -1150,7 +1128,7 @@ class SmsAero:
             data["sign"] = sign
         if text:
             data["text"] = text
-        return self.request("telegram/send", data)
+        return self.send_once("telegram/send", data, idempotency_key)
 
     def telegram_status(self, telegram_id: int) -> Dict:
         """
@@ -1293,38 +1271,63 @@ class SmsAero:
 
         # Validate phone numbers by phonenumbers library only if it is allowed
         if self.__pnum:
-            self.phonenumbers_validate(number)
+            self.phonenumbers_validate(number, self.get_options().get_phone_cache())
 
     @staticmethod
-    def phonenumbers_validate(number: Union[int, List[int]]) -> None:
+    def phonenumbers_validate(
+        number: Union[int, List[int]], cache: Optional[PhoneValidationCache] = None
+    ) -> None:
         """
         Validates the phone number or a list of phone numbers using the phonenumbers library.
 
-        This function checks if the number is of type int or a list of ints and if it is a valid phone number.
-        If number is not a valid number, it raises an appropriate exception.
+        This method checks if the phone number or each phone number in the list is a valid phone number.
 
         Parameters:
         number (Union[int, List[int]]): The phone number or a list of phone numbers to validate.
+        cache (PhoneValidationCache, optional): The cache of the verdicts. By default every number is parsed.
 
         Raises:
         TypeError: If the number is not of type int or a list of ints.
         ValueError: If the number is not a valid phone number.
         """
+        verdict = cache.verdict if cache is not None else number_verdict
         if isinstance(number, list):
             for num in number:
-                try:
-                    parsed_number = phonenumbers.parse("+" + str(num), None)
-                    if not phonenumbers.is_valid_number(parsed_number):
-                        raise ValueError("Each number in the list must be a valid phone number")
-                except phonenumbers.phonenumberutil.NumberParseException as e:
-                    raise ValueError("Each number in the list must be a valid phone number!") from e
+                result = verdict(num)
+                if result == UNPARSABLE:
+                    raise ValueError("Each number in the list must be a valid phone number!")
+                if result == INVALID:
+                    raise ValueError("Each number in the list must be a valid phone number")
         else:
-            try:
-                parsed_number = phonenumbers.parse("+" + str(number), None)
-                if not phonenumbers.is_valid_number(parsed_number):
-                    raise ValueError("Number must be a valid phone number")
-            except phonenumbers.phonenumberutil.NumberParseException as e:
-                raise ValueError("Number must be a valid phone number!") from e
+            result = verdict(number)
+            if result == UNPARSABLE:
+                raise ValueError("Number must be a valid phone number!")
+            if result == INVALID:
+                raise ValueError("Number must be a valid phone number")
+
+    def validate_numbers(self, numbers: Iterable[Any], processes: int = 1) -> ValidationReport:
+        """
+        Validates a list of phone numbers in a single pass, e.g. to clean a recipient list before sending.
+
+        Unlike `phone_validation()` it does not stop at the first bad number but reports all of them.
+        The numbers are checked with the phonenumbers library only if phone validation is allowed,
+        through the phone cache if there is one.
+
+        Parameters:
+        numbers (Iterable[Any]): The phone numbers.
+        processes (int, optional): The number of worker processes for large lists. 1 validates in this process.
+
+        Returns:
+        ValidationReport: The valid numbers and the (position, number, reason) of the rejected ones, in input order.
+        """
+        cache = self.get_options().get_phone_cache()
+        if not self.__pnum:
+            verdict = None
+        elif cache is not None and processes == 1:
+            verdict = cache.verdict
+        else:
+            verdict = number_verdict
+        return validate_numbers(numbers, verdict, processes)
 
     @staticmethod
     def page_validate(page: Optional[int]) -> None:
@@ -1365,6 +1368,65 @@ class SmsAero:
         date_to_send (datetime, optional): The date to send the message.
         callback_url (str, optional): The callback URL for the message status.
 
+        Raises:
+        TypeError: If any of the parameters have an incorrect type.
+        ValueError: If any of the parameters have an incorrect value.
+        """
+        self.sms_params_validate(text, sign, date_to_send, callback_url)
+        self.phone_validation(number)
+
+    def send_sms_bulk_validate(
+        self,
+        text: str,
+        sign: Optional[str] = None,
+        date_to_send: Optional[datetime.datetime] = None,
+        callback_url: Optional[str] = None,
+        chunk_size: int = BULK_CHUNK_SIZE,
+        concurrency: int = 4,
+    ) -> None:
+        """
+        Validates the parameters for the send_sms_bulk method.
+
+        The numbers are validated later, chunk by chunk, while they are sent.
+
+        Parameters:
+        text (str): The text of the message.
+        sign (str, optional): The signature of the message.
+        date_to_send (datetime, optional): The date to send the message.
+        callback_url (str, optional): The callback URL for the message status.
+        chunk_size (int, optional): The maximum number of recipients in one request.
+        concurrency (int, optional): The maximum number of requests in flight.
+
+        Raises:
+        TypeError: If any of the parameters have an incorrect type.
+        ValueError: If any of the parameters have an incorrect value.
+        """
+        self.sms_params_validate(text, sign, date_to_send, callback_url)
+        if not isinstance(chunk_size, int):
+            raise TypeError("chunk_size must be an integer")
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be greater than 0")
+        if not isinstance(concurrency, int):
+            raise TypeError("concurrency must be an integer")
+        if concurrency <= 0:
+            raise ValueError("concurrency must be greater than 0")
+
+    @staticmethod
+    def sms_params_validate(
+        text: str,
+        sign: Optional[str] = None,
+        date_to_send: Optional[datetime.datetime] = None,
+        callback_url: Optional[str] = None,
+    ) -> None:
+        """
+        Validates the message parameters shared by send_sms and send_sms_bulk.
+
+        Parameters:
+        text (str): The text of the message.
+        sign (str, optional): The signature of the message.
+        date_to_send (datetime, optional): The date to send the message.
+        callback_url (str, optional): The callback URL for the message status.
+
         Raises:
         TypeError: If any of the parameters have an incorrect type.
         ValueError: If any of the parameters have an incorrect value.
@@ -1384,7 +1446,20 @@ class SmsAero:
             if not all([parsed_url.scheme, parsed_url.netloc, parsed_url.path]):
                 raise ValueError("callback_url must be a valid URL")
 
-        self.phone_validation(number)
+    def estimate_cost_validate(self, text: str, sign: Optional[str] = None, channel: Optional[str] = None) -> str:
+        """
+        Validates the parameters of estimate_cost and returns the tariff channel.
+
+        Raises:
+        TypeError: If any of the parameters have an incorrect type.
+        ValueError: If the channel of a custom signature is not given.
+        """
+        self.sms_params_validate(text, sign)
+        if channel is not None and not isinstance(channel, str):
+            raise TypeError("channel must be a string")
+        if channel is None and (sign or self.__sign) != self.SIGNATURE:
+            raise ValueError("channel must be given for a signature other than the default one")
+        return channel or self.SIGNATURE_CHANNEL
 
     def sms_list_validate(
         self,
@@ -1673,6 +1748,9 @@ class SmsAero:
         ValueError: If any of the parameters are invalid.
         TypeError: If any of the parameters have an incorrect type.
         """
+        # imported on first use to keep `import smsaero` fast
+        from email_validator import validate_email, EmailNotValidError  # pylint: disable=import-outside-toplevel
+
         try:
             validate_email(email)
         except EmailNotValidError as e:
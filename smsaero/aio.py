@@ -0,0 +1,435 @@
+"""
+This module provides the AsyncSmsAero class, an asyncio client for the SMS Aero API.
+
+AsyncSmsAero exposes the same methods as SmsAero, but every API call is a coroutine sent over a pooled
+`aiohttp` connection, so a single event loop can drive thousands of concurrent requests.
+
+Example:
+    async with AsyncSmsAero(email="your_email", api_key="your_api_key") as smsaero:
+        await smsaero.send_sms(number=70000000000, text="Hello, World!")
+
+The `aiohttp` package is an optional dependency: `pip install smsaero-api[async]`.
+"""
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, cast
+
+import asyncio
+import datetime
+import logging
+import time
+
+from smsaero import SmsAero, SmsAeroConnectionException
+from smsaero.bulk import BulkResult, async_send_chunks
+from smsaero.cost import CostEstimate, estimate_cost
+from smsaero.export import FileExporter
+from smsaero.hedging import HedgePolicy, async_hedge
+from smsaero.pagination import async_fetch_pages, async_iter_records, deliver_page
+from smsaero.response import Attempt, RequestResult
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None  # type: ignore[assignment]
+
+
+__all__ = [
+    "AsyncSmsAero",
+]
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSmsAero(SmsAero):
+    """
+    The AsyncSmsAero class provides coroutine versions of all SmsAero methods.
+
+    Validation is done exactly as in SmsAero, only the transport differs: every method that talks to the API
+    returns an awaitable. The underlying `aiohttp.ClientSession` is created on first use and must be closed
+    with `close()` or by using the client as an asynchronous context manager.
+    """
+
+    # pylint: disable=invalid-overridden-method
+
+    def __init__(self, email: str, api_key: str, *args, connection_limit: int = 100, **kwargs):
+        """
+        Initializes the AsyncSmsAero class.
+
+        Parameters:
+        email (str): The user's email.
+        api_key (str): The user's API key.
+        connection_limit (int, optional): The maximum number of simultaneous connections in the pool.
+
+        All other parameters are the same as for SmsAero.
+        """
+        if aiohttp is None:  # pragma: no cover
+            raise ImportError("AsyncSmsAero requires aiohttp: pip install smsaero-api[async]")
+        if not isinstance(connection_limit, int):
+            raise TypeError("Connection limit must be an integer.")
+        if connection_limit <= 0:
+            raise ValueError("Connection limit must be a positive integer.")
+
+        super().__init__(email, api_key, *args, **kwargs)
+        self.__limit = connection_limit
+        self.__sess: Optional[aiohttp.ClientSession] = None
+
+    def __enter__(self) -> "AsyncSmsAero":
+        raise TypeError("Use async with instead")
+
+    async def __aenter__(self) -> "AsyncSmsAero":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def get_session(self) -> "aiohttp.ClientSession":  # type: ignore[override]
+        """
+        Returns the pooled HTTP session, creating it on first use.
+        """
+        if self.__sess is None or self.__sess.closed:
+            self.__sess = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.__limit),
+                headers={"User-Agent": self.USER_AGENT},
+                timeout=aiohttp.ClientTimeout(total=self.get_timeout()),
+            )
+        return self.__sess
+
+    async def close(self) -> None:  # type: ignore[override]
+        """
+        Closes the pooled HTTP session.
+        """
+        if self.__sess is not None:
+            await self.__sess.close()
+            self.__sess = None
+
+    async def request(  # type: ignore[override]
+        self,
+        selector: str,
+        data: Optional[Dict] = None,
+        page: Optional[int] = None,
+        proto: str = "https",
+    ) -> Dict:
+        """
+        Sends a request to the server.
+
+        The gates are tried in the same order and with the same failover rules as in `SmsAero.request()`.
+        The rate limiter waits without blocking the event loop; a FileTokenBucket briefly locks its file.
+
+        Parameters:
+        selector (str): The selector for the URL.
+        data (Dict[str, Any], optional): The data to be sent in the request. If not specified, no data will be sent.
+        page (int, optional): The page number for the URL. If not specified, no page number will be added to the URL.
+        proto (str, optional): The protocol for the URL (e.g., 'http' or 'https'). Default is 'https'.
+
+        Returns:
+        Dict: The data from the response if the request was successful.
+        """
+        cache = self.get_response_cache()
+        if cache is not None:
+            return await cache.async_fetch(selector, data, page, lambda: self.send_request(selector, data, page, proto))
+        return await self.send_request(selector, data, page, proto)
+
+    async def send_request(  # type: ignore[override]
+        self,
+        selector: str,
+        data: Optional[Dict] = None,
+        page: Optional[int] = None,
+        proto: str = "https",
+    ) -> Dict:
+        """
+        Sends a request to the server, bypassing the response cache. See `request()`.
+        """
+        delay = self.rate_limit_delay(selector)
+        if delay:
+            await asyncio.sleep(delay)
+        policy = self.get_hedge_policy()
+        if policy is not None and policy.is_hedged(selector):
+            result = await self.send_hedged(policy, selector, data, page, proto)
+            policy.record_latency(result.latency)
+        else:
+            result = await self.send_with_failover(selector, data, page, proto)
+        self.get_gate_health().record_success(result.gate, result.latency)
+        logger.debug("Received response: %s", result.content)
+        self.store_result(result)
+        return self.check_content(result.content)
+
+    async def send_to_gate(  # type: ignore[override]
+        self, gate: str, proto: str, selector: str, data: Optional[Dict], page: Optional[int]
+    ) -> RequestResult:
+        """
+        Sends a request to one gate and decodes the response.
+
+        Raises:
+        aiohttp.ClientError, asyncio.TimeoutError: If the gate did not answer with JSON.
+        """
+        url = self.build_url(self.gate_protocol(gate, proto), selector, gate, page)
+        logger.debug("Sending request to %s with data %s", url, data)
+        started = time.monotonic()
+        async with self.get_session().post(url, json=data or {}) as response:
+            try:
+                content = await response.json(content_type=None)
+            except ValueError as e:
+                # a gate failure like a refused connection, as in the sync client, so the next gate is asked
+                raise aiohttp.ClientPayloadError("Unexpected format is received") from e
+        return RequestResult(content, response.status, gate, time.monotonic() - started)
+
+    async def send_with_failover(  # type: ignore[override]
+        self, selector: str, data: Optional[Dict], page: Optional[int], proto: str = "https"
+    ) -> RequestResult:
+        """
+        Sends a request to the gates one by one until one of them answers, as allowed by the retry policy.
+
+        Raises:
+        SmsAeroConnectionException: If the attempts are exhausted. The failed attempts are in its `attempts`.
+        """
+        health = self.get_gate_health()
+        retry = self.get_retry_policy()
+        retry.record_request()
+        gate_urls = self.get_gate_urls()
+        attempts: List[Attempt] = []
+        for gate, wait in retry.plan(gate_urls, health.order):
+            if wait:
+                await asyncio.sleep(wait)
+            started = time.monotonic()
+            try:
+                return await self.send_to_gate(gate, proto, selector, data, page)
+            except aiohttp.ClientSSLError as e:
+                # switch to http when got ssl error
+                self.record_ssl_error(gate)
+                proto = "http"
+                error: Exception = e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # next gate
+                health.record_failure(gate)
+                error = e
+            attempts.append(Attempt(gate, error, time.monotonic() - started))
+            if not retry.should_retry(len(attempts), len(gate_urls), error, selector, self.is_replay_safe(error)):
+                break
+        raise SmsAeroConnectionException(attempts=attempts)
+
+    def is_replay_safe(self, error: Exception) -> bool:
+        """
+        Returns True if a write which failed with the error may be sent again: the connection to the gate failed,
+        or the sends are deduplicated by the idempotency store.
+        """
+        # aiohttp < 3.10 has no separate error for a connect timeout
+        connect_timeout = getattr(aiohttp, "ConnectionTimeoutError", aiohttp.ClientConnectorError)
+        connect_errors = (aiohttp.ClientConnectorError, connect_timeout)
+        return self.get_idempotency_store() is not None or isinstance(error, connect_errors)
+
+    async def send_hedged(  # type: ignore[override]
+        self, policy: HedgePolicy, selector: str, data: Optional[Dict], page: Optional[int], proto: str = "https"
+    ) -> RequestResult:
+        """
+        Sends a request to the first gate and to the next gate as well if the first one is slow or fails.
+        The slower requests are cancelled once a gate answers. Every gate is asked at most once.
+
+        Raises:
+        SmsAeroConnectionException: If every gate failed. The failed attempts are in its `attempts`.
+        """
+        health = self.get_gate_health()
+        protos = [proto]
+        attempts: List[Attempt] = []
+
+        async def attempt(gate: str) -> RequestResult:
+            started = time.monotonic()
+            try:
+                return await self.send_to_gate(gate, protos[-1], selector, data, page)
+            except aiohttp.ClientSSLError as e:
+                # the gates asked after this one use http
+                self.record_ssl_error(gate)
+                protos.append("http")
+                attempts.append(Attempt(gate, e, time.monotonic() - started))
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                health.record_failure(gate)
+                attempts.append(Attempt(gate, e, time.monotonic() - started))
+                raise
+
+        gates = health.order(self.get_gate_urls())
+        try:
+            gate, result, hedged = await async_hedge(
+                attempt,
+                gates,
+                policy.get_delay(),
+                policy.get_max_hedges(),
+                (aiohttp.ClientError, asyncio.TimeoutError),
+            )
+        except LookupError as e:
+            raise SmsAeroConnectionException(attempts=attempts) from e
+        if hedged:
+            policy.record_hedge(gate != gates[0])
+        return cast(RequestResult, result)
+
+    async def is_authorized(self) -> bool:  # type: ignore[override]
+        """
+        Checks if the user is authorized.
+
+        Returns:
+        bool: True if the user is authorized or SmsAeroException if the user is not authorized.
+        """
+        return await self.request("auth") is None
+
+    async def group_delete(self, group_id: int) -> bool:  # type: ignore[override]
+        """
+        Deletes a group from the SmsAero service.
+
+        Parameters:
+        group_id (int): The ID of the group to be deleted.
+
+        Returns:
+        bool: True if deletion was successful, SmsAeroException if deletion was unsuccessful.
+        """
+        return await self.request("group/delete", {"id": int(group_id)}) is None
+
+    async def group_delete_all(self) -> bool:  # type: ignore[override]
+        """
+        Deletes all group from the SmsAero service.
+
+        Returns:
+        bool: True if deletion was successful, SmsAeroException if deletion was unsuccessful.
+        """
+        return await self.request("group/delete-all") is None
+
+    async def contact_delete(self, contact_id: int) -> bool:  # type: ignore[override]
+        """
+        Deletes a contact from the user's account.
+
+        Parameters:
+        contact_id (int): The ID of the contact to be deleted.
+
+        Returns:
+        bool: True if deletion was successful, SmsAeroException if deletion was unsuccessful.
+        """
+        return await self.request("contact/delete", {"id": int(contact_id)}) is None
+
+    async def contact_delete_all(self) -> bool:  # type: ignore[override]
+        """
+        Deletes all contacts from the user's account.
+
+        Returns:
+        bool: True if deletion was successful, SmsAeroException if deletion was unsuccessful.
+        """
+        return await self.request("contact/delete-all") is None
+
+    async def blacklist_delete(self, blacklist_id: int) -> bool:  # type: ignore[override]
+        """
+        Deletes a number from the blacklist.
+
+        Parameters:
+        blacklist_id (int): The ID of the number to be deleted from the blacklist.
+
+        Returns:
+        bool: True if deletion was successful, SmsAeroException if deletion was unsuccessful.
+        """
+        return await self.request("blacklist/delete", {"id": int(blacklist_id)}) is None
+
+    async def estimate_cost(  # type: ignore[override]
+        self,
+        numbers: Iterable[int],
+        text: str,
+        sign: Optional[str] = None,
+        channel: Optional[str] = None,
+        tariffs: Optional[Dict] = None,
+    ) -> CostEstimate:
+        """
+        Estimates the cost of sending a message to the numbers, without sending it.
+
+        Works as `SmsAero.estimate_cost`; only the tariffs are awaited.
+        """
+        channel = self.estimate_cost_validate(text, sign, channel)
+        return estimate_cost(numbers, text, await self.request("tariffs") if tariffs is None else tariffs, channel)
+
+    async def send_once(  # type: ignore[override]
+        self, selector: str, data: Dict, idempotency_key: Optional[str] = None
+    ) -> Dict:
+        """
+        Sends a request unless the idempotency store remembers the result of the same send.
+
+        Works as `SmsAero.send_once`; a send waiting for the same send in flight does not block the event loop.
+        """
+        store = self.get_idempotency_store()
+        if store is None:
+            return await self.request(selector, data)
+        return await store.async_run(
+            self.get_send_key(selector, data, idempotency_key), lambda: self.request(selector, data)
+        )
+
+    def paginate(  # type: ignore[override]
+        self, fetch: Callable[[int], Awaitable[Dict]], prefetch: bool = False
+    ) -> AsyncIterator[Dict]:
+        """
+        Iterates over the records of every page of a list method.
+
+        Works as `SmsAero.paginate`, but the next page is prefetched by an asyncio task,
+        and so the `iter_*` methods return asynchronous iterators.
+
+        Example:
+        async for message in smsaero.iter_sms_list(prefetch=True):
+            ...
+        """
+        return async_iter_records(fetch, prefetch)
+
+    async def export(  # type: ignore[override]
+        self,
+        fetch: Callable[[int], Awaitable[Dict]],
+        sink: Callable[[int, List[Dict]], Any],
+        concurrency: int = 8,
+        start: int = 1,
+    ) -> int:
+        """
+        Exports every page of a list method.
+
+        Works as `SmsAero.export`, but the pages are requested by up to `concurrency` asyncio tasks.
+        The sink is a plain function called in the event loop.
+        """
+        self.export_validate(concurrency, start)
+        exported = 0
+        async for number, page in async_fetch_pages(fetch, concurrency, start):
+            exported += deliver_page(sink, number, page)
+        return exported
+
+    async def export_to_file(  # type: ignore[override]
+        self, fetch: Callable[[int], Awaitable[Dict]], exporter: FileExporter, concurrency: int = 8
+    ) -> int:
+        """
+        Exports every page of a list method to a file, resuming from the exporter's checkpoint.
+
+        Works as `SmsAero.export_to_file`; the file is written from the event loop.
+        """
+        self.export_to_file_validate(exporter)
+        with exporter:
+            return await self.export(fetch, exporter.write_page, concurrency, exporter.get_next_page())
+
+    def send_sms_bulk(  # type: ignore[override]
+        self,
+        numbers: Iterable[int],
+        text: str,
+        sign: Optional[str] = None,
+        date_to_send: Optional[datetime.datetime] = None,
+        callback_url: Optional[str] = None,
+        callback_format: Optional[str] = None,
+        chunk_size: int = SmsAero.BULK_CHUNK_SIZE,
+        concurrency: int = 4,
+    ) -> AsyncIterator[BulkResult]:
+        """
+        Sends a message to a large number of recipients.
+
+        Works as `SmsAero.send_sms_bulk`, but the chunks are sent as asyncio tasks.
+
+        Returns:
+        AsyncIterator[BulkResult]: The result of every chunk, in completion order.
+
+        Example:
+        async for chunk in smsaero.send_sms_bulk(numbers, "Hello, World!", concurrency=50):
+            ...
+        """
+        self.send_sms_bulk_validate(text, sign, date_to_send, callback_url, chunk_size, concurrency)
+        return async_send_chunks(
+            lambda chunk: cast(
+                Awaitable[Dict], self.send_sms(chunk, text, sign, date_to_send, callback_url, callback_format)
+            ),
+            numbers,
+            chunk_size,
+            concurrency,
+        )
@@ -0,0 +1,153 @@
+"""
+This module provides helpers for sending one message to a large list of recipients.
+
+The recipients are consumed lazily from any iterable, split into chunks and every chunk is sent
+by a separate request. Requests run concurrently and the results are yielded as soon as they complete,
+so neither the recipient list nor the results have to be held in memory.
+"""
+
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set
+
+import itertools
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+
+from smsaero.errors import SmsAeroException
+
+
+__all__ = [
+    "BulkResult",
+    "iter_chunks",
+    "send_chunks",
+    "async_send_chunks",
+]
+
+
+# Errors which are reported in the chunk result instead of aborting the whole bulk send
+BULK_ERRORS = (SmsAeroException, TypeError, ValueError)
+
+
+class BulkResult(NamedTuple):
+    """
+    The outcome of sending one chunk of recipients.
+
+    Attributes:
+    position (int): The position of the chunk in the recipient stream, starting from 0.
+    numbers (List[int]): The recipients of the chunk.
+    result (Dict, optional): The server's response if the chunk was sent.
+    error (Exception, optional): The error raised while validating or sending the chunk.
+    """
+
+    position: int
+    numbers: List[int]
+    result: Optional[Dict]
+    error: Optional[Exception]
+
+    @property
+    def ok(self) -> bool:
+        """
+        Returns True if the chunk was sent successfully.
+        """
+        return self.error is None
+
+
+def iter_chunks(numbers: Iterable[int], size: int) -> Iterator[List[int]]:
+    """
+    Splits an iterable of numbers into lists of at most `size` items without materializing it.
+    """
+    iterator = iter(numbers)
+    chunk = list(itertools.islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, size))
+
+
+def _send_chunk(send: Callable[[List[int]], Dict], position: int, chunk: List[int]) -> BulkResult:
+    try:
+        return BulkResult(position, chunk, send(chunk), None)
+    except BULK_ERRORS as e:
+        return BulkResult(position, chunk, None, e)
+
+
+def send_chunks(
+    send: Callable[[List[int]], Dict],
+    numbers: Iterable[int],
+    chunk_size: int,
+    concurrency: int,
+) -> Iterator[BulkResult]:
+    """
+    Sends chunks of numbers with a pool of threads and yields the results in completion order.
+
+    At most `2 * concurrency` chunks are queued at any time, so the numbers are read only as fast as they are sent.
+
+    Parameters:
+    send (Callable): Sends one chunk and returns the server's response.
+    numbers (Iterable[int]): The recipients.
+    chunk_size (int): The maximum number of recipients in one request.
+    concurrency (int): The maximum number of requests in flight.
+
+    Returns:
+    Iterator[BulkResult]: The result of every chunk.
+    """
+    pending: Set[Future] = set()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        try:
+            for position, chunk in enumerate(iter_chunks(numbers, chunk_size)):
+                pending.add(executor.submit(_send_chunk, send, position, chunk))
+                if len(pending) >= 2 * concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in as_completed(pending):
+                yield future.result()
+        finally:
+            # do not start queued chunks when the consumer stops early
+            for future in pending:
+                future.cancel()
+
+
+async def _async_send_chunk(
+    send: Callable[[List[int]], Awaitable[Dict]], position: int, chunk: List[int]
+) -> BulkResult:
+    try:
+        return BulkResult(position, chunk, await send(chunk), None)
+    except BULK_ERRORS as e:
+        return BulkResult(position, chunk, None, e)
+
+
+async def async_send_chunks(
+    send: Callable[[List[int]], Awaitable[Dict]],
+    numbers: Iterable[int],
+    chunk_size: int,
+    concurrency: int,
+) -> AsyncIterator[BulkResult]:
+    """
+    Sends chunks of numbers as asyncio tasks and yields the results in completion order.
+
+    Parameters:
+    send (Callable): Coroutine function that sends one chunk and returns the server's response.
+    numbers (Iterable[int]): The recipients.
+    chunk_size (int): The maximum number of recipients in one request.
+    concurrency (int): The maximum number of requests in flight.
+
+    Returns:
+    AsyncIterator[BulkResult]: The result of every chunk.
+    """
+    # asyncio is imported only by the async helpers, as it is slow to import
+    import asyncio  # pylint: disable=import-outside-toplevel
+
+    pending: Set[asyncio.Future] = set()
+    try:
+        for position, chunk in enumerate(iter_chunks(numbers, chunk_size)):
+            pending.add(asyncio.ensure_future(_async_send_chunk(send, position, chunk)))
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,307 @@
+"""
+This module provides the ResponseCache class, a cache of the responses of the slowly changing reads.
+
+The tariffs, the signatures, the cards and the balance change rarely compared to how often they are read,
+so their responses are kept for a time to live per selector instead of being requested every time.
+A response older than its time to live but still within the stale window is returned at once while it is
+requested again in the background. The writes which change a cached read, such as `balance/add`,
+drop its responses.
+"""
+
+from typing import Any, Awaitable, Callable, Collection, Dict, Mapping, NamedTuple, Optional, Set, Tuple
+
+import collections
+import copy
+import json
+import logging
+import threading
+import time
+
+from concurrent.futures import Future
+from types import MappingProxyType
+
+
+__all__ = [
+    "DEFAULT_TTLS",
+    "INVALIDATIONS",
+    "ResponseCacheInfo",
+    "ResponseCache",
+]
+
+
+logger = logging.getLogger(__name__)
+
+
+# The time to live in seconds of the responses of every cached selector
+DEFAULT_TTLS: Mapping[str, float] = MappingProxyType(
+    {
+        "tariffs": 3600.0,
+        "sign/list": 600.0,
+        "viber/sign/list": 600.0,
+        "cards": 600.0,
+        "balance": 30.0,
+    }
+)
+
+# The cached selectors whose responses are dropped after a request to a selector
+INVALIDATIONS: Mapping[str, Collection[str]] = MappingProxyType({"balance/add": ("balance",)})
+
+# The actions of a cache lookup
+_HIT = "hit"
+_REFRESH = "refresh"
+_WAIT = "wait"
+_SEND = "send"
+
+# The future returned with a hit, for which there is nothing to wait for
+_NO_FUTURE: Future = Future()
+
+
+class ResponseCacheInfo(NamedTuple):
+    """
+    The statistics of a ResponseCache.
+
+    Attributes:
+    hits (int): The number of responses returned from the cache while fresh.
+    stale_hits (int): The number of stale responses returned while they were requested again.
+    misses (int): The number of requests sent because no usable response was cached.
+    refreshes (int): The number of requests sent in the background to refresh a stale response.
+    size (int): The number of responses currently kept.
+    """
+
+    hits: int
+    stale_hits: int
+    misses: int
+    refreshes: int
+    size: int
+
+
+class ResponseCache:  # pylint: disable=too-many-instance-attributes
+    """
+    Keeps the responses of the selectors with a time to live, keyed by the selector and the request data.
+
+    Concurrent misses of the same response send a single request. A response is copied when it is cached
+    and when it is returned, so the callers may modify it. An instance is thread-safe and may be shared by
+    several clients of the same account.
+
+    A cached balance does not account for the messages sent since it was requested:
+    lower the time to live of 'balance' or call `invalidate('balance')` where it matters.
+
+    Example:
+        cache = ResponseCache({"tariffs": 3600, "balance": 10}, stale=60)
+        smsaero = SmsAero(email, api_key, options=ClientOptions(response_cache=cache))
+    """
+
+    def __init__(
+        self,
+        ttls: Mapping[str, float] = DEFAULT_TTLS,
+        stale: float = 60.0,
+        maxsize: int = 1024,
+        invalidations: Mapping[str, Collection[str]] = INVALIDATIONS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initializes the ResponseCache class.
+
+        Parameters:
+        ttls (Mapping[str, float], optional): The time to live in seconds of the responses of every cached selector.
+            The other selectors are not cached.
+        stale (float, optional): The time in seconds after its time to live during which a response is still
+            returned while it is requested again in the background. 0 disables the background refresh.
+        maxsize (int, optional): The maximum number of responses kept, the least recently used first out.
+        invalidations (Mapping[str, Collection[str]], optional): The cached selectors whose responses are dropped
+            after a request to a selector, e.g. {'balance/add': ['balance']}.
+        clock (Callable[[], float], optional): A monotonic clock in seconds.
+        """
+        if any(ttl <= 0 for ttl in ttls.values()):
+            raise ValueError("ttls must be positive")
+        if stale < 0:
+            raise ValueError("stale must not be negative")
+        if not isinstance(maxsize, int) or maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer")
+        self.__ttls = dict(ttls)
+        self.__stale = stale
+        self.__maxsize = maxsize
+        self.__invalidations = {selector: frozenset(cached) for selector, cached in invalidations.items()}
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__entries: "collections.OrderedDict[str, Tuple[str, float, Any]]" = collections.OrderedDict()
+        self.__in_flight: Dict[str, Future] = {}
+        # bumped by every invalidation, so a response requested before it is not cached after it
+        self.__generation = 0
+        self.__tasks: Set[Any] = set()
+        self.__hits = 0
+        self.__stale_hits = 0
+        self.__misses = 0
+        self.__refreshes = 0
+
+    def is_cached(self, selector: str) -> bool:
+        """
+        Returns True if the responses of the selector are cached.
+        """
+        return selector in self.__ttls
+
+    def get_ttl(self, selector: str) -> Optional[float]:
+        """
+        Returns the time to live in seconds of the responses of the selector, or None if they are not cached.
+        """
+        return self.__ttls.get(selector)
+
+    @staticmethod
+    def make_key(selector: str, data: Optional[Dict] = None, page: Optional[int] = None) -> str:
+        """
+        Returns the cache key of a request.
+        """
+        return json.dumps([selector, data or {}, page], sort_keys=True, default=str)
+
+    def get_info(self) -> ResponseCacheInfo:
+        """
+        Returns the hit, miss and refresh counters and the size of the cache.
+        """
+        with self.__lock:
+            return ResponseCacheInfo(
+                self.__hits, self.__stale_hits, self.__misses, self.__refreshes, len(self.__entries)
+            )
+
+    def invalidate(self, selector: Optional[str] = None) -> None:
+        """
+        Drops the cached responses of a selector, or all of them.
+        """
+        with self.__lock:
+            self.__generation += 1
+            if selector is None:
+                self.__entries.clear()
+                return
+            for key in [key for key, entry in self.__entries.items() if entry[0] == selector]:
+                del self.__entries[key]
+
+    def __invalidate_after(self, selector: str) -> None:
+        for cached in self.__invalidations.get(selector, ()):
+            self.invalidate(cached)
+
+    def __claim(self, selector: str, key: str) -> Tuple[str, Any, Future, int]:
+        # what to do for a request: the action, the cached response, the future of the request and the generation
+        with self.__lock:
+            now = self.__clock()
+            entry = self.__entries.get(key)
+            future = self.__in_flight.get(key)
+            if entry is not None and now - entry[1] < self.__ttls[selector] + self.__stale:
+                self.__entries.move_to_end(key)
+                if now - entry[1] < self.__ttls[selector]:
+                    self.__hits += 1
+                    return _HIT, entry[2], _NO_FUTURE, self.__generation
+                self.__stale_hits += 1
+                if future is not None:
+                    # already being refreshed
+                    return _HIT, entry[2], future, self.__generation
+                self.__refreshes += 1
+                future = self.__in_flight[key] = Future()
+                return _REFRESH, entry[2], future, self.__generation
+            if future is not None:
+                return _WAIT, None, future, self.__generation
+            self.__misses += 1
+            future = self.__in_flight[key] = Future()
+            return _SEND, None, future, self.__generation
+
+    def __store(self, selector: str, key: str, response: Any, generation: int) -> None:
+        with self.__lock:
+            if generation != self.__generation:
+                return
+            self.__entries[key] = (selector, self.__clock(), copy.deepcopy(response))
+            self.__entries.move_to_end(key)
+            if len(self.__entries) > self.__maxsize:
+                self.__entries.popitem(last=False)
+
+    def __release(self, key: str, future: Future) -> None:
+        with self.__lock:
+            del self.__in_flight[key]
+        future.set_result(None)
+
+    def __refresh(self, selector: str, key: str, send: Callable[[], Dict], future: Future, generation: int) -> None:
+        try:
+            self.__store(selector, key, send(), generation)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # the stale response is kept, and the next stale hit tries again
+            logger.warning("Refreshing %s failed", selector, exc_info=True)
+        finally:
+            self.__release(key, future)
+
+    def fetch(self, selector: str, data: Optional[Dict], page: Optional[int], send: Callable[[], Dict]) -> Dict:
+        """
+        Returns the cached response of a request, or sends it with `send()` and caches the response.
+
+        The requests to the selectors which are not cached are sent as they are, and drop the cached
+        responses they invalidate.
+        """
+        if selector not in self.__ttls:
+            response = send()
+            self.__invalidate_after(selector)
+            return response
+        key = self.make_key(selector, data, page)
+        while True:
+            action, cached, future, generation = self.__claim(selector, key)
+            if action == _HIT:
+                return copy.deepcopy(cached)
+            if action == _REFRESH:
+                threading.Thread(
+                    target=self.__refresh,
+                    args=(selector, key, send, future, generation),
+                    name="smsaero-cache-refresh",
+                    daemon=True,
+                ).start()
+                return copy.deepcopy(cached)
+            if action == _WAIT:
+                # the response of the request in flight, or a request of our own if it failed
+                future.result()
+                continue
+            try:
+                response = send()
+                self.__store(selector, key, response, generation)
+            finally:
+                self.__release(key, future)
+            return response
+
+    async def __async_refresh(
+        self, selector: str, key: str, send: Callable[[], Awaitable[Dict]], future: Future, generation: int
+    ) -> None:
+        try:
+            self.__store(selector, key, await send(), generation)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.warning("Refreshing %s failed", selector, exc_info=True)
+        finally:
+            self.__release(key, future)
+
+    async def async_fetch(
+        self, selector: str, data: Optional[Dict], page: Optional[int], send: Callable[[], Awaitable[Dict]]
+    ) -> Dict:
+        """
+        Returns the cached response of a request, or sends it by awaiting `send()` and caches the response.
+
+        Works as `fetch()`; a stale response is refreshed by an asyncio task.
+        """
+        # imported on first use to keep `import smsaero` fast
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        if selector not in self.__ttls:
+            response = await send()
+            self.__invalidate_after(selector)
+            return response
+        key = self.make_key(selector, data, page)
+        while True:
+            action, cached, future, generation = self.__claim(selector, key)
+            if action == _HIT:
+                return copy.deepcopy(cached)
+            if action == _REFRESH:
+                # the task is referenced until it is done, so it is not garbage collected
+                task = asyncio.ensure_future(self.__async_refresh(selector, key, send, future, generation))
+                self.__tasks.add(task)
+                task.add_done_callback(self.__tasks.discard)
+                return copy.deepcopy(cached)
+            if action == _WAIT:
+                await asyncio.wrap_future(future)
+                continue
+            try:
+                response = await send()
+                self.__store(selector, key, response, generation)
+            finally:
+                self.__release(key, future)
+            return response
@@ -0,0 +1,283 @@
+"""
+This module provides the CallbackReceiver class, the receiving side of the `callback_url` of `send_sms`.
+
+SMS Aero reports every change of the status of a message to the callback URL, either as a JSON body,
+as a form body or in the query string of the URL, depending on the `callback_format`. The receiver is
+a small threaded HTTP server which accepts all of them, drops the reports received twice and passes
+the others to a handler or a queue, so the statuses do not have to be polled.
+"""
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import collections
+import json
+import logging
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+__all__ = [
+    "DeliveryReport",
+    "parse_callback",
+    "CallbackReceiver",
+]
+
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryReport(NamedTuple):
+    """
+    A status of a message reported to the callback URL.
+
+    Attributes:
+    sms_id (int): The ID of the message.
+    status (int): The status, as in `sms_status`.
+    extend_status (str): The status in words, e.g. 'delivery'.
+    data (Dict): Every field of the report.
+    """
+
+    sms_id: int
+    status: int
+    extend_status: str
+    data: Dict
+
+
+def _report(data: Any) -> DeliveryReport:
+    if not isinstance(data, dict):
+        raise ValueError("A report must be an object")
+    return DeliveryReport(int(data["id"]), int(data["status"]), str(data.get("extendStatus", "")), data)
+
+
+def parse_callback(body: bytes, content_type: str = "", query: str = "") -> List[DeliveryReport]:
+    """
+    Parses the delivery reports of a callback request in any of its formats.
+
+    Parameters:
+    body (bytes): The body of the request, empty for a GET request.
+    content_type (str, optional): The Content-Type header.
+    query (str, optional): The query string of the URL.
+
+    Returns:
+    List[DeliveryReport]: The reports. A request may carry one report or a list of them.
+
+    Raises:
+    ValueError: If the request is not a delivery report.
+    """
+    text = body.decode("utf-8").strip()
+    if "json" in content_type or text.startswith(("{", "[")):
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}") from e
+        # a single report, a list of reports or the reports keyed by their position
+        if isinstance(data, dict) and "id" not in data:
+            data = list(data.values())
+        try:
+            return [_report(item) for item in data] if isinstance(data, list) else [_report(data)]
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid report: {e!r}") from e
+    fields = dict(parse_qsl(text or query, keep_blank_values=True))
+    try:
+        return [_report(fields)]
+    except KeyError as e:
+        raise ValueError(f"Invalid report: {e!r}") from e
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """A report in the query string."""
+        self.__receive(b"")
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """A report in the body."""
+        self.__receive(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+
+    def __receive(self, body: bytes) -> None:
+        url = urlsplit(self.path)
+        if url.path != self.server.receiver.get_path():
+            self.__answer(404, b"Not Found")
+            return
+        try:
+            reports = parse_callback(body, self.headers.get("Content-Type", ""), url.query)
+        except ValueError as e:
+            logger.warning("Invalid callback: %s", e)
+            self.__answer(400, b"Bad Request")
+            return
+        try:
+            for report in reports:
+                self.server.receiver.dispatch(report)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # answered with an error, so the report is sent again
+            logger.exception("Callback handler failed")
+            self.__answer(500, b"Internal Server Error")
+            return
+        self.__answer(200, b"OK")
+
+    def __answer(self, code: int, body: bytes) -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+        logger.debug(format, *args)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Any, receiver: "CallbackReceiver"):
+        self.receiver = receiver
+        super().__init__(address, _Handler)
+
+
+class CallbackReceiver:  # pylint: disable=too-many-instance-attributes
+    """
+    An HTTP server receiving the delivery reports of SMS Aero.
+
+    Every request is served by its own thread. A report is passed to `handler` or put into `queue`
+    once per message and status: the reports SMS Aero sends again are answered but not dispatched.
+    A report whose handler raises is answered with an error and not remembered, so it can be sent again.
+
+    Example:
+        with CallbackReceiver(lambda report: print(report.sms_id, report.extend_status), port=8080) as receiver:
+            smsaero.send_sms(79031234567, "Hello, World!", callback_url="https://example.com:8080/")
+            ...
+    """
+
+    def __init__(
+        self,
+        handler: Optional[Callable[[DeliveryReport], Any]] = None,
+        queue: Any = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        path: str = "/",
+        dedupe_size: int = 100_000,
+    ):
+        """
+        Initializes the CallbackReceiver class.
+
+        Parameters:
+        handler (Callable[[DeliveryReport], Any], optional): Called for every new report, from the request thread.
+        queue (queue.Queue, optional): Receives every new report with `put()`, e.g. for a pool of consumers.
+        host (str, optional): The address to listen on. '0.0.0.0' to accept the requests of other hosts.
+        port (int, optional): The port to listen on. 0 picks a free port, see `get_port()`.
+        path (str, optional): The path of the callback URL; the requests to other paths are answered with 404.
+        dedupe_size (int, optional): The number of recent reports remembered to drop the repeated ones.
+        """
+        if handler is None and queue is None:
+            raise ValueError("handler or queue must be given")
+        if not isinstance(dedupe_size, int) or dedupe_size <= 0:
+            raise ValueError("dedupe_size must be a positive integer")
+        self.__handler = handler
+        self.__queue = queue
+        self.__path = path
+        self.__dedupe_size = dedupe_size
+        self.__seen: "collections.OrderedDict[Any, None]" = collections.OrderedDict()
+        self.__lock = threading.Lock()
+        self.__received = 0
+        self.__duplicates = 0
+        self.__server = _Server((host, port), self)
+        self.__thread: Optional[threading.Thread] = None
+        # set while `serve_forever()` runs, in whatever thread called it
+        self.__serving = False
+
+    def get_path(self) -> str:
+        """
+        Returns the path of the callback URL.
+        """
+        return self.__path
+
+    def get_port(self) -> int:
+        """
+        Returns the port the receiver listens on.
+        """
+        return self.__server.server_address[1]
+
+    def get_received(self) -> int:
+        """
+        Returns the number of reports received, including the duplicates.
+        """
+        return self.__received
+
+    def get_duplicates(self) -> int:
+        """
+        Returns the number of reports received again and dropped.
+        """
+        return self.__duplicates
+
+    def dispatch(self, report: DeliveryReport) -> bool:
+        """
+        Passes a report to the handler or the queue unless it was already dispatched.
+
+        Returns:
+        bool: False if the report is a duplicate.
+        """
+        key = (report.sms_id, report.status)
+        with self.__lock:
+            self.__received += 1
+            if key in self.__seen:
+                self.__duplicates += 1
+                self.__seen.move_to_end(key)
+                return False
+            # remembered before dispatching, so a copy received meanwhile by another thread is dropped
+            self.__seen[key] = None
+            if len(self.__seen) > self.__dedupe_size:
+                self.__seen.popitem(last=False)
+        try:
+            if self.__handler is not None:
+                self.__handler(report)
+            if self.__queue is not None:
+                self.__queue.put(report)
+        except BaseException:
+            with self.__lock:
+                self.__seen.pop(key, None)
+            raise
+        return True
+
+    def serve_forever(self) -> None:
+        """
+        Serves the requests in the calling thread until `stop()` is called.
+        """
+        with self.__lock:
+            self.__serving = True
+        try:
+            self.__server.serve_forever()
+        finally:
+            with self.__lock:
+                self.__serving = False
+
+    def start(self) -> "CallbackReceiver":
+        """
+        Serves the requests in a background thread.
+        """
+        self.__thread = threading.Thread(target=self.serve_forever, name="smsaero-callbacks", daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops serving and closes the socket.
+        """
+        with self.__lock:
+            serving = self.__serving
+        if serving or self.__thread is not None:
+            # waits for the loop of `serve_forever()` to end, whether it runs in our thread or the caller's
+            self.__server.shutdown()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        self.__server.server_close()
+
+    def __enter__(self) -> "CallbackReceiver":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,247 @@
+"""
+This module estimates the cost of a message locally, from the tariffs of the account.
+
+The price of a message is the price of one part for the operator of the recipient, times the number of parts
+of the text. The operators are found from the number ranges of the phonenumbers carrier data, which do not know
+about the numbers ported to another operator, so the estimate may differ slightly from the billed cost.
+"""
+
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, cast
+
+import collections
+import functools
+
+from decimal import Decimal
+
+from smsaero.segments import TextAnalysis, analyze_text, count_segments
+
+
+__all__ = [
+    "OTHER_OPERATOR",
+    "CostEstimate",
+    "number_operator_key",
+    "estimate_cost",
+    "EstimateMixin",
+]
+
+
+# The tariff of the operators without a tariff of their own
+OTHER_OPERATOR = "OTHER"
+
+# The longest prefix of the carrier data of Russia, in digits
+_MAX_PREFIX = 8
+# The last digits of an 11-digit number, which do not decide its operator
+_TAIL = 10 ** (11 - _MAX_PREFIX)
+# The prefixes of the 11-digit numbers of +7
+_RUSSIAN_MIN, _RUSSIAN_MAX = 7 * 10 ** (_MAX_PREFIX - 1), 8 * 10 ** (_MAX_PREFIX - 1)
+
+
+class CostEstimate(NamedTuple):
+    """
+    The estimated cost of a message.
+
+    Attributes:
+    encoding (str): The encoding of the text, GSM-7 or UCS-2.
+    segments (int): The number of parts of the text, each one billed.
+    recipients (int): The number of recipients.
+    cost (Decimal): The estimated cost of the priced recipients.
+    operators (Dict[str, int]): The number of recipients of every operator tariff, e.g. {'MTS': 10, 'OTHER': 2}.
+    unpriced (int): The number of recipients outside Russia, or of an operator with no tariff in the channel.
+    """
+
+    encoding: str
+    segments: int
+    recipients: int
+    cost: Decimal
+    operators: Dict[str, int]
+    unpriced: int
+
+
+@functools.lru_cache(maxsize=1)
+def _get_carriers() -> List[Dict[int, str]]:
+    # the operators of the number ranges of Russia by the length of their prefix, keyed by the prefix
+    # imported on first use, as the carrier data is large
+    from phonenumbers.carrierdata import CARRIER_DATA  # pylint: disable=import-outside-toplevel
+
+    tables: List[Dict[int, str]] = [{} for _ in range(_MAX_PREFIX + 1)]
+    for prefix, names in CARRIER_DATA.items():
+        if prefix.startswith("7") and len(prefix) <= _MAX_PREFIX:
+            tables[len(prefix)][int(prefix)] = names.get("en", "").upper().replace(" ", "") or OTHER_OPERATOR
+    return tables
+
+
+@functools.lru_cache(maxsize=1)
+def _get_split_ranges() -> FrozenSet[int]:
+    # the ranges of 10,000 numbers which are split between the prefixes of the full length
+    return frozenset(prefix // 10 for prefix in _get_carriers()[_MAX_PREFIX])
+
+
+def _is_russian(prefix: int) -> bool:
+    # the first 8 digits of an 11-digit number starting with 7, but not 76 and 77 which are Kazakhstan
+    return _RUSSIAN_MIN <= prefix < _RUSSIAN_MAX and prefix // 10**6 not in (76, 77)
+
+
+def _prefix(number: Any) -> Optional[int]:
+    if isinstance(number, str) and number.isdigit():
+        number = int(number)
+    if not isinstance(number, int):
+        return None
+    return number // _TAIL if _is_russian(number // _TAIL) else None
+
+
+def _count_prefixes(numbers: Iterable[Any]) -> Dict[Optional[int], int]:
+    # the numbers counted by their first 8 digits, which decide their operator; None for the other numbers
+    numbers = numbers if isinstance(numbers, (list, tuple)) else list(numbers)
+    # The numbers are counted by ranges of 10,000 first: there are few of them and the integers are divided in C.
+    # int.__rfloordiv__ answers NotImplemented for the other types.
+    ranges: Dict[Any, int] = collections.Counter(map((_TAIL * 10).__rfloordiv__, numbers))
+    if NotImplemented in ranges:
+        return collections.Counter(map(_prefix, numbers))
+    split = _get_split_ranges()
+    prefixes: Dict[Optional[int], int] = collections.Counter()
+    for prefix, count in ranges.items():
+        if prefix not in split:
+            prefixes[prefix * 10 if _is_russian(prefix * 10) else None] += count
+    if split.intersection(ranges):
+        prefixes.update(number // _TAIL for number in numbers if number // (_TAIL * 10) in split)
+    return prefixes
+
+
+def _resolve(prefixes: Dict[int, int]) -> Dict[str, int]:
+    # the counts of the prefixes summed by operator, looking up the longest prefixes of the carrier data first
+    tables = _get_carriers()
+    operators: Dict[str, int] = collections.Counter()
+    for length in range(_MAX_PREFIX, 0, -1):
+        table = tables[length]
+        shorter: Dict[int, int] = collections.Counter()
+        for prefix, count in prefixes.items():
+            operator = table.get(prefix)
+            if operator is None:
+                shorter[prefix // 10] += count
+            else:
+                operators[operator] += count
+        prefixes = shorter
+    if prefixes:
+        operators[OTHER_OPERATOR] += sum(prefixes.values())
+    return operators
+
+
+def number_operator_key(number: Any) -> Optional[str]:
+    """
+    Returns the operator of a Russian number as named in the tariffs, e.g. 'MEGAFON', or None for other numbers.
+
+    The operator is the one the number range was allocated to; 'OTHER' if the range is not known.
+    """
+    prefix = _prefix(number)
+    return None if prefix is None else next(iter(_resolve({prefix: 1})))
+
+
+def estimate_cost(numbers: Iterable[Any], text: str, tariffs: Mapping[str, Any], channel: str) -> CostEstimate:
+    """
+    Estimates the cost of sending a text to the numbers, without any request.
+
+    The numbers are grouped by prefix and then by operator, so the cost of a large list is a handful
+    of multiplications.
+
+    Parameters:
+    numbers (Iterable[Any]): The phone numbers. May be a generator.
+    text (str): The text of the message.
+    tariffs (Mapping[str, Any]): The response of `SmsAero.tariffs()`.
+    channel (str): The channel of the tariffs, e.g. 'FREE SIGN'.
+
+    Returns:
+    CostEstimate: The cost and its breakdown.
+
+    Raises:
+    ValueError: If the tariffs have no such channel.
+    """
+    prices = tariffs.get(channel)
+    if not isinstance(prices, Mapping):
+        raise ValueError(f"No tariffs for channel {channel!r}; the channels are {', '.join(sorted(tariffs))}")
+    info = count_segments(text)
+    prefixes = _count_prefixes(numbers)
+    unpriced = prefixes.pop(None, 0)
+    cost = Decimal(0)
+    operators: Dict[str, int] = {}
+    for operator, count in _resolve(cast(Dict[int, int], prefixes)).items():
+        key = operator if operator in prices else OTHER_OPERATOR
+        if key not in prices:
+            unpriced += count
+            continue
+        operators[key] = operators.get(key, 0) + count
+        cost += Decimal(str(prices[key])) * count
+    return CostEstimate(
+        info.encoding, info.segments, sum(operators.values()) + unpriced, cost * info.segments, operators, unpriced
+    )
+
+
+class EstimateMixin:
+    """
+    Adds `estimate_cost()` and `analyze_text()` to SmsAero: the cost and the parts of a message
+    found locally, without sending it.
+    """
+
+    tariffs: Callable[[], Dict]
+    estimate_cost_validate: Callable[..., str]
+
+    def estimate_cost(
+        self,
+        numbers: Iterable[int],
+        text: str,
+        sign: Optional[str] = None,
+        channel: Optional[str] = None,
+        tariffs: Optional[Dict] = None,
+    ) -> CostEstimate:
+        """
+        Estimates the cost of sending a message to the numbers, without sending it.
+
+        The cost is the number of parts of the text times the tariff of the operator of every recipient.
+        The operators are found locally, so a list of any size costs a single `tariffs` request at most,
+        and none when the tariffs are given or cached by the response cache.
+
+        Parameters:
+        numbers (Iterable[int]): The recipients' phone numbers. May be a generator.
+        text (str): The text of the message.
+        sign (str, optional): The signature for the message.
+        channel (str, optional): The tariff channel of the signature, e.g. 'INFO'.
+            Defaults to 'FREE SIGN' for the default signature and must be given for the other ones.
+        tariffs (Dict, optional): The response of `tariffs()`. By default it is requested.
+
+        Returns:
+        CostEstimate: The cost, the encoding and the number of parts of the text, and the recipients per operator.
+
+        Example:
+        estimate = smsaero.estimate_cost(numbers, "Hello, World!")
+        print(estimate.cost, estimate.segments)
+        """
+        channel = self.estimate_cost_validate(text, sign, channel)
+        return estimate_cost(numbers, text, self.tariffs() if tariffs is None else tariffs, channel)
+
+    @staticmethod
+    def analyze_text(text: str, suggest: bool = False) -> TextAnalysis:
+        """
+        Analyzes how a message text is encoded and into how many billed parts it is split.
+
+        A text with a single character out of the GSM-7 alphabet, such as a Cyrillic letter, is sent in UCS-2
+        with 70 characters per part instead of 160. With `suggest` a transliterated text is returned as well
+        when it is sent in fewer parts.
+
+        Parameters:
+        text (str): The text of the message.
+        suggest (bool, optional): Whether to suggest a transliterated text.
+
+        Returns:
+        TextAnalysis: The encoding, the number of parts and their boundaries, the extension table characters,
+            the characters which make the text UCS-2 and the suggested text.
+
+        Raises:
+        TypeError: If the text is not a string.
+
+        Example:
+        analysis = smsaero.analyze_text(text, suggest=True)
+        if analysis.suggestion is not None:
+            text = analysis.suggestion
+        """
+        if not isinstance(text, str):
+            raise TypeError("text must be a string")
+        return analyze_text(text, suggest)
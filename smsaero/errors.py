@@ -0,0 +1,37 @@
+"""
+This module provides the exception classes raised by the SmsAero client.
+"""
+
+from typing import Iterable, List
+
+from smsaero.response import Attempt
+
+
+__all__ = [
+    "SmsAeroException",
+    "SmsAeroConnectionException",
+    "SmsAeroNoMoneyException",
+]
+
+
+class SmsAeroException(Exception):
+    """Super class of all SmsAero Errors."""
+
+
+class SmsAeroConnectionException(SmsAeroException):
+    """
+    A Connection error occurred.
+
+    Attributes:
+    attempts (List[Attempt]): The failed attempts, in the order they were made.
+    """
+
+    def __init__(self, *args, attempts: Iterable[Attempt] = ()):
+        self.attempts: List[Attempt] = list(attempts)
+        if not args and self.attempts:
+            args = ("; ".join(f"{attempt.gate}: {attempt.error!r}" for attempt in self.attempts),)
+        super().__init__(*args)
+
+
+class SmsAeroNoMoneyException(SmsAeroException):
+    """No money on the account."""
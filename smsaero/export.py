@@ -0,0 +1,196 @@
+"""
+This module provides the file exporters of `SmsAero.export_to_file`: NDJSON and CSV.
+
+The records are written page by page, so the memory used does not grow with the size of the export.
+After every page the exporter saves a checkpoint: the number of the page and the size of the file.
+An interrupted export is resumed from the page after the checkpoint, and whatever was written
+after the checkpoint is cut off first, so no record is lost or written twice.
+"""
+
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence
+
+import abc
+import csv
+import io
+import json
+import os
+
+
+__all__ = [
+    "FileExporter",
+    "NdjsonExporter",
+    "CsvExporter",
+]
+
+
+class FileExporter(abc.ABC):
+    """
+    The abstract base class of the exporters: writes the pages to a file and keeps the checkpoint.
+
+    The subclasses encode the records of a page with `encode_page()`.
+    An exporter is a context manager; it is opened by `SmsAero.export_to_file` if needed.
+    """
+
+    def __init__(self, path: str, checkpoint_path: Optional[str] = None, fsync: bool = False):
+        """
+        Initializes the FileExporter class.
+
+        Parameters:
+        path (str): The file the records are written to.
+        checkpoint_path (str, optional): The file of the checkpoint. Defaults to `path` + ".checkpoint".
+            Remove it to export from the first page again.
+        fsync (bool, optional): Force the file to disk before every checkpoint, so the export can be resumed
+            after a power failure too, not only after the process is killed.
+        """
+        self.__path = path
+        self.__checkpoint_path = checkpoint_path or path + ".checkpoint"
+        self.__fsync = fsync
+        self.__file: Optional[BinaryIO] = None
+        self.__page = 0
+        self.__state: Dict[str, Any] = {}
+
+    def get_path(self) -> str:
+        """
+        Returns the file the records are written to.
+        """
+        return self.__path
+
+    def get_checkpoint_path(self) -> str:
+        """
+        Returns the file of the checkpoint.
+        """
+        return self.__checkpoint_path
+
+    def get_next_page(self) -> int:
+        """
+        Returns the number of the first page not written yet.
+        """
+        return self.__page + 1
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Returns the state the subclass keeps in the checkpoint, e.g. the CSV columns.
+        """
+        return self.__state
+
+    def open(self) -> None:
+        """
+        Opens the file, resuming from the checkpoint if there is one.
+        """
+        checkpoint: Dict[str, Any] = {}
+        if os.path.exists(self.__checkpoint_path):
+            with open(self.__checkpoint_path, encoding="utf-8") as file:
+                checkpoint = json.load(file)
+        if not checkpoint or not os.path.exists(self.__path):
+            checkpoint = {"page": 0, "offset": 0, "state": {}}
+        self.__page = checkpoint["page"]
+        self.__state = checkpoint["state"]
+        # pylint: disable-next=consider-using-with
+        self.__file = open(self.__path, "r+b" if checkpoint["offset"] else "wb")
+        # the records written after the checkpoint will be written again
+        self.__file.truncate(checkpoint["offset"])
+        self.__file.seek(checkpoint["offset"])
+
+    def close(self) -> None:
+        """
+        Closes the file. The checkpoint is kept.
+        """
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+    def __enter__(self) -> "FileExporter":
+        if self.__file is None:
+            self.open()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @abc.abstractmethod
+    def encode_page(self, records: List[Dict]) -> bytes:
+        """
+        Encodes the records of a page.
+        """
+
+    def write_page(self, number: int, records: List[Dict]) -> None:
+        """
+        Writes the records of a page and saves the checkpoint. This is the sink of `SmsAero.export`.
+
+        Parameters:
+        number (int): The number of the page.
+        records (List[Dict]): The records of the page.
+        """
+        if self.__file is None:
+            raise ValueError("The exporter is not open.")
+        self.__file.write(self.encode_page(records))
+        self.__file.flush()
+        if self.__fsync:
+            os.fsync(self.__file.fileno())
+        self.__page = number
+        checkpoint = {"page": number, "offset": self.__file.tell(), "state": self.__state}
+        temporary = self.__checkpoint_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(checkpoint, file)
+        # replaced at once, so a crash leaves either the old checkpoint or the new one
+        os.replace(temporary, self.__checkpoint_path)
+
+
+class NdjsonExporter(FileExporter):
+    """
+    Writes one JSON object per line (NDJSON).
+    """
+
+    def encode_page(self, records: List[Dict]) -> bytes:
+        return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+
+
+class CsvExporter(FileExporter):
+    """
+    Writes the records as CSV with a header line.
+
+    The columns are the given fields, or the keys of the first record. The other keys are left out.
+    Nested values, such as the operators of a signature, are written as JSON.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fields: Optional[Sequence[str]] = None,
+        checkpoint_path: Optional[str] = None,
+        fsync: bool = False,
+        dialect: str = "excel",
+    ):
+        """
+        Initializes the CsvExporter class.
+
+        Parameters:
+        path (str): The file the records are written to.
+        fields (Sequence[str], optional): The columns. Defaults to the keys of the first record.
+        checkpoint_path (str, optional): The file of the checkpoint. Defaults to `path` + ".checkpoint".
+        fsync (bool, optional): Force the file to disk before every checkpoint.
+        dialect (str, optional): The `csv` dialect.
+        """
+        super().__init__(path, checkpoint_path, fsync)
+        self.__fields = list(fields) if fields is not None else None
+        self.__dialect = dialect
+
+    @staticmethod
+    def encode_value(value: Any) -> Any:
+        """
+        Returns the value written in a CSV cell.
+        """
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+        return value
+
+    def encode_page(self, records: List[Dict]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, self.__dialect)
+        state = self.get_state()
+        if "fields" not in state and records:
+            state["fields"] = self.__fields if self.__fields is not None else list(records[0])
+            writer.writerow(state["fields"])
+        for record in records:
+            writer.writerow([self.encode_value(record.get(field)) for field in state["fields"]])
+        return buffer.getvalue().encode("utf-8")
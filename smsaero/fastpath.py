@@ -0,0 +1,519 @@
+"""
+This module provides the PrefixIndex class, a fast path for the phone number checks of the common countries.
+
+Parsing a number with `phonenumbers` costs tens of microseconds, yet whether a Russian mobile number is valid
+is decided by its first digits and its length. The index is built from the phonenumbers metadata on first use:
+the validation patterns are compiled to automata, and every block of numbers sharing a prefix and a length
+whose verdict does not depend on the remaining digits is stored in a table. Looking a number up then takes
+a few integer divisions and dict lookups. Blocks which cannot be decided by their prefix, such as the ones
+where phonenumbers would strip a national prefix, are left to the full parse, so the verdicts are identical.
+"""
+
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import bisect
+import threading
+
+
+__all__ = [
+    "FAST_PATH_COUNTRY_CODES",
+    "UnsupportedPattern",
+    "Automaton",
+    "PrefixIndex",
+]
+
+
+# The country calling codes with a prefix table: Russia and Kazakhstan, then the neighbouring countries
+FAST_PATH_COUNTRY_CODES = (7, 375, 380, 374, 994, 995, 996, 992, 993, 998, 373)
+
+# The verdicts stored in the tables; None means the number has to be parsed
+_VALID = "valid"
+_INVALID = "invalid"
+# Returned by the block evaluation when the block has to be split by the next digit
+_SPLIT = "split"
+
+_DIGITS = "0123456789"
+_RANGE_ENDS = {first + last for first in _DIGITS for last in _DIGITS}
+_POWERS = [10**i for i in range(1, 19)]
+# The descriptions which make a number valid, in the order of phonenumbers' _number_type_helper
+_TYPE_DESCS = (
+    "premium_rate",
+    "toll_free",
+    "shared_cost",
+    "voip",
+    "personal_number",
+    "pager",
+    "uan",
+    "voicemail",
+    "fixed_line",
+)
+
+
+class UnsupportedPattern(ValueError):
+    """A pattern uses a regular expression feature the automaton does not implement."""
+
+
+class _Fragment(NamedTuple):
+    start: int
+    end: int
+
+
+class Automaton:  # pylint: disable=too-many-instance-attributes
+    """
+    A nondeterministic finite automaton over the decimal digits compiled from a phonenumbers pattern.
+
+    Only the regular expression subset used by the phonenumbers metadata is supported: digits, `\\d`,
+    character classes, groups, alternation and the `?`, `*`, `+` and `{n,m}` quantifiers.
+    """
+
+    def __init__(self, pattern: str, ignore_end_anchor: bool = False):
+        """
+        Initializes the Automaton class.
+
+        Parameters:
+        pattern (str): The regular expression.
+        ignore_end_anchor (bool, optional): Treat `$` as matching anywhere. The automaton then accepts
+            more strings than the pattern, which is enough when only "can it match" is asked.
+
+        Raises:
+        UnsupportedPattern: If the pattern uses an unsupported feature.
+        """
+        self.__pattern = pattern
+        self.__pos = 0
+        self.__ignore_end_anchor = ignore_end_anchor
+        self.__moves: List[Dict[str, Set[int]]] = []
+        self.__epsilon: List[Set[int]] = []
+        fragment = self.__alternation()
+        if self.__pos != len(pattern):
+            raise UnsupportedPattern(pattern)
+        self.__accept = fragment.end
+        self.__closures = [self.__closure(state) for state in range(len(self.__moves))]
+        self.start: FrozenSet[int] = self.__closures[fragment.start]
+        self.__steps: Dict[Tuple[FrozenSet[int], str], FrozenSet[int]] = {}
+        self.__full: Dict[Tuple[FrozenSet[int], int], Tuple[bool, bool]] = {}
+        self.__reach: Dict[Tuple[FrozenSet[int], int], bool] = {}
+
+    # compilation (Thompson's construction)
+
+    def __state(self) -> int:
+        self.__moves.append({})
+        self.__epsilon.append(set())
+        return len(self.__moves) - 1
+
+    def __peek(self) -> str:
+        return self.__pattern[self.__pos] if self.__pos < len(self.__pattern) else ""
+
+    def __alternation(self) -> _Fragment:
+        branches = [self.__sequence()]
+        while self.__peek() == "|":
+            self.__pos += 1
+            branches.append(self.__sequence())
+        if len(branches) == 1:
+            return branches[0]
+        start, end = self.__state(), self.__state()
+        for branch in branches:
+            self.__epsilon[start].add(branch.start)
+            self.__epsilon[branch.end].add(end)
+        return _Fragment(start, end)
+
+    def __sequence(self) -> _Fragment:
+        start = end = self.__state()
+        while self.__peek() not in ("", "|", ")"):
+            fragment = self.__quantified()
+            self.__epsilon[end].add(fragment.start)
+            end = fragment.end
+        return _Fragment(start, end)
+
+    def __quantified(self) -> _Fragment:
+        begin = self.__pos
+        fragment = self.__atom()
+        low, high = self.__quantifier()
+        if (low, high) == (1, 1):
+            return fragment
+        after = self.__pos
+        count = max(low, 1) if high is None else high
+        copies = [fragment] if count else []
+        for _ in range(count - 1):
+            # every copy of the atom is compiled again from its source text
+            self.__pos = begin
+            copies.append(self.__atom())
+        self.__pos = after
+        start = end = self.__state()
+        final = self.__state()
+        for number, copy in enumerate(copies):
+            if number >= low:
+                self.__epsilon[end].add(final)
+            self.__epsilon[end].add(copy.start)
+            end = copy.end
+        if high is None:
+            # the last copy repeats
+            self.__epsilon[end].add(copies[-1].start)
+        self.__epsilon[end].add(final)
+        return _Fragment(start, final)
+
+    def __quantifier(self) -> Tuple[int, Optional[int]]:
+        char = self.__peek()
+        if char in ("?", "*", "+"):
+            self.__pos += 1
+            return {"?": (0, 1), "*": (0, None), "+": (1, None)}[char]
+        if char != "{":
+            return 1, 1
+        close = self.__pattern.find("}", self.__pos)
+        body = self.__pattern[self.__pos:close][1:]
+        self.__pos = close + 1
+        low_text, _, high_text = body.partition(",")
+        if not low_text.isdigit() or (high_text and not high_text.isdigit()):
+            raise UnsupportedPattern(self.__pattern)
+        low = int(low_text)
+        if "," not in body:
+            return low, low
+        return low, int(high_text) if high_text else None
+
+    def __atom(self) -> _Fragment:
+        char = self.__peek()
+        if self.__pattern.startswith("(?:", self.__pos) or char == "(":
+            self.__pos += 3 if self.__pattern.startswith("(?:", self.__pos) else 1
+            if self.__peek() == "?":
+                # lookarounds and the other extensions
+                raise UnsupportedPattern(self.__pattern)
+            fragment = self.__alternation()
+            if self.__peek() != ")":
+                raise UnsupportedPattern(self.__pattern)
+            self.__pos += 1
+            return fragment
+        if char == "$" and self.__ignore_end_anchor:
+            self.__pos += 1
+            state = self.__state()
+            return _Fragment(state, state)
+        return self.__digits(self.__charset())
+
+    def __charset(self) -> str:
+        char = self.__peek()
+        if char.isdigit():
+            self.__pos += 1
+            return char
+        if self.__pattern.startswith("\\d", self.__pos):
+            self.__pos += 2
+            return _DIGITS
+        if char != "[":
+            raise UnsupportedPattern(self.__pattern)
+        close = self.__pattern.find("]", self.__pos)
+        body = self.__pattern[self.__pos:close][1:]
+        self.__pos = close + 1
+        negate = body.startswith("^")
+        body = body[1:] if negate else body
+        digits: Set[str] = set()
+        index = 0
+        while index < len(body):
+            if body.startswith("\\d", index):
+                digits.update(_DIGITS)
+                index += 2
+            elif index + 2 < len(body) and body[index + 1] == "-" and body[index] + body[index + 2] in _RANGE_ENDS:
+                digits.update(chr(code) for code in range(ord(body[index]), ord(body[index + 2]) + 1))
+                index += 3
+            elif body[index].isdigit():
+                digits.add(body[index])
+                index += 1
+            else:
+                raise UnsupportedPattern(self.__pattern)
+        return "".join(sorted(set(_DIGITS) - digits if negate else digits))
+
+    def __digits(self, digits: str) -> _Fragment:
+        start, end = self.__state(), self.__state()
+        for digit in digits:
+            self.__moves[start].setdefault(digit, set()).add(end)
+        return _Fragment(start, end)
+
+    def __closure(self, state: int) -> FrozenSet[int]:
+        seen = {state}
+        stack = [state]
+        while stack:
+            for target in self.__epsilon[stack.pop()]:
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        return frozenset(seen)
+
+    # simulation
+
+    def accepts(self, states: FrozenSet[int]) -> bool:
+        """
+        Returns True if the automaton accepts in one of the states.
+        """
+        return self.__accept in states
+
+    def step(self, states: FrozenSet[int], digit: str) -> FrozenSet[int]:
+        """
+        Returns the states after reading a digit.
+        """
+        key = (states, digit)
+        if key not in self.__steps:
+            targets: Set[int] = set()
+            for state in states:
+                for target in self.__moves[state].get(digit, ()):
+                    targets |= self.__closures[target]
+            self.__steps[key] = frozenset(targets)
+        return self.__steps[key]
+
+    def completions(self, states: FrozenSet[int], length: int) -> Tuple[bool, bool]:
+        """
+        Tells whether the automaton accepts some, and whether it accepts all, of the digit strings
+        of the given length read from the states.
+
+        Returns:
+        Tuple[bool, bool]: (accepts some, accepts all).
+        """
+        key = (states, length)
+        if key not in self.__full:
+            if length == 0:
+                accepted = self.accepts(states)
+                self.__full[key] = (accepted, accepted)
+            else:
+                results = [self.completions(self.step(states, digit), length - 1) for digit in _DIGITS]
+                self.__full[key] = (any(some for some, _ in results), all(every for _, every in results))
+        return self.__full[key]
+
+    def can_accept_within(self, states: FrozenSet[int], length: int) -> bool:
+        """
+        Returns True if the automaton can accept after reading at most `length` more digits.
+        """
+        key = (states, length)
+        if key not in self.__reach:
+            if self.accepts(states):
+                self.__reach[key] = True
+            elif length == 0 or not states:
+                self.__reach[key] = False
+            else:
+                following = frozenset().union(*(self.step(states, digit) for digit in _DIGITS))
+                self.__reach[key] = self.can_accept_within(following, length - 1)
+        return self.__reach[key]
+
+
+class _Run(NamedTuple):
+    # the states after reading a prefix, and whether a prefix of it was accepted on the way
+    states: FrozenSet[int]
+    matched: bool
+
+
+def _run(automaton: Automaton, prefix: str) -> _Run:
+    states = automaton.start
+    matched = automaton.accepts(states)
+    for digit in prefix:
+        states = automaton.step(states, digit)
+        matched = matched or automaton.accepts(states)
+    return _Run(states, matched)
+
+
+def _full_match(automaton: Automaton, prefix: str, length: int) -> Optional[bool]:
+    # fullmatch of every number of `length` digits starting with `prefix`: True, False or None if it depends
+    some, every = automaton.completions(_run(automaton, prefix).states, length - len(prefix))
+    if every:
+        return True
+    return None if some else False
+
+
+def _prefix_match(automaton: Automaton, prefix: str, length: int) -> Optional[bool]:
+    # re.match at the start of every number of `length` digits starting with `prefix`
+    run = _run(automaton, prefix)
+    if run.matched:
+        return True
+    return None if automaton.can_accept_within(run.states, length - len(prefix)) else False
+
+
+def _and(*values: Optional[bool]) -> Optional[bool]:
+    if False in values:
+        return False
+    return None if None in values else True
+
+
+def _or(*values: Optional[bool]) -> Optional[bool]:
+    if True in values:
+        return True
+    return None if None in values else False
+
+
+class _Region:  # pylint: disable=too-few-public-methods
+    # the automata of the patterns of one region which decide whether a number is valid
+
+    def __init__(self, metadata):
+        self.leading_digits = Automaton(metadata.leading_digits) if metadata.leading_digits else None
+        general = metadata.general_desc
+        self.general = Automaton(general.national_number_pattern), tuple(general.possible_length)
+        names = _TYPE_DESCS if metadata.same_mobile_and_fixed_line_pattern else _TYPE_DESCS + ("mobile",)
+        self.types = [desc for desc in (self.__desc(getattr(metadata, name)) for name in names) if desc]
+
+    @staticmethod
+    def __desc(desc) -> Optional[Tuple[Automaton, Sequence[int]]]:
+        if desc is None or not desc.national_number_pattern:
+            return None
+        return Automaton(desc.national_number_pattern), tuple(desc.possible_length)
+
+    @staticmethod
+    def __matches(desc: Tuple[Automaton, Sequence[int]], prefix: str, length: int) -> Optional[bool]:
+        # phonenumbers' _is_number_matching_desc
+        automaton, lengths = desc
+        if lengths and length not in lengths:
+            return False
+        return _full_match(automaton, prefix, length)
+
+    def is_known_type(self, prefix: str, length: int) -> Optional[bool]:
+        """phonenumbers' _number_type_helper(...) != UNKNOWN"""
+        return _and(
+            self.__matches(self.general, prefix, length),
+            _or(*(self.__matches(desc, prefix, length) for desc in self.types)),
+        )
+
+
+class _Country:  # pylint: disable=too-few-public-methods
+    # the block evaluation of one country calling code, after phonenumbers' parse() and is_valid_number()
+
+    def __init__(self, country_code: int):
+        # imported on first use, as its metadata tables make it the slowest import of the client
+        from phonenumbers import COUNTRY_CODE_TO_REGION_CODE  # pylint: disable=import-outside-toplevel
+        from phonenumbers.phonemetadata import PhoneMetadata  # pylint: disable=import-outside-toplevel
+
+        regions: List[Any] = [
+            PhoneMetadata.metadata_for_region(region) for region in COUNTRY_CODE_TO_REGION_CODE[country_code]
+        ]
+        main = regions[0]
+        # parse() strips the national prefix of the main region when it matches; such blocks are not indexed
+        self.national_prefix = (
+            Automaton(main.national_prefix_for_parsing, ignore_end_anchor=True)
+            if main.national_prefix_for_parsing
+            else None
+        )
+        self.regions = [_Region(metadata) for metadata in regions]
+
+    def evaluate(self, prefix: str, length: int) -> Optional[str]:
+        """
+        Returns the verdict of every national number of `length` digits starting with `prefix`:
+        _VALID, _INVALID, None if the numbers have to be parsed or _SPLIT if it depends on the next digits.
+        """
+        if prefix.startswith("0"):
+            # the leading zeros of a national number are kept apart by phonenumbers
+            return None
+        if self.national_prefix is not None:
+            stripped = _prefix_match(self.national_prefix, prefix, length)
+            if stripped is not False:
+                return None if stripped else _SPLIT
+        # region_code_for_number()
+        region = None
+        for candidate in self.regions:
+            if candidate.leading_digits is not None:
+                chosen = _prefix_match(candidate.leading_digits, prefix, length)
+            else:
+                chosen = candidate.is_known_type(prefix, length)
+            if chosen is None:
+                return _SPLIT
+            if chosen:
+                region = candidate
+                break
+        if region is None:
+            return _INVALID
+        # is_valid_number_for_region()
+        valid = region.is_known_type(prefix, length)
+        if valid is None:
+            return _SPLIT
+        return _VALID if valid else _INVALID
+
+
+class PrefixIndex:
+    """
+    Tables of the phone number verdicts by country calling code, length and prefix.
+
+    The tables are built on first use of every country calling code and length.
+    An instance is thread-safe.
+    """
+
+    def __init__(
+        self, country_codes: Sequence[int] = FAST_PATH_COUNTRY_CODES, max_depth: int = 6, max_blocks: int = 5000
+    ):
+        """
+        Initializes the PrefixIndex class.
+
+        Parameters:
+        country_codes (Sequence[int], optional): The country calling codes to index.
+        max_depth (int, optional): The longest prefix of the national number stored in the tables.
+        max_blocks (int, optional): The largest number of blocks split at one prefix length of a table.
+            The blocks beyond it are left to the full parse, which bounds the time to build a table.
+        """
+        self.__codes: Dict[int, Set[int]] = {}
+        for code in country_codes:
+            self.__codes.setdefault(len(str(code)), set()).add(code)
+        self.__max_depth = max_depth
+        self.__max_blocks = max_blocks
+        self.__lock = threading.Lock()
+        self.__countries: Dict[int, Optional[_Country]] = {}
+        self.__tables: Dict[Tuple[int, int], List[Dict[int, Optional[str]]]] = {}
+
+    def lookup(self, number: int) -> Optional[str]:
+        """
+        Returns the verdict of a phone number in the international format, without the leading '+'.
+
+        Parameters:
+        number (int): The phone number.
+
+        Returns:
+        str, optional: 'valid' or 'invalid' as `number_verdict()`, or None if the number has to be parsed.
+        """
+        digits = bisect.bisect_right(_POWERS, number) + 1
+        for code_length, codes in self.__codes.items():
+            length = digits - code_length
+            if length < 2:
+                continue
+            power = _POWERS[length - 1]
+            code = number // power
+            if code in codes:
+                national_number = number - code * power
+                for depth, level in enumerate(self.__table(code, length), 1):
+                    key = national_number // _POWERS[length - depth - 1] if depth < length else national_number
+                    if key in level:
+                        return level[key]
+                return None
+        return None
+
+    def get_table(self, country_code: int, length: int) -> List[Dict[int, Optional[str]]]:
+        """
+        Returns the table of the national numbers of `length` digits: the blocks decided by a prefix
+        of 1, 2, ... digits, as dicts from the prefix to 'valid', 'invalid' or None if the numbers have to be parsed.
+        """
+        return self.__table(country_code, length)
+
+    def __table(self, code: int, length: int) -> List[Dict[int, Optional[str]]]:
+        table = self.__tables.get((code, length))
+        if table is None:
+            with self.__lock:
+                table = self.__tables.get((code, length))
+                if table is None:
+                    table = self.__tables[(code, length)] = self.__build(code, length)
+        return table
+
+    def __country(self, code: int) -> Optional[_Country]:
+        if code not in self.__countries:
+            try:
+                self.__countries[code] = _Country(code)
+            except UnsupportedPattern:
+                self.__countries[code] = None
+        return self.__countries[code]
+
+    def __build(self, code: int, length: int) -> List[Dict[int, Optional[str]]]:
+        country = self.__country(code)
+        if country is None:
+            # every number is parsed
+            return [{}]
+        table: List[Dict[int, Optional[str]]] = []
+        split = [""]
+        for depth in range(1, min(self.__max_depth, length) + 1):
+            level: Dict[int, Optional[str]] = {}
+            next_split: List[str] = []
+            for prefix in split:
+                for digit in _DIGITS:
+                    block = prefix + digit
+                    verdict = country.evaluate(block, length)
+                    if verdict == _SPLIT and depth < self.__max_depth and len(next_split) < self.__max_blocks:
+                        next_split.append(block)
+                    else:
+                        level[int(block)] = None if verdict == _SPLIT else verdict
+            table.append(level)
+            split = next_split
+        return table
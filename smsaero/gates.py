@@ -0,0 +1,265 @@
+"""
+This module provides the GateHealth class which decides in which order the SmsAero gates are tried.
+
+The gate that answered last is tried first, the other gates are ordered by the moving averages of their
+latency and error rate, and a gate that failed is moved to the end of the list for a cool-down period.
+So when a gate is down only the first request after the failure pays for the timeout.
+
+It also provides the opt-in ProtocolMemory class which remembers the gates that failed the TLS handshake,
+so they are asked over plain HTTP right away instead of repeating the failing handshake on every request.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence
+
+import threading
+import time
+
+
+__all__ = [
+    "GateHealth",
+    "GateStats",
+    "ProtocolMemory",
+]
+
+
+class GateStats:  # pylint: disable=too-few-public-methods
+    """
+    The health statistics of one gate.
+
+    Attributes:
+    latency (float, optional): The exponentially weighted moving average of the latency in seconds.
+    error_rate (float): The exponentially weighted moving average of failures, from 0 to 1.
+    failures (int): The number of consecutive failures.
+    cooldown_until (float): The clock value until which the gate is in the cool-down window.
+    """
+
+    __slots__ = ("latency", "error_rate", "failures", "cooldown_until")
+
+    def __init__(self) -> None:
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.cooldown_until = 0.0
+
+
+class GateHealth:
+    """
+    Tracks the health of the gates and orders them for the next request.
+
+    An instance is thread-safe and may be shared by several SmsAero clients.
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.3,
+        cooldown: float = 30.0,
+        max_cooldown: float = 300.0,
+        error_penalty: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initializes the GateHealth class.
+
+        Parameters:
+        alpha (float, optional): The weight of the newest sample in the moving averages, from 0 to 1.
+        cooldown (float, optional): The cool-down window in seconds after the first failure of a gate.
+            It doubles with every consecutive failure.
+        max_cooldown (float, optional): The upper limit of the cool-down window in seconds.
+        error_penalty (float, optional): The seconds added to the latency score per unit of the error rate.
+        clock (Callable[[], float], optional): The monotonic clock, in seconds.
+        """
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be between 0 and 1")
+        if cooldown < 0 or max_cooldown < 0:
+            raise ValueError("cooldown must not be negative")
+        self.__alpha = alpha
+        self.__cooldown = cooldown
+        self.__max_cooldown = max_cooldown
+        self.__penalty = error_penalty
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__stats: Dict[str, GateStats] = {}
+        self.__last_good: Optional[str] = None
+
+    def get_stats(self, gate: str) -> GateStats:
+        """
+        Returns the statistics of a gate.
+        """
+        with self.__lock:
+            return self.__stats.setdefault(gate, GateStats())
+
+    def get_last_good(self) -> Optional[str]:
+        """
+        Returns the gate which answered the last request.
+        """
+        return self.__last_good
+
+    def is_cooling_down(self, gate: str) -> bool:
+        """
+        Returns True if the gate failed recently and is in the cool-down window.
+        """
+        return self.get_stats(gate).cooldown_until > self.__clock()
+
+    def score(self, gate: str) -> float:
+        """
+        Returns the expected cost of a request to the gate in seconds. Lower is better.
+        """
+        return self.__score(self.get_stats(gate))
+
+    def __score(self, stats: GateStats) -> float:
+        return (stats.latency or 0.0) + stats.error_rate * self.__penalty
+
+    def order(self, gates: Sequence[str]) -> List[str]:
+        """
+        Orders the gates for the next request.
+
+        The last good gate comes first, then the other healthy gates by score, then the gates
+        in the cool-down window, the ones that recover sooner first. Gates with equal score keep their order.
+
+        Parameters:
+        gates (Sequence[str]): The gates to order.
+
+        Returns:
+        List[str]: The gates in the order they should be tried.
+        """
+        now = self.__clock()
+        with self.__lock:
+            stats = {gate: self.__stats.setdefault(gate, GateStats()) for gate in gates}
+            last_good = self.__last_good
+
+        def key(gate: str):
+            gate_stats = stats[gate]
+            if gate_stats.cooldown_until > now:
+                return (1, gate_stats.cooldown_until)
+            return (0, gate != last_good, self.__score(gate_stats))
+
+        return sorted(gates, key=key)
+
+    def record_success(self, gate: str, latency: float) -> None:
+        """
+        Records a request answered by the gate.
+
+        Parameters:
+        gate (str): The gate.
+        latency (float): The latency of the request in seconds.
+        """
+        with self.__lock:
+            stats = self.__stats.setdefault(gate, GateStats())
+            if stats.latency is None:
+                stats.latency = latency
+            else:
+                stats.latency += self.__alpha * (latency - stats.latency)
+            stats.error_rate -= self.__alpha * stats.error_rate
+            stats.failures = 0
+            stats.cooldown_until = 0.0
+            self.__last_good = gate
+
+    def record_failure(self, gate: str) -> None:
+        """
+        Records a request the gate failed to answer and puts the gate in the cool-down window.
+
+        Parameters:
+        gate (str): The gate.
+        """
+        with self.__lock:
+            stats = self.__stats.setdefault(gate, GateStats())
+            stats.error_rate += self.__alpha * (1.0 - stats.error_rate)
+            stats.failures += 1
+            cooldown = min(self.__cooldown * 2 ** min(stats.failures - 1, 32), self.__max_cooldown)
+            stats.cooldown_until = self.__clock() + cooldown
+            if self.__last_good == gate:
+                self.__last_good = None
+
+
+class ProtocolMemory:
+    """
+    Remembers for a while which gates failed the TLS handshake.
+
+    Without it a request switches to HTTP after an SSL error for the rest of that request only, and the next
+    request repeats the failing handshake. With it the gate is asked over HTTP until the memory expires,
+    then HTTPS is tried again. Note that over HTTP the credentials are sent in the clear, so the memory is opt-in.
+
+    An instance is thread-safe and may be shared by several SmsAero clients.
+    """
+
+    def __init__(self, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Initializes the ProtocolMemory class.
+
+        Parameters:
+        ttl (float, optional): How long in seconds a gate is asked over HTTP after an SSL error.
+        clock (Callable[[], float], optional): The monotonic clock, in seconds.
+        """
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        self.__ttl = ttl
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__downgraded: Dict[str, float] = {}
+        self.__downgrades = 0
+        self.__skipped_handshakes = 0
+
+    def protocol(self, gate: str, proto: str = "https") -> str:
+        """
+        Returns the protocol to ask the gate with.
+
+        Parameters:
+        gate (str): The gate.
+        proto (str, optional): The protocol requested by the caller.
+
+        Returns:
+        str: 'http' if the gate is remembered to fail TLS, otherwise `proto`.
+        """
+        if proto != "https":
+            return proto
+        with self.__lock:
+            until = self.__downgraded.get(gate)
+            if until is None:
+                return proto
+            if until <= self.__clock():
+                # expired: probe https again
+                del self.__downgraded[gate]
+                return proto
+            self.__skipped_handshakes += 1
+            return "http"
+
+    def record_ssl_error(self, gate: str) -> None:
+        """
+        Records a failed TLS handshake with the gate.
+
+        Parameters:
+        gate (str): The gate.
+        """
+        with self.__lock:
+            self.__downgraded[gate] = self.__clock() + self.__ttl
+            self.__downgrades += 1
+
+    def forget(self, gate: Optional[str] = None) -> None:
+        """
+        Forgets the downgrade of one gate, or of all the gates if no gate is given.
+        """
+        with self.__lock:
+            if gate is None:
+                self.__downgraded.clear()
+            else:
+                self.__downgraded.pop(gate, None)
+
+    def get_downgraded(self) -> List[str]:
+        """
+        Returns the gates which are currently asked over HTTP.
+        """
+        now = self.__clock()
+        with self.__lock:
+            return [gate for gate, until in self.__downgraded.items() if until > now]
+
+    def get_downgrades(self) -> int:
+        """
+        Returns the number of SSL errors which caused a downgrade to HTTP.
+        """
+        return self.__downgrades
+
+    def get_skipped_handshakes(self) -> int:
+        """
+        Returns the number of requests sent over HTTP right away because of a remembered downgrade.
+        """
+        return self.__skipped_handshakes
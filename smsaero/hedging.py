@@ -0,0 +1,291 @@
+"""
+This module provides hedged requests: when the first gate has not answered within a delay,
+the same request is sent to the next gate as well and the first successful answer is taken.
+
+Only idempotent reads are hedged. The API has no idempotency key, so a hedged write (`sms/send`,
+`telegram/send`, ...) could be executed by two gates and deliver the message twice.
+The delay is a percentile of the recently observed latencies, so only the slow tail is hedged.
+"""
+
+from typing import Any, Awaitable, Callable, Collection, Deque, Dict, FrozenSet, List, Sequence, Set, Tuple
+
+import collections
+import math
+import threading
+import time
+
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+
+
+__all__ = [
+    "HEDGED_SELECTORS",
+    "HedgePolicy",
+    "hedge",
+    "async_hedge",
+]
+
+
+# Selectors of the read-only methods which are safe to send to several gates at once
+HEDGED_SELECTORS = frozenset(
+    [
+        "auth",
+        "balance",
+        "cards",
+        "tariffs",
+        "sms/status",
+        "sms/teststatus",
+        "sms/list",
+        "sms/testlist",
+        "sign/list",
+        "group/list",
+        "contact/list",
+        "blacklist/list",
+        "hlr/status",
+        "number/operator",
+        "viber/sign/list",
+        "viber/list",
+        "viber/statistic",
+        "telegram/status",
+        "mobile-id/status",
+    ]
+)
+
+
+class HedgePolicy:  # pylint: disable=too-many-instance-attributes
+    """
+    Decides which requests are hedged and how long to wait for the first gate.
+
+    An instance is thread-safe and may be shared by several SmsAero clients.
+    """
+
+    def __init__(
+        self,
+        delay: float = 0.5,
+        percentile: float = 95.0,
+        min_delay: float = 0.05,
+        max_delay: float = 5.0,
+        window: int = 200,
+        min_samples: int = 20,
+        max_hedges: int = 1,
+        selectors: Collection[str] = HEDGED_SELECTORS,
+    ):
+        """
+        Initializes the HedgePolicy class.
+
+        Parameters:
+        delay (float, optional): The delay in seconds used until `min_samples` latencies are observed.
+        percentile (float, optional): The latency percentile, from 0 to 100, after which the request is hedged.
+        min_delay (float, optional): The lower limit of the delay in seconds.
+        max_delay (float, optional): The upper limit of the delay in seconds.
+        window (int, optional): The number of recent latencies the percentile is computed from.
+        min_samples (int, optional): The number of latencies needed before the percentile is used.
+        max_hedges (int, optional): The maximum number of extra gates asked because of the delay.
+            Gates which fail are always replaced by the next gate.
+        selectors (Collection[str], optional): The selectors which are hedged. Must be idempotent.
+        """
+        if not 0 < percentile <= 100:
+            raise ValueError("percentile must be between 0 and 100")
+        if not 0 <= min_delay <= delay <= max_delay:
+            raise ValueError("delays must satisfy 0 <= min_delay <= delay <= max_delay")
+        if window <= 0 or min_samples <= 0 or max_hedges <= 0:
+            raise ValueError("window, min_samples and max_hedges must be positive")
+        self.__delay = delay
+        self.__percentile = percentile
+        self.__min_delay = min_delay
+        self.__max_delay = max_delay
+        self.__min_samples = min_samples
+        self.__max_hedges = max_hedges
+        self.__selectors: FrozenSet[str] = frozenset(selectors)
+        self.__lock = threading.Lock()
+        self.__latencies: Deque[float] = collections.deque(maxlen=window)
+        self.__hedges = 0
+        self.__hedge_wins = 0
+
+    def is_hedged(self, selector: str) -> bool:
+        """
+        Returns True if requests to the selector are hedged.
+        """
+        return selector in self.__selectors
+
+    def get_max_hedges(self) -> int:
+        """
+        Returns the maximum number of extra gates asked because of the delay.
+        """
+        return self.__max_hedges
+
+    def get_delay(self) -> float:
+        """
+        Returns the time in seconds to wait for a gate before asking the next one.
+        """
+        with self.__lock:
+            if len(self.__latencies) < self.__min_samples:
+                return self.__delay
+            latencies = sorted(self.__latencies)
+        rank = math.ceil(self.__percentile / 100 * len(latencies)) - 1
+        return min(max(latencies[rank], self.__min_delay), self.__max_delay)
+
+    def record_latency(self, latency: float) -> None:
+        """
+        Records the latency of a successful request in seconds.
+        """
+        with self.__lock:
+            self.__latencies.append(latency)
+
+    def record_hedge(self, won: bool) -> None:
+        """
+        Records a request which was hedged, and whether an extra gate answered first.
+        """
+        with self.__lock:
+            self.__hedges += 1
+            self.__hedge_wins += won
+
+    def get_hedges(self) -> int:
+        """
+        Returns the number of requests which were sent to an extra gate because of the delay.
+        """
+        return self.__hedges
+
+    def get_hedge_wins(self) -> int:
+        """
+        Returns the number of hedged requests answered first by an extra gate.
+        """
+        return self.__hedge_wins
+
+
+def _call(attempt: Callable[[str], Any], gate: str, result: Future, started: Future) -> None:
+    # runs an attempt unless it was cancelled while waiting for a worker, and records when it started
+    if not result.set_running_or_notify_cancel():
+        return
+    started.set_result(time.monotonic())
+    try:
+        result.set_result(attempt(gate))
+    except BaseException as e:  # pylint: disable=broad-exception-caught
+        result.set_exception(e)
+
+
+def _submit(attempt: Callable[[str], Any], gate: str, executor: Executor) -> Tuple[Future, Future]:
+    # the future of the answer and the future of the start time of an attempt run by the executor
+    result: Future = Future()
+    started: Future = Future()
+    executor.submit(_call, attempt, gate, result, started)
+    return result, started
+
+
+def hedge(  # pylint: disable=too-many-locals
+    attempt: Callable[[str], Any],
+    gates: Sequence[str],
+    delay: float,
+    max_hedges: int,
+    executor: Executor,
+    errors: Tuple[type, ...],
+) -> Tuple[str, Any, bool]:
+    """
+    Calls `attempt` for the first gate and for the next gates whenever a gate fails or does not answer in time.
+
+    Every attempt runs on the executor. The delay counts from the moment the last attempt actually started,
+    so the time an attempt waits for a worker does not trigger another one.
+
+    Parameters:
+    attempt (Callable[[str], Any]): Sends the request to one gate.
+    gates (Sequence[str]): The gates in the order they should be tried.
+    delay (float): The time in seconds to wait for an answer before asking the next gate.
+    max_hedges (int): The maximum number of gates asked because of the delay.
+    executor (Executor): The executor running the attempts.
+    errors (Tuple[type, ...]): The errors meaning that the gate failed and the next one should be asked.
+
+    Returns:
+    Tuple[str, Any, bool]: The gate which answered first, its answer and whether the request was hedged.
+
+    Raises:
+    LookupError: If every gate failed.
+    """
+    remaining = list(gates)
+    pending: Dict[Future, str] = {}
+    started: Future = Future()
+    hedges = 0
+    launch = True
+    try:
+        while remaining or pending:
+            if remaining and launch:
+                gate = remaining.pop(0)
+                future, started = _submit(attempt, gate, executor)
+                pending[future] = gate
+            waiting = set(pending)
+            timeout = None
+            if remaining and hedges < max_hedges:
+                if started.done():
+                    timeout = max(started.result() + delay - time.monotonic(), 0.0)
+                else:
+                    # the delay starts once the attempt does
+                    waiting.add(started)
+            done, _ = wait(waiting, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedges += 1
+                launch = True
+                continue
+            # a failed gate is replaced by the next one; an attempt which only started is waited for again
+            finished = [future for future in done if future in pending]
+            launch = bool(finished)
+            for future in finished:
+                gate = pending.pop(future)
+                if future.exception() is None:
+                    return gate, future.result(), hedges > 0
+                if not isinstance(future.exception(), errors):
+                    raise future.exception()  # type: ignore[misc]
+        raise LookupError("every gate failed")
+    finally:
+        # the slower answers are dropped; the attempts which have not started are not sent at all
+        for future in pending:
+            future.cancel()
+
+
+async def async_hedge(
+    attempt: Callable[[str], Awaitable[Any]],
+    gates: Sequence[str],
+    delay: float,
+    max_hedges: int,
+    errors: Tuple[type, ...],
+) -> Tuple[str, Any, bool]:
+    """
+    The asyncio variant of `hedge()`. The slower attempts are cancelled once a gate answers.
+
+    Parameters:
+    attempt (Callable[[str], Awaitable[Any]]): Coroutine function that sends the request to one gate.
+    gates (Sequence[str]): The gates in the order they should be tried.
+    delay (float): The time in seconds to wait for an answer before asking the next gate.
+    max_hedges (int): The maximum number of gates asked because of the delay.
+    errors (Tuple[type, ...]): The errors meaning that the gate failed and the next one should be asked.
+
+    Returns:
+    Tuple[str, Any, bool]: The gate which answered first, its answer and whether the request was hedged.
+
+    Raises:
+    LookupError: If every gate failed.
+    """
+    # imported here, so the sync client does not pay for importing asyncio
+    import asyncio  # pylint: disable=import-outside-toplevel
+
+    remaining: List[str] = list(gates)
+    pending: Dict[asyncio.Future, str] = {}
+    hedges = 0
+    try:
+        while remaining or pending:
+            if remaining:
+                gate = remaining.pop(0)
+                pending[asyncio.ensure_future(attempt(gate))] = gate
+            timeout = delay if remaining and hedges < max_hedges else None
+            done: Set[asyncio.Future]
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                hedges += 1
+                continue
+            for task in done:
+                gate = pending.pop(task)
+                if task.exception() is None:
+                    return gate, task.result(), hedges > 0
+                if not isinstance(task.exception(), errors):
+                    raise task.exception()  # type: ignore[misc]
+        raise LookupError("every gate failed")
+    finally:
+        for task in pending:
+            task.cancel()
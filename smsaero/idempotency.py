@@ -0,0 +1,239 @@
+"""
+This module provides the IdempotencyStore class which keeps a send from being made twice.
+
+The API has no idempotency keys: a `sms/send` request repeated after a timeout sends the message again.
+The store remembers the result of every send for a time window, keyed by its recipients, text, signature
+and an optional key of the caller. A send repeated within the window returns the remembered result instead
+of a request, and a send repeated while the first one is in flight waits for its result.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import collections
+import hashlib
+import json
+import threading
+import time
+
+from concurrent.futures import Future
+
+
+__all__ = [
+    "PURGE_INTERVAL",
+    "IdempotencyStore",
+]
+
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS idempotency (key TEXT PRIMARY KEY, created REAL NOT NULL, result TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idempotency_created ON idempotency (created)",
+)
+
+# The time in seconds between two purges of the expired results of the file
+PURGE_INTERVAL = 60.0
+
+
+class IdempotencyStore:  # pylint: disable=too-many-instance-attributes
+    """
+    Remembers the results of the sends for `window` seconds, in memory and optionally in an SQLite file.
+
+    Only the successful sends are remembered: a send which raised is made again by the next call.
+    The file lets the processes of a host, and a restarted process, share the results.
+    An instance is thread-safe and may be shared by several clients.
+
+    Example:
+        store = IdempotencyStore(window=3600, path="sent.sqlite3")
+        smsaero = SmsAero(email, api_key, options=ClientOptions(idempotency_store=store))
+        smsaero.send_sms(79031234567, "Your order is ready", idempotency_key="order-1234")
+    """
+
+    def __init__(
+        self,
+        window: float = 86400.0,
+        maxsize: int = 100_000,
+        path: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Initializes the IdempotencyStore class.
+
+        Parameters:
+        window (float, optional): The time in seconds a result is remembered for.
+        maxsize (int, optional): The maximum number of results kept in memory, the least recently used first out.
+        path (str, optional): The SQLite file keeping the results as well. By default they are kept in memory only.
+        clock (Callable[[], float], optional): The current Unix time.
+        """
+        if window <= 0:
+            raise ValueError("window must be positive")
+        if not isinstance(maxsize, int) or maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer")
+        self.__window = window
+        self.__maxsize = maxsize
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__results: "collections.OrderedDict[str, Tuple[float, Any]]" = collections.OrderedDict()
+        self.__in_flight: Dict[str, Future] = {}
+        self.__hits = 0
+        self.__sends = 0
+        self.__db: Any = None
+        self.__purged = float("-inf")
+        if path is not None:
+            # imported on first use, as asyncio below, to keep `import smsaero` fast
+            import sqlite3  # pylint: disable=import-outside-toplevel
+
+            self.__db = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=30)
+            self.__db.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                self.__db.execute(statement)
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Returns the key of a send made of its parts, e.g. the account, the selector and the data sent.
+        """
+        data = json.dumps(parts, default=str, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def get_window(self) -> float:
+        """
+        Returns the time in seconds a result is remembered for.
+        """
+        return self.__window
+
+    def get_hits(self) -> int:
+        """
+        Returns the number of sends answered with a remembered result, including the ones which waited.
+        """
+        return self.__hits
+
+    def get_sends(self) -> int:
+        """
+        Returns the number of sends made.
+        """
+        return self.__sends
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the remembered result of a send, or None if there is none within the window.
+        """
+        with self.__lock:
+            return self.__get(key, self.__clock())
+
+    def __get(self, key: str, now: float) -> Optional[Any]:
+        entry = self.__results.get(key)
+        if entry is None and self.__db is not None:
+            row = self.__db.execute("SELECT created, result FROM idempotency WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                entry = (row[0], json.loads(row[1]))
+                self.__remember(key, entry)
+        if entry is None or entry[0] + self.__window <= now:
+            return None
+        self.__results.move_to_end(key)
+        return entry[1]
+
+    def __remember(self, key: str, entry: Tuple[float, Any]) -> None:
+        self.__results[key] = entry
+        self.__results.move_to_end(key)
+        if len(self.__results) > self.__maxsize:
+            self.__results.popitem(last=False)
+
+    def put(self, key: str, result: Any) -> None:
+        """
+        Remembers the result of a send. The result must be JSON serializable when the store has a file.
+        """
+        now = self.__clock()
+        with self.__lock:
+            self.__remember(key, (now, result))
+            if self.__db is not None:
+                self.__db.execute(
+                    "INSERT OR REPLACE INTO idempotency (key, created, result) VALUES (?, ?, ?)",
+                    (key, now, json.dumps(result)),
+                )
+                # the expired results are ignored when read, so they are only deleted from time to time
+                if now - self.__purged >= PURGE_INTERVAL:
+                    self.__purged = now
+                    self.__db.execute("DELETE FROM idempotency WHERE created <= ?", (now - self.__window,))
+
+    def __claim(self, key: str) -> Tuple[Optional[Any], Future, bool]:
+        # the remembered result, or the future of the send in flight and whether the caller makes it
+        with self.__lock:
+            result = self.__get(key, self.__clock())
+            if result is not None:
+                self.__hits += 1
+                return result, Future(), False
+            future = self.__in_flight.get(key)
+            if future is not None:
+                return None, future, False
+            future = self.__in_flight[key] = Future()
+            self.__sends += 1
+            return None, future, True
+
+    def __finish(self, key: str, future: Future, result: Optional[Any]) -> None:
+        try:
+            if result is not None:
+                self.put(key, result)
+        finally:
+            with self.__lock:
+                del self.__in_flight[key]
+            # a waiter woken with None makes the send itself
+            future.set_result(result)
+
+    def run(self, key: str, send: Callable[[], Any]) -> Any:
+        """
+        Returns the remembered result of a send, or makes it with `send()` and remembers its result.
+        """
+        while True:
+            result, future, owner = self.__claim(key)
+            if result is not None:
+                return result
+            if not owner:
+                result = future.result()
+                if result is None:
+                    continue
+                with self.__lock:
+                    self.__hits += 1
+                return result
+            try:
+                result = send()
+            finally:
+                self.__finish(key, future, result)
+            return result
+
+    async def async_run(self, key: str, send: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns the remembered result of a send, or makes it by awaiting `send()` and remembers its result.
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        while True:
+            result, future, owner = self.__claim(key)
+            if result is not None:
+                return result
+            if not owner:
+                result = await asyncio.wrap_future(future)
+                if result is None:
+                    continue
+                with self.__lock:
+                    self.__hits += 1
+                return result
+            try:
+                result = await send()
+            finally:
+                self.__finish(key, future, result)
+            return result
+
+    def clear(self) -> None:
+        """
+        Forgets every result.
+        """
+        with self.__lock:
+            self.__results.clear()
+            if self.__db is not None:
+                self.__db.execute("DELETE FROM idempotency")
+
+    def close(self) -> None:
+        """
+        Closes the file of the store.
+        """
+        if self.__db is not None:
+            self.__db.close()
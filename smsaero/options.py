@@ -0,0 +1,142 @@
+"""
+This module provides the ClientOptions class which groups the optional collaborators of an SmsAero client:
+the gate health tracker, the protocol memory, the hedge and retry policies, the rate limiter,
+the phone number verdict cache, the idempotency store and the response cache.
+
+Example:
+    options = ClientOptions(retry_policy=RetryPolicy(max_attempts=5))
+    smsaero = SmsAero(email, api_key, options=options)
+"""
+
+from typing import Optional
+
+from smsaero.cache import ResponseCache
+from smsaero.gates import GateHealth, ProtocolMemory
+from smsaero.hedging import HedgePolicy
+from smsaero.idempotency import IdempotencyStore
+from smsaero.ratelimit import RateLimiter
+from smsaero.retry import RetryPolicy
+from smsaero.validation import PhoneValidationCache
+
+
+__all__ = [
+    "ClientOptions",
+]
+
+
+class ClientOptions:
+    """
+    Groups the optional collaborators of an SmsAero client. Every collaborator left out is not used,
+    except the gate health and the retry policy, which every client then builds for itself.
+
+    An instance may be shared by several clients: they then share the collaborators as well.
+    """
+
+    def __init__(
+        self,
+        gate_health: Optional[GateHealth] = None,
+        protocol_memory: Optional[ProtocolMemory] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        phone_cache: Optional[PhoneValidationCache] = None,
+        idempotency_store: Optional[IdempotencyStore] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ):
+        """
+        Initializes the ClientOptions class.
+
+        Parameters:
+        gate_health (GateHealth, optional): The gate health tracker deciding the order in which the gates are tried.
+            By default every client has its own.
+        protocol_memory (ProtocolMemory, optional): Remembers the gates which failed the TLS handshake and asks
+            them over HTTP until the memory expires. By default an SSL error switches to HTTP for one request only.
+        hedge_policy (HedgePolicy, optional): Sends the idempotent reads to the next gate as well when the first
+            gate is slow and takes the first answer. The gates are asked from a pool of `pool_maxsize` threads,
+            which `close()` shuts down. By default the requests are not hedged.
+        retry_policy (RetryPolicy, optional): Decides how many attempts are made over the gates and how long
+            to wait between the rounds. By default every gate is tried once.
+        rate_limiter (RateLimiter, optional): Limits the rate of the requests per selector; the requests over
+            the limit wait for their turn. By default the rate is not limited.
+        phone_cache (PhoneValidationCache, optional): Remembers the phone number verdicts of the phonenumbers
+            library. By default every number is parsed on every call.
+        idempotency_store (IdempotencyStore, optional): Remembers the results of `send_sms`, `viber_send` and
+            `send_telegram`, so a send repeated within its window is not made again. By default every send is made.
+        response_cache (ResponseCache, optional): Keeps the responses of the slowly changing reads such as `tariffs`
+            and `balance` for a time to live. By default every read is requested.
+
+        Raises:
+        TypeError: If a collaborator is not an instance of its class.
+        """
+        if gate_health is not None and not isinstance(gate_health, GateHealth):
+            raise TypeError("Gate health must be a GateHealth instance.")
+        if protocol_memory is not None and not isinstance(protocol_memory, ProtocolMemory):
+            raise TypeError("Protocol memory must be a ProtocolMemory instance.")
+        if hedge_policy is not None and not isinstance(hedge_policy, HedgePolicy):
+            raise TypeError("Hedge policy must be a HedgePolicy instance.")
+        if retry_policy is not None and not isinstance(retry_policy, RetryPolicy):
+            raise TypeError("Retry policy must be a RetryPolicy instance.")
+        if rate_limiter is not None and not isinstance(rate_limiter, RateLimiter):
+            raise TypeError("Rate limiter must be a RateLimiter instance.")
+        if phone_cache is not None and not isinstance(phone_cache, PhoneValidationCache):
+            raise TypeError("Phone cache must be a PhoneValidationCache instance.")
+        if idempotency_store is not None and not isinstance(idempotency_store, IdempotencyStore):
+            raise TypeError("Idempotency store must be an IdempotencyStore instance.")
+        if response_cache is not None and not isinstance(response_cache, ResponseCache):
+            raise TypeError("Response cache must be a ResponseCache instance.")
+        self.__health = gate_health
+        self.__protocols = protocol_memory
+        self.__hedge = hedge_policy
+        self.__retry = retry_policy
+        self.__limiter = rate_limiter
+        self.__phone_cache = phone_cache
+        self.__idempotency = idempotency_store
+        self.__cache = response_cache
+
+    def get_gate_health(self) -> Optional[GateHealth]:
+        """
+        Returns the gate health tracker, or None if every client builds its own.
+        """
+        return self.__health
+
+    def get_protocol_memory(self) -> Optional[ProtocolMemory]:
+        """
+        Returns the protocol memory, or None if SSL errors are not remembered between requests.
+        """
+        return self.__protocols
+
+    def get_hedge_policy(self) -> Optional[HedgePolicy]:
+        """
+        Returns the hedge policy, or None if the requests are not hedged.
+        """
+        return self.__hedge
+
+    def get_retry_policy(self) -> Optional[RetryPolicy]:
+        """
+        Returns the retry policy, or None if every client builds its own.
+        """
+        return self.__retry
+
+    def get_rate_limiter(self) -> Optional[RateLimiter]:
+        """
+        Returns the rate limiter, or None if the rate is not limited.
+        """
+        return self.__limiter
+
+    def get_phone_cache(self) -> Optional[PhoneValidationCache]:
+        """
+        Returns the cache of the phone number verdicts, or None if the verdicts are not cached.
+        """
+        return self.__phone_cache
+
+    def get_idempotency_store(self) -> Optional[IdempotencyStore]:
+        """
+        Returns the idempotency store, or None if the sends are not deduplicated.
+        """
+        return self.__idempotency
+
+    def get_response_cache(self) -> Optional[ResponseCache]:
+        """
+        Returns the response cache, or None if the responses are not cached.
+        """
+        return self.__cache
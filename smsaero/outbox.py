@@ -0,0 +1,414 @@
+"""
+This module provides the Outbox class, a durable queue of the messages to send.
+
+A message is written to an SQLite journal before it is sent and its state is updated after every step,
+so when the process dies the journal tells which messages were sent, which were not and which were
+being sent. The messages of the last kind are reconciled on restart with `sms_list`.
+
+The enqueues are group-committed: while one transaction is being written to disk, the messages
+enqueued meanwhile are collected and written together by the next one, so the cost of `fsync`
+is shared by all of them.
+"""
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import datetime
+import inspect
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from smsaero.errors import SmsAeroConnectionException, SmsAeroException
+
+
+__all__ = [
+    "OUTBOX_METHODS",
+    "PENDING",
+    "SENDING",
+    "SENT",
+    "FAILED",
+    "UNKNOWN",
+    "OutboxEntry",
+    "Outbox",
+]
+
+
+logger = logging.getLogger(__name__)
+
+
+# The SmsAero methods whose calls can be queued
+OUTBOX_METHODS = ("send_sms", "viber_send", "send_telegram")
+
+# The states of an entry
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+# The request was sent, but its outcome is not known and the message could not be reconciled
+UNKNOWN = "unknown"
+
+# The messages listed by sms_list up to this many seconds before the entry was enqueued count as sent by it
+RECONCILE_SLACK = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    method TEXT NOT NULL,
+    params TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_state ON outbox (state, id);
+"""
+
+
+_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def _encode(value: Any) -> Any:
+    # json.dumps default: the date_to_send of send_sms
+    # only the wall-clock time is kept, as send_sms does
+    if isinstance(value, datetime.datetime):
+        return {"$datetime": value.strftime(_DATETIME_FORMAT)}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(value: Dict) -> Any:
+    if set(value) == {"$datetime"}:
+        return datetime.datetime.strptime(value["$datetime"], _DATETIME_FORMAT)
+    return value
+
+
+class OutboxEntry(NamedTuple):
+    """
+    A message in the outbox.
+
+    Attributes:
+    id (int): The ID of the entry, in the enqueue order.
+    method (str): The SmsAero method, e.g. 'send_sms'.
+    params (Dict): The keyword arguments of the method.
+    state (str): PENDING, SENDING, SENT, FAILED or UNKNOWN.
+    attempts (int): The number of times the message was sent.
+    created (float): The Unix time the entry was enqueued at.
+    result (Any): The server's response, or the listed messages of a reconciled entry.
+    error (str, optional): The error of a failed entry.
+    """
+
+    id: int
+    method: str
+    params: Dict
+    state: str
+    attempts: int
+    created: float
+    result: Any
+    error: Optional[str]
+
+
+def _entry(row: Sequence[Any]) -> OutboxEntry:
+    # an entry from the columns id, method, params, state, attempts, created, result, error
+    params = json.loads(row[2], object_hook=_decode)
+    result = json.loads(row[6]) if row[6] is not None else None
+    return OutboxEntry(row[0], row[1], params, row[3], row[4], row[5], result, row[7])
+
+
+class _Ticket:  # pylint: disable=too-few-public-methods
+    # an enqueue waiting for its group commit
+    __slots__ = ("method", "params", "id", "error")
+
+    def __init__(self, method: str, params: str):
+        self.method = method
+        self.params = params
+        self.id: Optional[int] = None
+        self.error: Optional[BaseException] = None
+
+
+class Outbox:  # pylint: disable=too-many-instance-attributes
+    """
+    A durable queue of `send_sms`, `viber_send` and `send_telegram` calls, journaled in an SQLite file.
+
+    The queued messages are sent by worker threads (`start()`) or by `drain()`. They are sent
+    at the rate of the client's rate limiter, if it has one.
+
+    Example:
+        with Outbox(smsaero, "outbox.sqlite3") as outbox:
+            outbox.recover()
+            outbox.start(workers=4)
+            outbox.enqueue("send_sms", number=79031234567, text="Hello, World!")
+    """
+
+    def __init__(self, smsaero: Any, path: str, synchronous: str = "FULL", clock: Callable[[], float] = time.time):
+        """
+        Initializes the Outbox class.
+
+        Parameters:
+        smsaero (SmsAero): The client the messages are sent with.
+        path (str): The SQLite file of the journal. It is created if it does not exist.
+        synchronous (str, optional): The SQLite `synchronous` setting. 'FULL' syncs every commit to disk;
+            'NORMAL' may lose the last commits on a power failure, but not on a crash of the process.
+        clock (Callable[[], float], optional): The current Unix time.
+        """
+        if synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError("synchronous must be one of OFF, NORMAL, FULL and EXTRA")
+        self.__smsaero = smsaero
+        self.__clock = clock
+        self.__db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.__db.execute("PRAGMA journal_mode=WAL")
+        self.__db.execute(f"PRAGMA synchronous={synchronous.upper()}")
+        self.__db.executescript(_SCHEMA)
+        # the connection is shared by the threads, one statement or transaction at a time
+        self.__db_lock = threading.Lock()
+        self.__commit = threading.Condition()
+        self.__batch: List[_Ticket] = []
+        self.__committing = False
+        self.__commits = 0
+        self.__work = threading.Condition()
+        self.__stopping = False
+        self.__workers: List[threading.Thread] = []
+
+    # journal
+
+    def __execute(self, sql: str, args: Sequence[Any] = ()) -> List[Tuple]:
+        with self.__db_lock:
+            return self.__db.execute(sql, args).fetchall()
+
+    def __write_batch(self, batch: List[_Ticket]) -> None:
+        now = self.__clock()
+        with self.__db_lock:
+            self.__db.execute("BEGIN IMMEDIATE")
+            try:
+                for ticket in batch:
+                    cursor = self.__db.execute(
+                        "INSERT INTO outbox (method, params, state, created, updated) VALUES (?, ?, ?, ?, ?)",
+                        (ticket.method, ticket.params, PENDING, now, now),
+                    )
+                    ticket.id = cursor.lastrowid
+                self.__db.execute("COMMIT")
+            except BaseException:
+                self.__db.execute("ROLLBACK")
+                raise
+        self.__commits += 1
+
+    def enqueue(self, method: str, **params: Any) -> int:
+        """
+        Adds a message to the outbox and returns once it is written to the journal.
+
+        Parameters:
+        method (str): 'send_sms', 'viber_send' or 'send_telegram'.
+        **params: The arguments of the method, e.g. number=79031234567, text="Hello, World!".
+
+        Returns:
+        int: The ID of the entry.
+
+        Raises:
+        ValueError: If the method is not supported.
+        TypeError: If the arguments do not match the method or cannot be stored.
+        """
+        if method not in OUTBOX_METHODS:
+            raise ValueError(f"method must be one of {', '.join(OUTBOX_METHODS)}")
+        inspect.signature(getattr(self.__smsaero, method)).bind(**params)
+        ticket = _Ticket(method, json.dumps(params, default=_encode))
+        with self.__commit:
+            self.__batch.append(ticket)
+            while ticket.id is None and ticket.error is None:
+                if self.__committing:
+                    # another thread is writing; this ticket goes with the next batch
+                    self.__commit.wait()
+                    continue
+                self.__committing = True
+                batch, self.__batch = self.__batch, []
+                self.__commit.release()
+                try:
+                    self.__write_batch(batch)
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    for waiting in batch:
+                        waiting.error = e
+                finally:
+                    self.__commit.acquire()  # pylint: disable=consider-using-with
+                    self.__committing = False
+                    self.__commit.notify_all()
+        if ticket.error is not None:
+            raise ticket.error
+        with self.__work:
+            self.__work.notify()
+        return ticket.id  # type: ignore[return-value]
+
+    def get_commits(self) -> int:
+        """
+        Returns the number of transactions written by `enqueue()`, each one holding one or more messages.
+        """
+        return self.__commits
+
+    def get_entry(self, entry_id: int) -> Optional[OutboxEntry]:
+        """
+        Returns an entry, or None if there is no entry with the ID.
+        """
+        rows = self.__execute(
+            "SELECT id, method, params, state, attempts, created, result, error FROM outbox WHERE id = ?", (entry_id,)
+        )
+        return _entry(rows[0]) if rows else None
+
+    def get_counts(self) -> Dict[str, int]:
+        """
+        Returns the number of entries in every state.
+        """
+        return dict(self.__execute("SELECT state, COUNT(*) FROM outbox GROUP BY state"))  # type: ignore[arg-type]
+
+    def __set_state(self, entry_id: int, state: str, result: Any = None, error: Optional[str] = None) -> None:
+        self.__execute(
+            "UPDATE outbox SET state = ?, result = ?, error = ?, updated = ? WHERE id = ?",
+            (state, None if result is None else json.dumps(result), error, self.__clock(), entry_id),
+        )
+
+    def __claim(self) -> Optional[OutboxEntry]:
+        # marked as being sent, durably, before it is sent
+        with self.__db_lock:
+            self.__db.execute("BEGIN IMMEDIATE")
+            row = self.__db.execute("SELECT id FROM outbox WHERE state = ? ORDER BY id LIMIT 1", (PENDING,)).fetchone()
+            if row is not None:
+                self.__db.execute(
+                    "UPDATE outbox SET state = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                    (SENDING, self.__clock(), row[0]),
+                )
+            self.__db.execute("COMMIT")
+        return None if row is None else self.get_entry(row[0])
+
+    # sending
+
+    def __send(self, entry: OutboxEntry) -> None:
+        try:
+            result = getattr(self.__smsaero, entry.method)(**entry.params)
+        except SmsAeroConnectionException as e:
+            # no gate answered, but one of them may have received the request
+            logger.warning("Outbox entry %d: %s", entry.id, e)
+            self.__set_state(entry.id, UNKNOWN, error=str(e))
+        except (SmsAeroException, TypeError, ValueError) as e:
+            self.__set_state(entry.id, FAILED, error=str(e))
+        else:
+            self.__set_state(entry.id, SENT, result)
+
+    def drain(self, limit: Optional[int] = None) -> int:
+        """
+        Sends the pending messages in the calling thread.
+
+        Parameters:
+        limit (int, optional): The maximum number of messages to send. By default every pending message is sent.
+
+        Returns:
+        int: The number of messages sent or failed.
+        """
+        sent = 0
+        while limit is None or sent < limit:
+            entry = self.__claim()
+            if entry is None:
+                break
+            self.__send(entry)
+            sent += 1
+        return sent
+
+    def __work_loop(self) -> None:
+        while not self.__stopping:
+            if self.drain(1):
+                continue
+            with self.__work:
+                if not self.__stopping:
+                    # woken up by enqueue(); the timeout covers the entries added by other processes
+                    self.__work.wait(1.0)
+
+    def start(self, workers: int = 1) -> "Outbox":
+        """
+        Starts worker threads which send the pending messages.
+
+        Parameters:
+        workers (int, optional): The number of threads, i.e. of messages sent at once.
+        """
+        if not isinstance(workers, int) or workers <= 0:
+            raise ValueError("workers must be a positive integer")
+        self.__stopping = False
+        for number in range(workers):
+            worker = threading.Thread(target=self.__work_loop, name=f"smsaero-outbox-{number}", daemon=True)
+            worker.start()
+            self.__workers.append(worker)
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops the workers once they have finished the messages they are sending.
+        """
+        with self.__work:
+            self.__stopping = True
+            self.__work.notify_all()
+        for worker in self.__workers:
+            worker.join()
+        self.__workers = []
+
+    def close(self) -> None:
+        """
+        Stops the workers and closes the journal.
+        """
+        self.stop()
+        self.__db.close()
+
+    def __enter__(self) -> "Outbox":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # recovery
+
+    def __listed_numbers(self, params: Dict, created: float) -> List[int]:
+        numbers = params["number"] if isinstance(params["number"], list) else [params["number"]]
+        listed = set()
+        for message in self.__smsaero.iter_sms_list(numbers, params["text"]):
+            if float(message.get("dateCreate") or 0) >= created - RECONCILE_SLACK:
+                listed.add(int(message["number"]))
+        return [number for number in numbers if number in listed]
+
+    def recover(self, resend_unknown: bool = False) -> Dict[int, str]:
+        """
+        Reconciles the entries which were being sent when the process stopped, and the ones in UNKNOWN state.
+
+        An `send_sms` entry is SENT if `sms_list` lists its message for every number. If it is listed for none,
+        the entry is PENDING again; if it is listed for some numbers, it is PENDING again for the other ones.
+        The `viber_send` and `send_telegram` calls cannot be looked up: they are set to UNKNOWN,
+        or to PENDING with `resend_unknown`.
+
+        Call it before `start()`, as it does not expect the entries to change meanwhile.
+
+        Parameters:
+        resend_unknown (bool, optional): Send again the messages which cannot be looked up.
+
+        Returns:
+        Dict[int, str]: The new state of every reconciled entry.
+        """
+        rows = self.__execute(
+            "SELECT id, method, params, state, attempts, created, result, error FROM outbox"
+            " WHERE state IN (?, ?) ORDER BY id",
+            (SENDING, UNKNOWN),
+        )
+        states: Dict[int, str] = {}
+        for entry in map(_entry, rows):
+            entry_id = entry.id
+            if entry.method != "send_sms" or not entry.params.get("number"):
+                states[entry_id] = PENDING if resend_unknown else UNKNOWN
+                self.__set_state(entry_id, states[entry_id], error=entry.error)
+                continue
+            listed = self.__listed_numbers(entry.params, entry.created)
+            numbers = entry.params["number"] if isinstance(entry.params["number"], list) else [entry.params["number"]]
+            if len(listed) == len(numbers):
+                states[entry_id] = SENT
+                self.__set_state(entry_id, SENT, {"reconciled": listed})
+                continue
+            states[entry_id] = PENDING
+            if listed:
+                params = dict(entry.params, number=[number for number in numbers if number not in listed])
+                params_json = json.dumps(params, default=_encode)
+                self.__execute("UPDATE outbox SET params = ? WHERE id = ?", (params_json, entry_id))
+            self.__set_state(entry_id, PENDING)
+        return states
@@ -0,0 +1,519 @@
+"""
+This module provides iterators over the records of the paginated list endpoints.
+
+A list method such as `sms_list` returns one page: the records keyed "0", "1", ... and the `links`
+to the other pages. The iterators request the pages one by one and yield the records, so only one page
+is held in memory. With prefetching the next page is requested while the caller processes the current one.
+
+For exports of whole accounts `fetch_pages()` reads the number of pages from the first page
+and requests the following ones concurrently, still yielding them in order.
+
+PaginationMixin adds these iterators and the exports to SmsAero as its `iter_*` and `export*` methods.
+"""
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+import collections
+import math
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from smsaero.export import FileExporter
+
+
+__all__ = [
+    "PaginationMixin",
+    "page_records",
+    "has_next_page",
+    "last_page_number",
+    "iter_pages",
+    "iter_records",
+    "async_iter_pages",
+    "async_iter_records",
+    "fetch_pages",
+    "deliver_page",
+    "async_fetch_pages",
+]
+
+
+def page_records(page: Any) -> List[Dict]:
+    """
+    Returns the records of a page in their order on the page.
+
+    Parameters:
+    page (Any): The data of a list response. An empty list is returned by the API for an empty page.
+    """
+    if not isinstance(page, dict):
+        return []
+    keys = sorted((key for key in page if str(key).isdigit()), key=int)
+    return [page[key] for key in keys]
+
+
+def _link_page(link: Any) -> Optional[int]:
+    # "/v2/sms/list?page=3" -> 3
+    if not isinstance(link, str):
+        return None
+    values = parse_qs(urlsplit(link).query).get("page")
+    return int(values[0]) if values and values[0].isdigit() else None
+
+
+def has_next_page(page: Any, number: int) -> bool:
+    """
+    Tells from the links of a page whether a page follows it.
+
+    Parameters:
+    page (Any): The data of a list response.
+    number (int): The number of the page, starting from 1.
+
+    Returns:
+    bool: True if the page has records and links to a next page, or to a last page after it.
+    """
+    if not page_records(page):
+        return False
+    links = page.get("links")
+    if not isinstance(links, dict):
+        return False
+    if links.get("next"):
+        return True
+    last = _link_page(links.get("last"))
+    return last is not None and last > number
+
+
+def last_page_number(page: Any) -> Optional[int]:
+    """
+    Tells the number of pages from a page: its `last` link, or else its `totalCount` and its size.
+
+    Parameters:
+    page (Any): The data of a list response.
+
+    Returns:
+    int, optional: The number of the last page, or None if the page does not tell.
+    """
+    records = page_records(page)
+    if not records:
+        return None
+    links = page.get("links")
+    last = _link_page(links.get("last")) if isinstance(links, dict) else None
+    if last is not None:
+        return last
+    total = str(page.get("totalCount", ""))
+    return math.ceil(int(total) / len(records)) if total.isdigit() else None
+
+
+def iter_pages(fetch: Callable[[int], Any], prefetch: bool = False) -> Iterator[Any]:
+    """
+    Requests the pages one by one, from the first one until a page without a next one.
+
+    Parameters:
+    fetch (Callable[[int], Any]): Returns the data of a page, e.g. `lambda page: smsaero.sms_list(page=page)`.
+    prefetch (bool, optional): Request the next page in a background thread while the current one is consumed.
+
+    Returns:
+    Iterator[Any]: The data of every page.
+    """
+    number = 1
+    if not prefetch:
+        while True:
+            page = fetch(number)
+            yield page
+            if not has_next_page(page, number):
+                return
+            number += 1
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="smsaero-prefetch") as executor:
+        future: Optional[Future] = executor.submit(fetch, number)
+        try:
+            while future is not None:
+                page = future.result()
+                future = executor.submit(fetch, number + 1) if has_next_page(page, number) else None
+                yield page
+                number += 1
+        finally:
+            # the caller stopped early: the prefetched page is not needed
+            if future is not None:
+                future.cancel()
+
+
+def iter_records(fetch: Callable[[int], Any], prefetch: bool = False) -> Iterator[Dict]:
+    """
+    Yields the records of every page requested by `iter_pages()`.
+    """
+    for page in iter_pages(fetch, prefetch):
+        yield from page_records(page)
+
+
+async def async_iter_pages(fetch: Callable[[int], Awaitable[Any]], prefetch: bool = False) -> AsyncIterator[Any]:
+    """
+    The asyncio variant of `iter_pages()`. The next page is prefetched by a task.
+
+    Parameters:
+    fetch (Callable[[int], Awaitable[Any]]): Coroutine function that returns the data of a page.
+    prefetch (bool, optional): Request the next page while the current one is consumed.
+
+    Returns:
+    AsyncIterator[Any]: The data of every page.
+    """
+    # imported here, so the sync client does not pay for importing asyncio
+    import asyncio  # pylint: disable=import-outside-toplevel
+
+    number = 1
+    task: Optional[asyncio.Future] = None
+    page = await fetch(number)
+    try:
+        while True:
+            following = has_next_page(page, number)
+            if prefetch and following:
+                task = asyncio.ensure_future(fetch(number + 1))
+            yield page
+            if not following:
+                return
+            number += 1
+            page = await (task if task is not None else fetch(number))
+            task = None
+    finally:
+        if task is not None:
+            task.cancel()
+
+
+async def async_iter_records(fetch: Callable[[int], Awaitable[Any]], prefetch: bool = False) -> AsyncIterator[Dict]:
+    """
+    Yields the records of every page requested by `async_iter_pages()`.
+    """
+    async for page in async_iter_pages(fetch, prefetch):
+        for record in page_records(page):
+            yield record
+
+
+def deliver_page(sink: Callable[[int, List[Dict]], Any], number: int, page: Any) -> int:
+    """
+    Passes the records of a page to the sink of an export and returns their number.
+    """
+    records = page_records(page)
+    sink(number, records)
+    return len(records)
+
+
+def fetch_pages(fetch: Callable[[int], Any], concurrency: int, start: int = 1) -> Iterator[Tuple[int, Any]]:
+    """
+    Requests the pages with a pool of threads and yields them in order.
+
+    The first page tells the number of pages, then up to `concurrency` of the following pages are requested
+    at once. A page answered early is held until the pages before it are yielded, so at most
+    `concurrency` pages are in memory. If the first page does not tell the number of pages,
+    the following ones are requested one by one as by `iter_pages()`.
+
+    Parameters:
+    fetch (Callable[[int], Any]): Returns the data of a page, e.g. `lambda page: smsaero.contact_list(page=page)`.
+    concurrency (int): The maximum number of requests in flight.
+    start (int, optional): The number of the first page, e.g. to resume an interrupted export.
+
+    Returns:
+    Iterator[Tuple[int, Any]]: The number and the data of every page.
+    """
+    page = fetch(start)
+    yield start, page
+    last = last_page_number(page)
+    if last is None:
+        number = start
+        while has_next_page(page, number):
+            number += 1
+            page = fetch(number)
+            yield number, page
+        return
+
+    pending: Deque[Tuple[int, Future]] = collections.deque()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="smsaero-export") as executor:
+        try:
+            for number in range(start + 1, last + 1):
+                pending.append((number, executor.submit(fetch, number)))
+                if len(pending) >= concurrency:
+                    ready, future = pending.popleft()
+                    yield ready, future.result()
+            while pending:
+                ready, future = pending.popleft()
+                yield ready, future.result()
+        finally:
+            # do not request the remaining pages when the consumer stops early
+            for _, future in pending:
+                future.cancel()
+
+
+async def async_fetch_pages(
+    fetch: Callable[[int], Awaitable[Any]], concurrency: int, start: int = 1
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    The asyncio variant of `fetch_pages()`: the pages are requested by up to `concurrency` tasks.
+    """
+    # imported here, so the sync client does not pay for importing asyncio
+    import asyncio  # pylint: disable=import-outside-toplevel
+
+    page = await fetch(start)
+    yield start, page
+    last = last_page_number(page)
+    if last is None:
+        number = start
+        while has_next_page(page, number):
+            number += 1
+            page = await fetch(number)
+            yield number, page
+        return
+
+    pending: Deque[Tuple[int, asyncio.Future]] = collections.deque()
+    try:
+        for number in range(start + 1, last + 1):
+            pending.append((number, asyncio.ensure_future(fetch(number))))
+            if len(pending) >= concurrency:
+                ready, task = pending.popleft()
+                yield ready, await task
+        while pending:
+            ready, task = pending.popleft()
+            yield ready, await task
+    finally:
+        for _, task in pending:
+            task.cancel()
+
+
+class PaginationMixin:
+    """
+    Adds `paginate()`, the `iter_*` variants of the list methods, `export()` and `export_to_file()` to SmsAero.
+
+    The list methods themselves are defined by the client; the iterators request their pages.
+    """
+
+    sms_list: Callable[..., Dict]
+    sms_list_validate: Callable[..., None]
+    phone_validation: Callable[..., None]
+    sign_list: Callable[..., Dict]
+    group_list: Callable[..., Dict]
+    contact_list: Callable[..., Dict]
+    contact_list_validate: Callable[..., None]
+    blacklist_list: Callable[..., Dict]
+    viber_list: Callable[..., Dict]
+    viber_statistics: Callable[..., Dict]
+
+    def paginate(self, fetch: Callable[[int], Dict], prefetch: bool = False) -> Iterator[Dict]:
+        """
+        Iterates over the records of every page of a list method, requesting the pages one by one
+        until the page whose `links` point to no further page.
+
+        Parameters:
+        fetch (Callable[[int], Dict]): Returns a page, e.g. `lambda page: smsaero.sms_list(page=page)`.
+        prefetch (bool, optional): Request the next page in a background thread while the current one is consumed.
+
+        Returns:
+        Iterator[Dict]: The records, in the order of the pages.
+        """
+        return iter_records(fetch, prefetch)
+
+    def export(
+        self, fetch: Callable[[int], Dict], sink: Callable[[int, List[Dict]], Any], concurrency: int = 8, start: int = 1
+    ) -> int:
+        """
+        Exports every page of a list method, requesting up to `concurrency` pages at once.
+
+        The number of pages is read from the `links` (or the `totalCount`) of the first page. The pages are
+        passed to `sink` in order as soon as they and the pages before them are received, so at most
+        `concurrency` pages are held in memory. The records added or removed during the export may shift
+        between the pages, as with any paginated read.
+
+        Parameters:
+        fetch (Callable[[int], Dict]): Returns a page, e.g. `lambda page: smsaero.contact_list(page=page)`.
+        sink (Callable[[int, List[Dict]], Any]): Receives the number of every page and its records.
+        concurrency (int, optional): The maximum number of requests in flight.
+        start (int, optional): The number of the first page to export, e.g. to resume an interrupted export.
+
+        Returns:
+        int: The number of records exported.
+
+        Example:
+        with open("contacts.jsonl", "w") as file:
+            smsaero.export(
+                lambda page: smsaero.contact_list(page=page),
+                lambda number, records: file.writelines(json.dumps(record) + "\\n" for record in records),
+            )
+        """
+        self.export_validate(concurrency, start)
+        exported = 0
+        for number, page in fetch_pages(fetch, concurrency, start):
+            exported += deliver_page(sink, number, page)
+        return exported
+
+    def export_to_file(self, fetch: Callable[[int], Dict], exporter: FileExporter, concurrency: int = 8) -> int:
+        """
+        Exports every page of a list method to a file, resuming from the exporter's checkpoint.
+
+        Parameters:
+        fetch (Callable[[int], Dict]): Returns a page, e.g. `lambda page: smsaero.sms_list(page=page)`.
+        exporter (FileExporter): The file, e.g. `NdjsonExporter("sms.jsonl")` or `CsvExporter("sms.csv")`.
+        concurrency (int, optional): The maximum number of requests in flight.
+
+        Returns:
+        int: The number of records exported by this call.
+
+        Example:
+        smsaero.export_to_file(lambda page: smsaero.sms_list(page=page), NdjsonExporter("sms-2024-06-01.jsonl"))
+        """
+        self.export_to_file_validate(exporter)
+        with exporter:
+            return self.export(fetch, exporter.write_page, concurrency, exporter.get_next_page())
+
+    def iter_sms_list(
+        self,
+        number: Optional[Union[int, List[int]]] = None,
+        text: Optional[str] = None,
+        prefetch: bool = False,
+    ) -> Iterator[Dict]:
+        """
+        Iterates over the SMS messages of every page of `sms_list`.
+
+        Parameters:
+        number (Union[int, List[int]], optional): The recipient's phone number or a list of phone numbers.
+        text (str, optional): The text of the message.
+        prefetch (bool, optional): Request the next page while the current one is consumed.
+
+        Returns:
+        Iterator[Dict]: The messages, one page in memory at a time.
+
+        Example:
+        for message in smsaero.iter_sms_list(prefetch=True):
+            print(message["id"], message["extendStatus"])
+        """
+        self.sms_list_validate(number, text)
+        return self.paginate(lambda page: self.sms_list(number, text, page), prefetch)
+
+    def iter_sign_list(self, prefetch: bool = False) -> Iterator[Dict]:
+        """
+        Iterates over the signatures of every page of `sign_list`.
+
+        Parameters:
+        prefetch (bool, optional): Request the next page while the current one is consumed.
+
+        Returns:
+        Iterator[Dict]: The signatures.
+        """
+        return self.paginate(self.sign_list, prefetch)
+
+    def iter_group_list(self, prefetch: bool = False) -> Iterator[Dict]:
+        """
+        Iterates over the groups of every page of `group_list`.
+
+        Parameters:
+        prefetch (bool, optional): Request the next page while the current one is consumed.
+
+        Returns:
+        Iterator[Dict]: The groups.
+        """
+        return self.paginate(self.group_list, prefetch)
+
+    def iter_contact_list(
+        self,
+        number: Optional[Union[int, List[int]]] = None,
+        group_id: Optional[int] = None,
+        birthday: Optional[str] = None,
+        sex: Optional[str] = None,
+        operator: Optional[str] = None,
+        last_name: Optional[str] = None,
+        first_name: Optional[str] = None,
+        surname: Optional[str] = None,
+        prefetch: bool = False,
+    ) -> Iterator[Dict]:
+        """
+        Iterates over the contacts of every page of `contact_list`. The filters are the ones of `contact_list`.
+
+        Parameters:
+        prefetch (bool, optional): Request the next page while the current one is consumed.
+
+        Returns:
+        Iterator[Dict]: The contacts.
+        """
+        self.contact_list_validate(number, group_id, birthday, sex, operator, last_name, first_name, surname)
+        return self.paginate(
+            lambda page: self.contact_list(
+                number, group_id, birthday, sex, operator, last_name, first_name, surname, page
+            ),
+            prefetch,
+        )
+
+    def iter_blacklist_list(
+        self, number: Optional[Union[int, List[int]]] = None, prefetch: bool = False
+    ) -> Iterator[Dict]:
+        """
+        Iterates over the blacklisted numbers of every page of `blacklist_list`.
+
+        Parameters:
+        number (Optional[Union[int, List[int]]], optional): The number or a list of numbers to be retrieved.
+        prefetch (bool, optional): Request the next page while the current one is consumed.
+
+        Returns:
+        Iterator[Dict]: The blacklisted numbers.
+
+        Raises:
+        TypeError: If the number has an incorrect type.
+        ValueError: If the number has an incorrect value.
+        """
+        if number:
+            self.phone_validation(number)
+        return self.paginate(lambda page: self.blacklist_list(number, page), prefetch)
+
+    def iter_viber_list(self, prefetch: bool = False) -> Iterator[Dict]:
+        """
+        Iterates over the Viber messages of every page of `viber_list`.
+
+        Parameters:
+        prefetch (bool, optional): Request the next page while the current one is consumed.
+
+        Returns:
+        Iterator[Dict]: The Viber messages.
+        """
+        return self.paginate(self.viber_list, prefetch)
+
+    def iter_viber_statistics(self, sending_id: int, prefetch: bool = False) -> Iterator[Dict]:
+        """
+        Iterates over the recipients of every page of `viber_statistics`.
+
+        Parameters:
+        sending_id (int): The ID of the Viber message.
+        prefetch (bool, optional): Request the next page while the current one is consumed.
+
+        Returns:
+        Iterator[Dict]: The statistics of every recipient.
+
+        Raises:
+        TypeError, ValueError: If the ID is not an integer.
+        """
+        sending_id = int(sending_id)
+        return self.paginate(lambda page: self.viber_statistics(sending_id, page), prefetch)
+
+    @staticmethod
+    def export_validate(concurrency: int, start: int) -> None:
+        """
+        Validates the parameters for the export method.
+
+        Parameters:
+        concurrency (int): The maximum number of requests in flight.
+        start (int): The number of the first page to export.
+
+        Raises:
+        TypeError: If any of the parameters have an incorrect type.
+        ValueError: If any of the parameters have an incorrect value.
+        """
+        if not isinstance(concurrency, int):
+            raise TypeError("concurrency must be an integer")
+        if concurrency <= 0:
+            raise ValueError("concurrency must be greater than 0")
+        if not isinstance(start, int):
+            raise TypeError("start must be an integer")
+        if start <= 0:
+            raise ValueError("start must be greater than 0")
+
+    @staticmethod
+    def export_to_file_validate(exporter: FileExporter) -> None:
+        """
+        Validates the exporter of the export_to_file method.
+
+        Raises:
+        TypeError: If the exporter is not a FileExporter.
+        """
+        if not isinstance(exporter, FileExporter):
+            raise TypeError("exporter must be a FileExporter instance")
@@ -0,0 +1,209 @@
+"""
+This module provides a client-side rate limiter for the SmsAero client.
+
+Every API selector (`sms/send`, `hlr/check`, ...) can have its own token bucket. A request takes a token
+and waits if the bucket is empty, so bursts are smoothed to the configured rate instead of being rejected
+by the server. The FileTokenBucket keeps its state in a locked file, so the worker processes on one host
+share a single budget.
+"""
+
+from typing import Dict, Mapping, Optional, Tuple
+
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+
+__all__ = [
+    "TokenBucket",
+    "FileTokenBucket",
+    "RateLimiter",
+]
+
+
+# The state of a shared bucket: the available tokens and the time they were counted at
+_STATE = struct.Struct("dd")
+
+
+class TokenBucket:
+    """
+    A token bucket shared by the threads of one process.
+
+    The bucket holds at most `capacity` tokens and is refilled with `rate` tokens per second.
+    A token taken from an empty bucket is borrowed from the future, and the caller is told how long to wait,
+    so the callers are served in turn at the configured rate.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initializes the TokenBucket class.
+
+        Parameters:
+        rate (float): The number of requests per second.
+        capacity (float, optional): The largest burst sent without waiting. Defaults to `rate`, i.e. one second,
+            and to 1 for the rates below one request per second.
+        """
+        capacity = max(rate, 1) if capacity is None else capacity
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate must be positive and capacity must be at least 1")
+        self.__rate = rate
+        self.__capacity = capacity
+        self.__lock = threading.Lock()
+        self.__state: Optional[Tuple[float, float]] = None
+
+    def get_rate(self) -> float:
+        """
+        Returns the number of requests per second.
+        """
+        return self.__rate
+
+    def get_capacity(self) -> float:
+        """
+        Returns the largest burst sent without waiting.
+        """
+        return self.__capacity
+
+    def take(
+        self, state: Optional[Tuple[float, float]], now: float, tokens: float
+    ) -> Tuple[Tuple[float, float], float]:
+        """
+        Takes tokens from the bucket state.
+
+        Parameters:
+        state (Tuple[float, float], optional): The available tokens and the time they were counted at.
+            None for a full bucket.
+        now (float): The current time in seconds.
+        tokens (float): The number of tokens to take.
+
+        Returns:
+        Tuple[Tuple[float, float], float]: The new state and the time in seconds to wait before sending.
+        """
+        available, updated = state if state is not None else (self.__capacity, now)
+        available = min(self.__capacity, available + max(now - updated, 0.0) * self.__rate) - tokens
+        return (available, now), max(-available / self.__rate, 0.0)
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Takes tokens from the bucket.
+
+        Parameters:
+        tokens (float, optional): The number of tokens to take.
+
+        Returns:
+        float: The time in seconds to wait before sending the request.
+        """
+        with self.__lock:
+            self.__state, delay = self.take(self.__state, time.monotonic(), tokens)
+        return delay
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    A token bucket shared by the processes of one host through a locked file.
+
+    Every process creating a FileTokenBucket with the same path takes its tokens from the same bucket.
+    Requires `fcntl`, i.e. a POSIX system.
+    """
+
+    def __init__(self, path: str, rate: float, capacity: Optional[float] = None):
+        """
+        Initializes the FileTokenBucket class.
+
+        Parameters:
+        path (str): The file holding the bucket state. It is created if it does not exist.
+        rate (float): The number of requests per second.
+        capacity (float, optional): The largest burst sent without waiting. Defaults to `rate`, i.e. one second,
+            and to 1 for the rates below one request per second.
+        """
+        if fcntl is None:  # pragma: no cover
+            raise RuntimeError("FileTokenBucket requires fcntl")
+        super().__init__(rate, capacity)
+        self.__path = path
+
+    def get_path(self) -> str:
+        """
+        Returns the file holding the bucket state.
+        """
+        return self.__path
+
+    def reserve(self, tokens: float = 1) -> float:
+        fd = os.open(self.__path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            data = os.pread(fd, _STATE.size, 0)
+            # the wall clock, as the monotonic clocks of the processes are not comparable everywhere
+            state, delay = self.take(_STATE.unpack(data) if len(data) == _STATE.size else None, time.time(), tokens)
+            os.pwrite(fd, _STATE.pack(*state), 0)
+        finally:
+            os.close(fd)
+        return delay
+
+
+class RateLimiter:
+    """
+    Maps the API selectors to their token buckets.
+
+    Example:
+        limiter = RateLimiter({"sms/send": TokenBucket(rate=10), "hlr/check": TokenBucket(rate=2)})
+        smsaero = SmsAero(email, api_key, options=ClientOptions(rate_limiter=limiter))
+    """
+
+    def __init__(self, limits: Mapping[str, TokenBucket], default: Optional[TokenBucket] = None):
+        """
+        Initializes the RateLimiter class.
+
+        Parameters:
+        limits (Mapping[str, TokenBucket]): The bucket of every limited selector, e.g. 'sms/send'.
+            Several selectors may share one bucket.
+        default (TokenBucket, optional): The bucket of the other selectors. By default they are not limited.
+        """
+        if not all(isinstance(bucket, TokenBucket) for bucket in limits.values()):
+            raise TypeError("Limits must map selectors to TokenBucket instances.")
+        if default is not None and not isinstance(default, TokenBucket):
+            raise TypeError("Default must be a TokenBucket instance.")
+        self.__limits: Dict[str, TokenBucket] = dict(limits)
+        self.__default = default
+        self.__lock = threading.Lock()
+        self.__waits = 0
+        self.__waited = 0.0
+
+    def get_bucket(self, selector: str) -> Optional[TokenBucket]:
+        """
+        Returns the bucket of the selector, or None if the selector is not limited.
+        """
+        return self.__limits.get(selector, self.__default)
+
+    def reserve(self, selector: str) -> float:
+        """
+        Takes a token for a request to the selector.
+
+        Returns:
+        float: The time in seconds to wait before sending the request.
+        """
+        bucket = self.get_bucket(selector)
+        if bucket is None:
+            return 0.0
+        delay = bucket.reserve()
+        if delay:
+            with self.__lock:
+                self.__waits += 1
+                self.__waited += delay
+        return delay
+
+    def get_waits(self) -> int:
+        """
+        Returns the number of requests which had to wait.
+        """
+        return self.__waits
+
+    def get_waited(self) -> float:
+        """
+        Returns the total time in seconds the requests waited.
+        """
+        return self.__waited
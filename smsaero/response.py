@@ -0,0 +1,43 @@
+"""
+This module provides the RequestResult and Attempt classes which describe the requests made by the SmsAero client.
+"""
+
+from typing import Any, NamedTuple
+
+
+__all__ = [
+    "Attempt",
+    "RequestResult",
+]
+
+
+class RequestResult(NamedTuple):
+    """
+    The metadata of a request to the SmsAero API.
+
+    Attributes:
+    content (Any): The decoded JSON body of the response.
+    status_code (int): The HTTP status code of the response.
+    gate (str): The gate which answered the request, e.g. '@gate.smsaero.ru/v2/'.
+    latency (float): The time in seconds between sending the request and decoding the response.
+    """
+
+    content: Any
+    status_code: int
+    gate: str
+    latency: float
+
+
+class Attempt(NamedTuple):
+    """
+    A failed attempt to send a request to one gate.
+
+    Attributes:
+    gate (str): The gate which was asked, e.g. '@gate.smsaero.ru/v2/'.
+    error (Exception): The error raised by the transport.
+    elapsed (float): The time in seconds the attempt took.
+    """
+
+    gate: str
+    error: Exception
+    elapsed: float
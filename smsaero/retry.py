@@ -0,0 +1,247 @@
+"""
+This module provides the RetryPolicy and RetryBudget classes which decide how many times
+and how fast a failed request is sent again.
+
+The attempts go round the gates: a failed gate is replaced by the next one right away,
+and a new round over the gates starts after an exponential backoff with jitter.
+The retry budget limits the retries to a share of the requests, so an outage does not turn
+every request into a burst of retries.
+
+The API has no idempotency key, so a write which may have reached a gate, e.g. after a read timeout,
+is not sent again: only the errors raised before the request was sent are retried for the writes.
+"""
+
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+import itertools
+import random
+import threading
+
+from requests import exceptions
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+
+__all__ = [
+    "NON_RETRYABLE_ERRORS",
+    "WRITE_SELECTORS",
+    "RetryBudget",
+    "RetryPolicy",
+    "is_connect_error",
+]
+
+
+# Errors caused by the request itself, which no gate or retry can fix
+NON_RETRYABLE_ERRORS: Tuple[type, ...] = (
+    exceptions.InvalidURL,
+    exceptions.InvalidSchema,
+    exceptions.MissingSchema,
+    exceptions.InvalidHeader,
+)
+
+# Selectors of the methods which send a message or move money, so a repeated request is executed twice
+WRITE_SELECTORS = frozenset(
+    [
+        "sms/send",
+        "sms/testsend",
+        "viber/send",
+        "telegram/send",
+        "balance/add",
+    ]
+)
+
+
+def is_connect_error(error: Exception) -> bool:
+    """
+    Returns True if the requests error was raised while connecting to the gate, before the request was sent.
+    """
+    if isinstance(error, (exceptions.ConnectTimeout, exceptions.SSLError, exceptions.ProxyError)):
+        return True
+    if not isinstance(error, exceptions.ConnectionError) or not error.args:
+        return False
+    # requests wraps the urllib3 error, which wraps the cause of the failure
+    reason = getattr(error.args[0], "reason", error.args[0])
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class RetryBudget:
+    """
+    Limits the retries to a share of the requests.
+
+    Every request deposits `ratio` tokens and every retry withdraws one. The budget starts full,
+    so a few retries are always possible while the traffic is low.
+
+    An instance is thread-safe and may be shared by several SmsAero clients.
+    """
+
+    def __init__(self, ratio: float = 0.2, reserve: float = 10.0):
+        """
+        Initializes the RetryBudget class.
+
+        Parameters:
+        ratio (float, optional): The number of retries allowed per request.
+        reserve (float, optional): The maximum number of tokens saved for bursts of retries.
+        """
+        if ratio < 0 or reserve < 1:
+            raise ValueError("ratio must not be negative and reserve must be at least 1")
+        self.__ratio = ratio
+        self.__reserve = reserve
+        self.__tokens = reserve
+        self.__lock = threading.Lock()
+
+    def deposit(self) -> None:
+        """
+        Records a request.
+        """
+        with self.__lock:
+            self.__tokens = min(self.__tokens + self.__ratio, self.__reserve)
+
+    def withdraw(self) -> bool:
+        """
+        Takes the token for one retry. Returns False if the budget is exhausted.
+        """
+        with self.__lock:
+            if self.__tokens < 1:
+                return False
+            self.__tokens -= 1
+            return True
+
+    def get_tokens(self) -> float:
+        """
+        Returns the number of retries currently available.
+        """
+        return self.__tokens
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed attempt is retried and how long to wait before the next round over the gates.
+
+    The default policy of SmsAero is `RetryPolicy(max_attempts=None)`: every gate is tried once and there is no backoff.
+    """
+
+    def __init__(
+        self,
+        max_attempts: Optional[int] = 6,
+        backoff: float = 0.2,
+        multiplier: float = 2.0,
+        max_backoff: float = 5.0,
+        jitter: float = 1.0,
+        retryable: Optional[Callable[[Exception, str], bool]] = None,
+        budget: Optional[RetryBudget] = None,
+        rng: Callable[[], float] = random.random,
+    ):
+        """
+        Initializes the RetryPolicy class.
+
+        Parameters:
+        max_attempts (int, optional): The maximum number of attempts over all gates.
+            None means one attempt per gate.
+        backoff (float, optional): The wait in seconds before the second round over the gates.
+        multiplier (float, optional): The factor by which the wait grows with every round.
+        max_backoff (float, optional): The upper limit of the wait in seconds.
+        jitter (float, optional): The random share of the wait, from 0 to 1. 1 means "full jitter":
+            the wait is uniformly distributed between 0 and the backoff.
+        retryable (Callable[[Exception, str], bool], optional): Tells whether an error of a request
+            to the selector is worth a retry. By default every transport error is, except the ones
+            in `NON_RETRYABLE_ERRORS`. The writes in `WRITE_SELECTORS` are retried only if it is safe anyway.
+        budget (RetryBudget, optional): The budget limiting the retries. By default the retries are unlimited.
+        rng (Callable[[], float], optional): The random number generator for the jitter.
+        """
+        if max_attempts is not None and max_attempts <= 0:
+            raise ValueError("max_attempts must be a positive integer")
+        if backoff < 0 or multiplier < 1 or max_backoff < 0:
+            raise ValueError("backoff and max_backoff must not be negative and multiplier must be at least 1")
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter must be between 0 and 1")
+        self.__max_attempts = max_attempts
+        self.__backoff = backoff
+        self.__multiplier = multiplier
+        self.__max_backoff = max_backoff
+        self.__jitter = jitter
+        self.__retryable = retryable
+        self.__budget = budget
+        self.__rng = rng
+
+    def get_budget(self) -> Optional[RetryBudget]:
+        """
+        Returns the retry budget, or None if the retries are unlimited.
+        """
+        return self.__budget
+
+    def get_max_attempts(self, gate_count: int) -> int:
+        """
+        Returns the maximum number of attempts for a request to `gate_count` gates.
+        """
+        return gate_count if self.__max_attempts is None else self.__max_attempts
+
+    def is_retryable(self, error: Exception, selector: str = "", replay_safe: bool = False) -> bool:
+        """
+        Returns True if the error of a request to the selector is worth a retry.
+
+        Parameters:
+        error (Exception): The error of the request.
+        selector (str, optional): The selector of the request.
+        replay_safe (bool, optional): Whether a write may be sent again: the request failed before it was sent,
+            or the sends are deduplicated by an idempotency store.
+        """
+        if selector in WRITE_SELECTORS and not replay_safe:
+            return False
+        if self.__retryable is not None:
+            return self.__retryable(error, selector)
+        return not isinstance(error, NON_RETRYABLE_ERRORS)
+
+    def backoff(self, round_number: int) -> float:
+        """
+        Returns the wait in seconds before a round over the gates.
+
+        Parameters:
+        round_number (int): The round, starting from 0 for the first one which has no wait.
+        """
+        if round_number <= 0:
+            return 0.0
+        delay = min(self.__backoff * self.__multiplier ** min(round_number - 1, 32), self.__max_backoff)
+        return delay * (1 - self.__jitter * self.__rng())
+
+    def plan(self, gates: Sequence[str], order: Callable[[Sequence[str]], List[str]]) -> Iterator[Tuple[str, float]]:
+        """
+        Yields the gate of every attempt and the wait in seconds before it, without end.
+
+        The gates are ordered again by `order` at the start of every round, so the failures
+        of the previous round are taken into account.
+
+        Parameters:
+        gates (Sequence[str]): The gates.
+        order (Callable): Orders the gates for the next round, e.g. `GateHealth.order`.
+        """
+        for round_number in itertools.count():
+            wait = self.backoff(round_number)
+            for gate in order(gates):
+                yield gate, wait
+                wait = 0.0
+
+    def record_request(self) -> None:
+        """
+        Records a request in the retry budget.
+        """
+        if self.__budget is not None:
+            self.__budget.deposit()
+
+    def should_retry(
+        self, attempts: int, gate_count: int, error: Exception, selector: str = "", replay_safe: bool = False
+    ) -> bool:
+        """
+        Decides whether to make another attempt after a failed one.
+
+        Parameters:
+        attempts (int): The number of attempts made so far.
+        gate_count (int): The number of gates.
+        error (Exception): The error of the last attempt.
+        selector (str, optional): The selector of the request.
+        replay_safe (bool, optional): Whether a write may be sent again, see `is_retryable()`.
+
+        Returns:
+        bool: True if another attempt should be made. A retry budget token is taken in that case.
+        """
+        if attempts >= self.get_max_attempts(gate_count) or not self.is_retryable(error, selector, replay_safe):
+            return False
+        return self.__budget is None or self.__budget.withdraw()
@@ -0,0 +1,197 @@
+"""
+This module counts the parts an SMS text is split into, as billed by the operators.
+
+A text made only of the characters of the GSM 03.38 alphabet is sent in GSM-7: 160 characters in one part,
+153 per part in a longer message, the characters of the extension table counting twice. Any other character
+makes the whole text UCS-2: 70 UTF-16 code units in one part, 67 per part in a longer message.
+
+A single Cyrillic letter or typographic quote thus cuts the capacity of every part by more than half,
+which `analyze_text` reports together with a transliterated text when it is sent in fewer parts.
+"""
+
+from typing import List, NamedTuple, Optional, Tuple
+
+import bisect
+import math
+import re
+
+
+__all__ = [
+    "GSM7",
+    "UCS2",
+    "GSM7_BASIC",
+    "GSM7_EXTENDED",
+    "SegmentInfo",
+    "TextAnalysis",
+    "count_segments",
+    "transliterate",
+    "analyze_text",
+]
+
+
+GSM7 = "GSM-7"
+UCS2 = "UCS-2"
+
+# The basic table of the GSM 03.38 alphabet, without the escape to the extension table
+GSM7_BASIC = frozenset(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# The extension table: every character is sent as an escape and the character, i.e. two septets
+GSM7_EXTENDED = frozenset("\f^{}\\[~]|€")
+
+# The capacity of a single part and of every part of a multipart message, in septets or in UTF-16 code units
+_GSM7_SINGLE, _GSM7_MULTI = 160, 153
+_UCS2_SINGLE, _UCS2_MULTI = 70, 67
+
+# The characters out of the GSM-7 alphabet, searched by a regular expression so the scan runs in C
+_NON_GSM7 = re.compile("[^" + re.escape("".join(sorted(GSM7_BASIC | GSM7_EXTENDED))) + "]")
+
+# The characters counting as two units: the extension table in GSM-7, the surrogate pairs in UCS-2
+_GSM7_WIDE = re.compile("[" + re.escape("".join(sorted(GSM7_EXTENDED))) + "]")
+_UCS2_WIDE = re.compile("[\U00010000-\U0010FFFF]")
+
+# The Latin spelling of the Russian letters, as commonly used in SMS, and of the typographic characters
+# which have a plain GSM-7 counterpart
+_TRANSLITERATION = str.maketrans(
+    {
+        **dict(zip("абвгдеёзийклмнопрстуфыэ", "abvgdeeziyklmnoprstufye")),
+        **dict(zip("АБВГДЕЁЗИЙКЛМНОПРСТУФЫЭ", "ABVGDEEZIYKLMNOPRSTUFYE")),
+        **dict(zip("жхцчшщъьюя", ["zh", "kh", "ts", "ch", "sh", "sch", "", "", "yu", "ya"])),
+        **dict(zip("ЖХЦЧШЩЪЬЮЯ", ["Zh", "Kh", "Ts", "Ch", "Sh", "Sch", "", "", "Yu", "Ya"])),
+        **dict.fromkeys("«»„“”", '"'),
+        **dict.fromkeys("‘’", "'"),
+        **dict.fromkeys("—–‑", "-"),
+        **dict.fromkeys("\u00a0\u202f", " "),
+        "…": "...",
+        "№": "N",
+    }
+)
+
+
+class SegmentInfo(NamedTuple):
+    """
+    The encoding and the number of parts of a text.
+
+    Attributes:
+    encoding (str): GSM7 or UCS2.
+    units (int): The length of the text in septets (GSM-7) or in UTF-16 code units (UCS-2).
+    segments (int): The number of parts the message is sent in.
+    """
+
+    encoding: str
+    units: int
+    segments: int
+
+
+class TextAnalysis(NamedTuple):
+    """
+    The encoding of a text and how it is split into parts.
+
+    Attributes:
+    encoding (str): GSM7 or UCS2.
+    units (int): The length of the text in septets (GSM-7) or in UTF-16 code units (UCS-2).
+    segments (int): The number of parts the message is sent in.
+    extended (int): The number of characters of the GSM-7 extension table, each one counting twice in GSM-7.
+    non_gsm (str): The distinct characters out of the GSM-7 alphabet which make the text UCS-2, in order.
+    boundaries (List[Tuple[int, int]]): The start and end offsets in the text of every part.
+    suggestion (Optional[str]): The transliterated text if asked for and it is sent in fewer parts, else None.
+    """
+
+    encoding: str
+    units: int
+    segments: int
+    extended: int
+    non_gsm: str
+    boundaries: List[Tuple[int, int]]
+    suggestion: Optional[str]
+
+
+def _measure(text: str) -> Tuple[str, int, int]:
+    # the encoding, the length in units and the number of two-unit characters
+    if _NON_GSM7.search(text) is None:
+        wide = len(_GSM7_WIDE.findall(text))
+        return GSM7, len(text) + wide, wide
+    units = len(text.encode("utf-16-le")) // 2
+    return UCS2, units, units - len(text)
+
+
+def _split(text: str, encoding: str, units: int, wide: int) -> List[Tuple[int, int]]:
+    # the start and end offsets of the parts of a text
+    single, multi = (_GSM7_SINGLE, _GSM7_MULTI) if encoding == GSM7 else (_UCS2_SINGLE, _UCS2_MULTI)
+    if units <= single:
+        return [(0, len(text))] if text else []
+    if not wide:
+        return [(start, min(start + multi, len(text))) for start in range(0, len(text), multi)]
+    # The two-unit characters are kept whole: a part holds its capacity less one character per two-unit
+    # character in it, and one more character when that still fits. Their offsets are found in C.
+    pattern = _GSM7_WIDE if encoding == GSM7 else _UCS2_WIDE
+    offsets = [match.start() for match in pattern.finditer(text)]
+    boundaries, start = [], 0
+    while start < len(text):
+        before = bisect.bisect_left(offsets, start)
+        end = min(start + multi, len(text))
+        end -= bisect.bisect_left(offsets, end) - before
+        while end < len(text) and end + 1 - start + bisect.bisect_left(offsets, end + 1) - before <= multi:
+            end += 1
+        boundaries.append((start, end))
+        start = end
+    return boundaries
+
+
+def count_segments(text: str) -> SegmentInfo:
+    """
+    Returns the encoding of a text and the number of parts it is sent in.
+
+    An extension character or a surrogate pair is never split between two parts, so a part may hold
+    one unit less than its capacity.
+
+    Parameters:
+    text (str): The text of the message.
+
+    Returns:
+    SegmentInfo: The encoding, the length in units and the number of parts.
+    """
+    encoding, units, wide = _measure(text)
+    single, multi = (_GSM7_SINGLE, _GSM7_MULTI) if encoding == GSM7 else (_UCS2_SINGLE, _UCS2_MULTI)
+    if units <= single:
+        return SegmentInfo(encoding, units, 1 if units else 0)
+    if not wide:
+        return SegmentInfo(encoding, units, math.ceil(units / multi))
+    return SegmentInfo(encoding, units, len(_split(text, encoding, units, wide)))
+
+
+def transliterate(text: str) -> str:
+    """
+    Returns the text with the Russian letters spelled in Latin and the typographic quotes, dashes and spaces
+    replaced by their plain counterparts, e.g. 'Заказ №5 «готов»' -> 'Zakaz N5 "gotov"'.
+
+    The other characters are kept, so the result is GSM-7 only if they are.
+    """
+    return text.translate(_TRANSLITERATION)
+
+
+def analyze_text(text: str, suggest: bool = False) -> TextAnalysis:
+    """
+    Analyzes how a text is encoded and split into parts, e.g. to find the texts of a campaign which are
+    billed several times before sending them.
+
+    Parameters:
+    text (str): The text of the message.
+    suggest (bool, optional): Whether to transliterate a UCS-2 text and suggest it if it is sent in fewer parts.
+
+    Returns:
+    TextAnalysis: The encoding, the length and the parts of the text, and the suggested text if any.
+    """
+    encoding, units, wide = _measure(text)
+    boundaries = _split(text, encoding, units, wide)
+    suggestion = None
+    if suggest and encoding == UCS2:
+        transliterated = transliterate(text)
+        if count_segments(transliterated).segments < len(boundaries):
+            suggestion = transliterated
+    if encoding == GSM7:
+        extended, non_gsm = wide, ""
+    else:
+        extended, non_gsm = len(_GSM7_WIDE.findall(text)), "".join(dict.fromkeys(_NON_GSM7.findall(text)))
+    return TextAnalysis(encoding, units, len(boundaries), extended, non_gsm, boundaries, suggestion)
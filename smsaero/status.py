@@ -0,0 +1,287 @@
+"""
+This module provides the StatusTracker class which follows the delivery of many messages.
+
+The API tells the status of one message per request, so the tracker saves requests by asking less often:
+a message is polled soon after it was sent, when its status changes fast, and ever less often as it ages.
+A message is dropped once its status is final. The due messages are polled concurrently and
+every change of status is reported as a StatusEvent.
+"""
+
+from typing import Any, Callable, Collection, Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Tuple
+
+import heapq
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from smsaero.errors import SmsAeroException
+
+
+__all__ = [
+    "TERMINAL_STATUSES",
+    "StatusEvent",
+    "StatusTracker",
+]
+
+
+# The final statuses of a message: delivered, not delivered and rejected
+TERMINAL_STATUSES = frozenset([1, 2, 6])
+
+
+class StatusEvent(NamedTuple):
+    """
+    A change of the status of a message.
+
+    Attributes:
+    sms_id (int): The ID of the message.
+    status (int): The new status.
+    extend_status (str): The new status in words, e.g. 'delivery'.
+    previous (int, optional): The previous status, None when the message is polled for the first time.
+    terminal (bool): True if the status is final and the message is no longer tracked.
+    data (Dict): The response of `sms_status`.
+    """
+
+    sms_id: int
+    status: int
+    extend_status: str
+    previous: Optional[int]
+    terminal: bool
+    data: Dict
+
+
+class _Message:  # pylint: disable=too-few-public-methods
+    # the state of a tracked message
+    __slots__ = ("sent_at", "status", "due")
+
+    def __init__(self, sent_at: float, due: float):
+        self.sent_at = sent_at
+        self.status: Optional[int] = None
+        self.due = due
+
+
+class StatusTracker:  # pylint: disable=too-many-instance-attributes
+    """
+    Polls the status of many messages with `SmsAero.sms_status` until they reach a final status.
+
+    The interval between two polls of a message is `factor` times its age, between `min_interval`
+    and `max_interval`. With the defaults a message is polled 5 seconds after it was sent, then about
+    10 times in its first hour and every 10 minutes after that.
+
+    Example:
+        tracker = StatusTracker(smsaero)
+        for message in sent:
+            tracker.add(message["id"], message["dateSend"])
+        for event in tracker.events():
+            print(event.sms_id, event.extend_status)
+
+    Messages may be added and removed from other threads while the events are consumed;
+    a message added while `events()` waits is polled when it is due, not after the wait.
+    """
+
+    # How often in seconds `events()` checks its `stop` event while waiting
+    STOP_CHECK_INTERVAL = 0.1
+
+    def __init__(
+        self,
+        smsaero: Any,
+        concurrency: int = 8,
+        min_interval: float = 5.0,
+        max_interval: float = 600.0,
+        factor: float = 0.25,
+        terminal: Collection[int] = TERMINAL_STATUSES,
+        clock: Callable[[], float] = time.time,
+        sleep: Optional[Callable[[float], Any]] = None,
+    ):
+        """
+        Initializes the StatusTracker class.
+
+        Parameters:
+        smsaero (SmsAero): The client the statuses are requested with.
+        concurrency (int, optional): The maximum number of requests in flight.
+        min_interval (float, optional): The shortest time in seconds between two polls of a message.
+        max_interval (float, optional): The longest time in seconds between two polls of a message.
+        factor (float, optional): The interval between two polls as a share of the age of the message.
+        terminal (Collection[int], optional): The final statuses.
+        clock (Callable[[], float], optional): The current Unix time, as in the `dateSend` of the messages.
+        sleep (Callable[[float], Any], optional): Waits for the next poll instead of the tracker, e.g. to simulate
+            the time with `clock`. It is not interrupted by `add()`. By default the tracker waits on a condition
+            which `add()` and `remove()` notify.
+        """
+        if not isinstance(concurrency, int) or concurrency <= 0:
+            raise ValueError("concurrency must be a positive integer")
+        if not 0 < min_interval <= max_interval or factor <= 0:
+            raise ValueError("intervals must satisfy 0 < min_interval <= max_interval and factor must be positive")
+        self.__smsaero = smsaero
+        self.__concurrency = concurrency
+        self.__min_interval = min_interval
+        self.__max_interval = max_interval
+        self.__factor = factor
+        self.__terminal: FrozenSet[int] = frozenset(terminal)
+        self.__clock = clock
+        self.__sleep = sleep
+        self.__lock = threading.Lock()
+        self.__changed = threading.Condition(self.__lock)
+        self.__messages: Dict[int, _Message] = {}
+        self.__queue: List[Tuple[float, int]] = []
+        self.__polls = 0
+        self.__errors = 0
+
+    def get_interval(self, age: float) -> float:
+        """
+        Returns the time in seconds until the next poll of a message sent `age` seconds ago.
+        """
+        return min(max(age * self.__factor, self.__min_interval), self.__max_interval)
+
+    def __schedule(self, sms_id: int, message: _Message, now: float) -> None:
+        message.due = now + self.get_interval(now - message.sent_at)
+        heapq.heappush(self.__queue, (message.due, sms_id))
+
+    def add(self, sms_id: int, sent_at: Optional[float] = None) -> None:
+        """
+        Starts tracking a message.
+
+        Parameters:
+        sms_id (int): The ID of the message.
+        sent_at (float, optional): The `dateSend` of the message as a Unix time. Defaults to now.
+        """
+        now = self.__clock()
+        with self.__lock:
+            if int(sms_id) in self.__messages:
+                return
+            sent_at = now if sent_at is None else float(sent_at)
+            # the first poll is due `min_interval` after sending, or now for the older messages
+            message = _Message(sent_at, max(now, sent_at + self.__min_interval))
+            self.__messages[int(sms_id)] = message
+            heapq.heappush(self.__queue, (message.due, int(sms_id)))
+            self.__changed.notify_all()
+
+    def remove(self, sms_id: int) -> None:
+        """
+        Stops tracking a message.
+        """
+        with self.__lock:
+            self.__messages.pop(int(sms_id), None)
+            self.__changed.notify_all()
+
+    def get_pending(self) -> int:
+        """
+        Returns the number of messages tracked.
+        """
+        return len(self.__messages)
+
+    def get_polls(self) -> int:
+        """
+        Returns the number of status requests sent.
+        """
+        return self.__polls
+
+    def get_errors(self) -> int:
+        """
+        Returns the number of status requests which failed. The failed messages are polled again later.
+        """
+        return self.__errors
+
+    def get_next_poll(self) -> Optional[float]:
+        """
+        Returns the Unix time of the next poll, or None if no message is tracked.
+        """
+        with self.__lock:
+            self.__drop_stale()
+            return self.__queue[0][0] if self.__queue else None
+
+    def __drop_stale(self) -> None:
+        # the entries of removed messages and the ones superseded by a later schedule
+        while self.__queue:
+            due, sms_id = self.__queue[0]
+            message = self.__messages.get(sms_id)
+            if message is not None and message.due == due:
+                return
+            heapq.heappop(self.__queue)
+
+    def __take_due(self, now: float) -> List[int]:
+        due: List[int] = []
+        with self.__lock:
+            self.__drop_stale()
+            while self.__queue and self.__queue[0][0] <= now:
+                due.append(heapq.heappop(self.__queue)[1])
+                self.__drop_stale()
+        return due
+
+    def __poll(self, sms_id: int) -> Optional[Dict]:
+        try:
+            return self.__smsaero.sms_status(sms_id)
+        except (SmsAeroException, TypeError, ValueError):
+            return None
+
+    def poll(self, executor: Optional[ThreadPoolExecutor] = None) -> List[StatusEvent]:
+        """
+        Polls the messages which are due and returns the changes of status.
+
+        Parameters:
+        executor (ThreadPoolExecutor, optional): Runs the requests. By default they are sent one by one.
+
+        Returns:
+        List[StatusEvent]: The changes of status, in the order of the polls.
+        """
+        due = self.__take_due(self.__clock())
+        if executor is None:
+            results = [self.__poll(sms_id) for sms_id in due]
+        else:
+            results = list(executor.map(self.__poll, due))
+        now = self.__clock()
+        events: List[StatusEvent] = []
+        with self.__lock:
+            self.__polls += len(due)
+            for sms_id, data in zip(due, results):
+                message = self.__messages.get(sms_id)
+                if message is None:
+                    continue
+                if not isinstance(data, dict) or "status" not in data:
+                    self.__errors += 1
+                    self.__schedule(sms_id, message, now)
+                    continue
+                if data.get("dateSend"):
+                    message.sent_at = float(data["dateSend"])
+                status = int(data["status"])
+                terminal = status in self.__terminal
+                if status != message.status:
+                    events.append(
+                        StatusEvent(sms_id, status, data.get("extendStatus", ""), message.status, terminal, data)
+                    )
+                    message.status = status
+                if terminal:
+                    del self.__messages[sms_id]
+                else:
+                    self.__schedule(sms_id, message, now)
+        return events
+
+    def events(self, stop: Optional[threading.Event] = None) -> Iterator[StatusEvent]:
+        """
+        Polls the messages as they become due and yields the changes of status.
+
+        Without `stop` the polling ends when every message has reached a final status. With `stop` it goes on
+        until `stop` is set, waiting for new messages while none is tracked.
+
+        Parameters:
+        stop (threading.Event, optional): Stops the polling, also while waiting for the next poll.
+
+        Returns:
+        Iterator[StatusEvent]: The changes of status.
+        """
+        with ThreadPoolExecutor(max_workers=self.__concurrency, thread_name_prefix="smsaero-status") as executor:
+            while stop is None or not stop.is_set():
+                with self.__changed:
+                    self.__drop_stale()
+                    if not self.__queue and stop is None:
+                        return
+                    wait = self.__queue[0][0] - self.__clock() if self.__queue else None
+                    if wait is None or (wait > 0 and self.__sleep is None):
+                        # woken by `add()` and `remove()`, and often enough to see `stop`
+                        if stop is not None:
+                            wait = min(wait or self.STOP_CHECK_INTERVAL, self.STOP_CHECK_INTERVAL)
+                        self.__changed.wait(wait)
+                        continue
+                if wait > 0 and self.__sleep is not None:
+                    self.__sleep(wait)
+                yield from self.poll(executor)
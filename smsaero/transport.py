@@ -0,0 +1,666 @@
+"""
+This module provides the Transport class which sends the requests of the SmsAero client to the SMS Aero gates.
+
+The gates are tried in turn: an SSL error switches the remaining gates to HTTP and any other connection error
+moves on to the next gate. AsyncSmsAero replaces only this transport, so the API methods are shared.
+
+Every gate gets its own `HTTPAdapter`, so the pool size and blocking behaviour can be tuned
+for the number of threads sharing one SmsAero instance.
+"""
+
+from typing import Any, Iterable, List, Dict, Optional, cast
+
+import contextvars
+import logging
+import socket
+import threading
+import time
+import weakref
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, quote_plus, urlparse
+
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE, HTTPAdapter
+from requests.models import Response
+from requests import exceptions
+from urllib3.connection import HTTPConnection
+
+import requests
+
+from smsaero.cache import ResponseCache
+from smsaero.errors import SmsAeroException, SmsAeroConnectionException, SmsAeroNoMoneyException
+from smsaero.gates import GateHealth, ProtocolMemory
+from smsaero.hedging import HedgePolicy, hedge
+from smsaero.idempotency import IdempotencyStore
+from smsaero.ratelimit import RateLimiter
+from smsaero.options import ClientOptions
+from smsaero.response import Attempt, RequestResult
+from smsaero.retry import RetryPolicy, is_connect_error
+
+
+__all__ = [
+    "Transport",
+    "KeepAliveAdapter",
+    "mount_gate_adapters",
+]
+
+
+logger = logging.getLogger(__name__)
+
+# The last request of every client in the current thread or asyncio task. A single module-level variable,
+# as a context keeps every variable ever set in it; the clients are weak keys so they are dropped with it.
+_LAST_RESULTS: "contextvars.ContextVar[Optional[weakref.WeakKeyDictionary]]" = contextvars.ContextVar(
+    "smsaero_last_results", default=None
+)
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """
+    HTTPAdapter which enables TCP keep-alive probes on its pooled connections,
+    so idle connections are not silently dropped by NAT or firewalls between requests.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault("socket_options", HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+        ])
+        super().init_poolmanager(*args, **kwargs)
+
+
+def mount_gate_adapters(
+    session: requests.Session,
+    prefixes: Iterable[str],
+    pool_connections: int,
+    pool_maxsize: int,
+    pool_block: bool,
+    keep_alive: bool,
+) -> None:
+    """
+    Mounts a tuned adapter for every gate URL prefix on the session.
+
+    Parameters:
+    session (requests.Session): The session to configure.
+    prefixes (Iterable[str]): The URL prefixes of the gates, as built by `Transport.build_url`.
+    pool_connections (int): The number of connection pools to cache.
+    pool_maxsize (int): The maximum number of connections kept open per gate.
+    pool_block (bool): Whether to wait for a free connection instead of opening a throwaway one when the pool is full.
+    keep_alive (bool): Whether to reuse connections between requests.
+    """
+    adapter_class = KeepAliveAdapter if keep_alive else HTTPAdapter
+    for prefix in prefixes:
+        session.mount(
+            prefix,
+            adapter_class(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block),
+        )
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+
+
+class Transport:  # pylint: disable=too-many-instance-attributes
+    """
+    The Transport class sends the requests to the SMS Aero gates and checks their responses.
+
+    It holds the credentials, the gate and the HTTP session of a client; SmsAero builds the API methods on top of it.
+    """
+
+    # List of available gateway URLs
+    GATE_URLS = [
+        "@gate.smsaero.ru/v2/",
+        "@gate.smsaero.org/v2/",
+        "@gate.smsaero.net/v2/",
+    ]
+    # User-Agent header sent with every request
+    USER_AGENT = "SAPythonClient/3.1.0"
+
+    def __init__(
+        self,
+        email: str,
+        api_key: str,
+        url_gate: Optional[str] = None,
+        timeout: int = 15,
+        session: Optional[requests.Session] = None,
+        pool_connections: int = DEFAULT_POOLSIZE,
+        pool_maxsize: int = DEFAULT_POOLSIZE,
+        pool_block: bool = DEFAULT_POOLBLOCK,
+        keep_alive: bool = True,
+        options: Optional[ClientOptions] = None,
+    ):
+        """
+        Initializes the Transport class.
+
+        Parameters:
+        email (str): The user's email.
+        api_key (str): The user's API key.
+        url_gate (str, optional): The gateway URL. For example, '@local.host/v2/'.
+        timeout (int, optional): The timeout for the requests.
+        session (requests.Session, optional): A pre-built session to use as is. The pool options below are ignored.
+        pool_connections (int, optional): The number of connection pools to cache per gate.
+        pool_maxsize (int, optional): The maximum number of connections kept open per gate.
+            Set it to the number of threads sharing the instance.
+        pool_block (bool, optional): Whether to wait for a free connection when the pool is full.
+        keep_alive (bool, optional): Whether to reuse connections between requests (with TCP keep-alive probes).
+        options (ClientOptions, optional): The optional collaborators of the client, such as the gate health tracker.
+        """
+        self.__user = email
+        self.__akey = api_key
+        self.__gate = url_gate
+        self.__time = timeout
+
+        self.pool_validate(session, pool_connections, pool_maxsize, pool_block, keep_alive)
+        if options is not None and not isinstance(options, ClientOptions):
+            raise TypeError("Options must be a ClientOptions instance.")
+        self.__options = options or ClientOptions()
+        self.__health = self.__options.get_gate_health() or GateHealth()
+        self.__retry = self.__options.get_retry_policy() or RetryPolicy(max_attempts=None)
+        # the session and the hedge executor are built on first use, so a subclass with its own transport
+        # such as AsyncSmsAero never builds them; the pool options are kept until then
+        self.__pool = (pool_connections, pool_maxsize, pool_block, keep_alive)
+        self.__lock = threading.Lock()
+        self.__hedge_executor: Optional[ThreadPoolExecutor] = None
+
+        self.check_and_format_user_gate()
+
+        if session is not None:
+            session.headers.update({"User-Agent": self.USER_AGENT})
+        # a pre-built session belongs to the caller and is not closed by `close()`
+        self.__own_session = session is None
+        self.__sess = session
+
+    def __enter__(self) -> "Transport":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Shuts the hedge executor down and closes the HTTP session, unless it was passed in pre-built.
+        The instance builds them again if it is used after that.
+        """
+        with self.__lock:
+            executor, self.__hedge_executor = self.__hedge_executor, None
+            session = self.__sess
+            if self.__own_session:
+                self.__sess = None
+        if executor is not None:
+            executor.shutdown()
+        if session is not None and self.__own_session:
+            session.close()
+
+    def get_protocol_memory(self) -> Optional[ProtocolMemory]:
+        """
+        Returns the protocol memory, or None if SSL errors are not remembered between requests.
+        """
+        return self.__options.get_protocol_memory()
+
+    def get_hedge_policy(self) -> Optional[HedgePolicy]:
+        """
+        Returns the hedge policy, or None if the requests are not hedged.
+        """
+        return self.__options.get_hedge_policy()
+
+    def get_retry_policy(self) -> RetryPolicy:
+        """
+        Returns the retry policy.
+        """
+        return self.__retry
+
+    def get_rate_limiter(self) -> Optional[RateLimiter]:
+        """
+        Returns the rate limiter, or None if the rate is not limited.
+        """
+        return self.__options.get_rate_limiter()
+
+    def rate_limit_delay(self, selector: str) -> float:
+        """
+        Takes a rate limiter token for a request to the selector and returns the time in seconds to wait.
+        """
+        limiter = self.get_rate_limiter()
+        return limiter.reserve(selector) if limiter else 0.0
+
+    def get_idempotency_store(self) -> Optional[IdempotencyStore]:
+        """
+        Returns the idempotency store, or None if the sends are not deduplicated.
+        """
+        return self.__options.get_idempotency_store()
+
+    def get_response_cache(self) -> Optional[ResponseCache]:
+        """
+        Returns the response cache, or None if the responses are not cached.
+        """
+        return self.__options.get_response_cache()
+
+    def get_send_key(self, selector: str, data: Dict, idempotency_key: Optional[str] = None) -> str:
+        """
+        Returns the key of a send in the idempotency store.
+
+        The send is identified by the account, the selector, the data sent and the idempotency key of the caller,
+        so a test send is not taken for a real one and the clients of two accounts sharing a store stay apart.
+        """
+        return IdempotencyStore.make_key(self.__user, selector, data, idempotency_key)
+
+    def send_once(self, selector: str, data: Dict, idempotency_key: Optional[str] = None) -> Dict:
+        """
+        Sends a request unless the idempotency store remembers the result of the same send.
+
+        Parameters:
+        selector (str): The selector of the send, e.g. 'sms/send'.
+        data (Dict[str, Any]): The data to be sent: the recipients, the text, the signature, the callback URL, ...
+        idempotency_key (str, optional): The key the caller tells the sends with the same data apart with.
+
+        Returns:
+        Dict: The server's response, or the remembered response of the same send.
+        """
+        store = self.get_idempotency_store()
+        if store is None:
+            return self.request(selector, data)
+        return store.run(self.get_send_key(selector, data, idempotency_key), lambda: self.request(selector, data))
+
+    def gate_protocol(self, gate: str, proto: str) -> str:
+        """
+        Returns the protocol to ask the gate with, taking the remembered downgrades into account.
+        """
+        protocols = self.get_protocol_memory()
+        return protocols.protocol(gate, proto) if protocols else proto
+
+    def record_ssl_error(self, gate: str) -> None:
+        """
+        Records a failed TLS handshake with the gate.
+        """
+        self.__health.record_failure(gate)
+        protocols = self.get_protocol_memory()
+        if protocols:
+            protocols.record_ssl_error(gate)
+
+    def get_session(self) -> requests.Session:
+        """
+        Returns the HTTP session shared by all requests of this instance, building it on first use.
+        """
+        if self.__sess is None:
+            with self.__lock:
+                if self.__sess is None:
+                    session = requests.session()
+                    gates = self.get_gate_urls()
+                    prefixes = [self.build_url(proto, "", gate) for gate in gates for proto in ("https", "http")]
+                    mount_gate_adapters(session, prefixes, *self.__pool)
+                    session.headers.update({"User-Agent": self.USER_AGENT})
+                    self.__sess = session
+        return self.__sess
+
+    def get_hedge_executor(self) -> ThreadPoolExecutor:
+        """
+        Returns the pool of threads running the hedged requests, building it on first use.
+        It has as many threads as connections are kept per gate.
+        """
+        if self.__hedge_executor is None:
+            with self.__lock:
+                if self.__hedge_executor is None:
+                    self.__hedge_executor = ThreadPoolExecutor(
+                        max_workers=self.__pool[1], thread_name_prefix="smsaero-hedge"
+                    )
+        return self.__hedge_executor
+
+    def check_and_format_user_gate(self):
+        """
+        This method checks and formats the `self.__gate` attribute to ensure it starts with '@' and ends with '/v2/'.
+        If `self.__gate` does not start with '@', it prepends '@' to it.
+        If `self.__gate` does not end with '/v2/', it appends '/v2/' to it.
+        The method does not return any value but modifies the `self.__gate` attribute in-place.
+        """
+
+        if not self.__gate:
+            return
+
+        parsed_url = urlparse(self.__gate)
+
+        if not parsed_url.path.startswith("@"):
+            parsed_url = parsed_url._replace(path="@" + parsed_url.path)
+        if parsed_url.path.endswith("/v2"):
+            parsed_url = parsed_url._replace(path=parsed_url.path + "/")
+        elif not parsed_url.path.endswith("/v2/"):
+            parsed_url = parsed_url._replace(path=parsed_url.path + "/v2/")
+
+        self.__gate = parsed_url.geturl()
+
+    def get_gate(self):
+        """
+        Returns the gateway URL.
+        """
+        return self.__gate
+
+    def get_gate_urls(self) -> List[str]:
+        """
+        Returns a list of gateway URLs for sending requests.
+        If a gateway URL was specified during initialization, it returns a list with only that URL.
+        Otherwise, it returns a list of all available gateway URLs.
+        """
+        return [self.__gate] if self.__gate else self.GATE_URLS
+
+    def get_options(self) -> ClientOptions:
+        """
+        Returns the optional collaborators of the client.
+        """
+        return self.__options
+
+    def get_gate_health(self) -> GateHealth:
+        """
+        Returns the gate health tracker of the client.
+        """
+        return self.__health
+
+    def get_timeout(self) -> int:
+        """
+        Returns the timeout for the requests in seconds.
+        """
+        return self.__time
+
+    @staticmethod
+    def check_response(response: Response) -> Dict:
+        """
+        Checks the response from the server.
+
+        If the response contains an error message, it raises an appropriate exception.
+        If the response is successful, it returns the data from the response.
+
+        Parameters:
+        response (Response): The response from the server.
+
+        Returns:
+        Dict: The data from the response if the request was successful.
+        """
+        try:
+            content = response.json()
+        except ValueError as e:
+            raise SmsAeroException("Unexpected format is received") from e
+        return Transport.check_content(content)
+
+    @staticmethod
+    def check_content(content: Any) -> Dict:
+        """
+        Checks the decoded response body received from the server.
+
+        If the content contains an error message, it raises an appropriate exception.
+        If the content is successful, it returns the data from the content.
+
+        Parameters:
+        content (Any): The decoded JSON body of the response.
+
+        Returns:
+        Dict: The data from the response if the request was successful.
+        """
+        if not isinstance(content, dict):
+            raise SmsAeroException("Unexpected format is received")
+        if content.get("result") == "no credits":
+            raise SmsAeroNoMoneyException(content["result"])
+        if content.get("result") == "reject":
+            raise SmsAeroException(content["reason"])
+        if not content.get("success"):
+            raise SmsAeroException(content.get("message") or "Unknown error")
+
+        return cast(Dict, content.get("data"))
+
+    def build_url(self, proto: str, selector: str, gate: str, page: Optional[int] = None) -> str:
+        """
+        Builds a URL for the request.
+
+        Parameters:
+        proto (str): The protocol for the URL (e.g., 'http' or 'https').
+        selector (str): The selector for the URL.
+        gate (str): The gateway for the URL.
+        page (Optional[int], optional): The page number for the URL.
+
+        Returns:
+        str: The built URL.
+        """
+        url = urljoin(f"{proto}://{quote_plus(self.__user)}:{self.__akey}{gate}", selector)
+        if page:
+            url = urljoin(url, f"?page={int(page)}")
+        return url
+
+    def get_response(self) -> Dict:
+        """
+        Retrieves the last response received by the current thread (or asyncio task).
+
+        Returns:
+        Dict: The server's response in JSON format.
+        """
+        return self.get_last_result().content
+
+    def get_last_result(self) -> RequestResult:
+        """
+        Retrieves the metadata of the last request made by the current thread (or asyncio task).
+
+        Returns:
+        RequestResult: The decoded response, HTTP status, gate and latency of the request.
+        """
+        results = _LAST_RESULTS.get()
+        result = None if results is None else results.get(self)
+        if result is None:
+            raise SmsAeroException("No response received")
+        return result
+
+    def store_result(self, result: RequestResult) -> None:
+        """
+        Stores the metadata of a request for the current thread (or asyncio task).
+
+        Parameters:
+        result (RequestResult): The metadata of the request.
+        """
+        # copied rather than updated in place, as the tasks started from this one share its dictionary
+        results = weakref.WeakKeyDictionary(_LAST_RESULTS.get() or {})
+        results[self] = result
+        _LAST_RESULTS.set(results)
+
+    def request(
+        self,
+        selector: str,
+        data: Optional[Dict] = None,
+        page: Optional[int] = None,
+        proto: str = "https",
+    ) -> Dict:
+        """
+        Sends a request to the server.
+
+        The gates are tried in the order given by the gate health tracker: the gate which answered last
+        comes first and the gates which failed recently come last.
+        After an SSL error the remaining gates are asked over HTTP; with a protocol memory
+        the gate keeps being asked over HTTP by the next requests too.
+        With a hedge policy the idempotent reads are also sent to the next gate when the first one is slow.
+        With a rate limiter the request first waits for its turn.
+        With a response cache the cached selectors are answered from the cache while their response is fresh;
+        `get_last_result()` then still describes the last request actually sent.
+
+        Parameters:
+        selector (str): The selector for the URL.
+        data (Dict[str, Any], optional): The data to be sent in the request. If not specified, no data will be sent.
+        page (int, optional): The page number for the URL. If not specified, no page number will be added to the URL.
+        proto (str, optional): The protocol for the URL (e.g., 'http' or 'https'). Default is 'https'.
+
+        Returns:
+        Dict: The data from the response if the request was successful.
+        """
+        cache = self.get_response_cache()
+        if cache is not None:
+            return cache.fetch(selector, data, page, lambda: self.send_request(selector, data, page, proto))
+        return self.send_request(selector, data, page, proto)
+
+    def send_request(
+        self,
+        selector: str,
+        data: Optional[Dict] = None,
+        page: Optional[int] = None,
+        proto: str = "https",
+    ) -> Dict:
+        """
+        Sends a request to the server, bypassing the response cache. See `request()`.
+        """
+        delay = self.rate_limit_delay(selector)
+        if delay:
+            time.sleep(delay)
+        policy = self.get_hedge_policy()
+        if policy is not None and policy.is_hedged(selector):
+            result = self.send_hedged(policy, selector, data, page, proto)
+            policy.record_latency(result.latency)
+        else:
+            result = self.send_with_failover(selector, data, page, proto)
+        self.__health.record_success(result.gate, result.latency)
+        logger.debug("Received response: %s", result.content)
+        self.store_result(result)
+        return self.check_content(result.content)
+
+    def send_to_gate(
+        self, gate: str, proto: str, selector: str, data: Optional[Dict], page: Optional[int]
+    ) -> RequestResult:
+        """
+        Sends a request to one gate and decodes the response.
+
+        Parameters:
+        gate (str): The gate.
+        proto (str): The protocol requested for the request; a remembered downgrade takes precedence.
+        selector (str): The selector for the URL.
+        data (Dict[str, Any], optional): The data to be sent in the request.
+        page (int, optional): The page number for the URL.
+
+        Returns:
+        RequestResult: The decoded response.
+
+        Raises:
+        requests.RequestException: If the gate did not answer with JSON.
+        """
+        url = self.build_url(self.gate_protocol(gate, proto), selector, gate, page)
+        logger.debug("Sending request to %s with data %s", url, data)
+        started = time.monotonic()
+        response = self.get_session().post(url, json=data or {}, timeout=self.__time)
+        # the body is decoded once and the same object is logged, stored and checked
+        content = response.json()
+        return RequestResult(content, response.status_code, gate, time.monotonic() - started)
+
+    def send_with_failover(
+        self, selector: str, data: Optional[Dict], page: Optional[int], proto: str = "https"
+    ) -> RequestResult:
+        """
+        Sends a request to the gates one by one until one of them answers.
+
+        The attempts go round the gates as long as the retry policy allows it,
+        with a backoff before every new round.
+
+        Returns:
+        RequestResult: The response of the first gate which answered.
+
+        Raises:
+        SmsAeroConnectionException: If the attempts are exhausted. The failed attempts are in its `attempts`.
+        """
+        self.__retry.record_request()
+        gate_urls = self.get_gate_urls()
+        attempts: List[Attempt] = []
+        for gate, wait in self.__retry.plan(gate_urls, self.__health.order):
+            if wait:
+                time.sleep(wait)
+            started = time.monotonic()
+            try:
+                return self.send_to_gate(gate, proto, selector, data, page)
+            except exceptions.SSLError as e:
+                # switch to http when got ssl error
+                self.record_ssl_error(gate)
+                proto = "http"
+                error: Exception = e
+            except requests.RequestException as e:
+                # next gate
+                self.__health.record_failure(gate)
+                error = e
+            attempts.append(Attempt(gate, error, time.monotonic() - started))
+            replay_safe = self.is_replay_safe(error)
+            if not self.__retry.should_retry(len(attempts), len(gate_urls), error, selector, replay_safe):
+                break
+        raise SmsAeroConnectionException(attempts=attempts)
+
+    def is_replay_safe(self, error: Exception) -> bool:
+        """
+        Returns True if a write which failed with the error may be sent again: the error was raised
+        before the request was sent, or the sends are deduplicated by the idempotency store.
+        """
+        return self.get_idempotency_store() is not None or is_connect_error(error)
+
+    def send_hedged(
+        self, policy: HedgePolicy, selector: str, data: Optional[Dict], page: Optional[int], proto: str = "https"
+    ) -> RequestResult:
+        """
+        Sends a request to the first gate and to the next gate as well if the first one is slow or fails.
+        Every gate is asked at most once; the retry policy does not apply.
+
+        Returns:
+        RequestResult: The response of the first gate which answered.
+
+        Raises:
+        SmsAeroConnectionException: If every gate failed. The failed attempts are in its `attempts`.
+        """
+        protos = [proto]
+        attempts: List[Attempt] = []
+
+        def attempt(gate: str) -> RequestResult:
+            started = time.monotonic()
+            try:
+                return self.send_to_gate(gate, protos[-1], selector, data, page)
+            except exceptions.SSLError as e:
+                # the gates asked after this one use http
+                self.record_ssl_error(gate)
+                protos.append("http")
+                attempts.append(Attempt(gate, e, time.monotonic() - started))
+                raise
+            except requests.RequestException as e:
+                self.__health.record_failure(gate)
+                attempts.append(Attempt(gate, e, time.monotonic() - started))
+                raise
+
+        gates = self.__health.order(self.get_gate_urls())
+        try:
+            gate, result, hedged = hedge(
+                attempt,
+                gates,
+                policy.get_delay(),
+                policy.get_max_hedges(),
+                self.get_hedge_executor(),
+                (requests.RequestException,),
+            )
+        except LookupError as e:
+            raise SmsAeroConnectionException(attempts=attempts) from e
+        if hedged:
+            policy.record_hedge(gate != gates[0])
+        return cast(RequestResult, result)
+
+    @staticmethod
+    def pool_validate(
+        session: Optional[requests.Session] = None,
+        pool_connections: int = DEFAULT_POOLSIZE,
+        pool_maxsize: int = DEFAULT_POOLSIZE,
+        pool_block: bool = DEFAULT_POOLBLOCK,
+        keep_alive: bool = True,
+    ) -> None:
+        """
+        Validates the connection pool parameters of the `Transport` class.
+
+        Parameters:
+        session (requests.Session): A pre-built session for the requests.
+        pool_connections (int): An integer representing the number of connection pools to cache per gate.
+        pool_maxsize (int): An integer representing the maximum number of connections kept open per gate.
+        pool_block (bool): A boolean indicating whether to wait for a free connection when the pool is full.
+        keep_alive (bool): A boolean indicating whether connections are reused between requests.
+
+        Raises:
+        ValueError: If any of the parameters are invalid.
+        TypeError: If any of the parameters have an incorrect type.
+        """
+        if session is not None and not isinstance(session, requests.Session):
+            raise TypeError("Session must be a requests.Session.")
+        if not isinstance(pool_connections, int):
+            raise TypeError("Pool connections must be an integer.")
+        if pool_connections <= 0:
+            raise ValueError("Pool connections must be a positive integer.")
+        if not isinstance(pool_maxsize, int):
+            raise TypeError("Pool maxsize must be an integer.")
+        if pool_maxsize <= 0:
+            raise ValueError("Pool maxsize must be a positive integer.")
+        if not isinstance(pool_block, bool):
+            raise TypeError("Pool block must be a boolean.")
+        if not isinstance(keep_alive, bool):
+            raise TypeError("Keep alive must be a boolean.")
@@ -0,0 +1,304 @@
+"""
+This module provides the phone number checks of the SmsAero client, an opt-in cache of their verdicts
+and the batch validation of large recipient lists.
+
+Parsing a number with `phonenumbers` is by far the most expensive part of sending a message,
+and the same subscribers are messaged again and again, so the verdicts are worth remembering.
+"""
+
+from typing import Any, Callable, Deque, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import collections
+import functools
+import heapq
+
+from array import array
+from concurrent.futures import Future
+
+from smsaero.fastpath import PrefixIndex
+
+
+__all__ = [
+    "VALID",
+    "INVALID",
+    "UNPARSABLE",
+    "number_verdict",
+    "parse_verdict",
+    "CacheInfo",
+    "PhoneValidationCache",
+    "Reject",
+    "ValidationReport",
+    "check_number",
+    "validate_numbers",
+]
+
+
+# The verdicts of number_verdict()
+VALID = "valid"
+INVALID = "invalid"
+UNPARSABLE = "unparsable"
+
+# The numbers of 7 to 15 digits accepted by the API
+MIN_NUMBER = 10**6
+MAX_NUMBER = 10**15 - 1
+
+# The reason of the numbers rejected by the phonenumbers check
+INVALID_NUMBER = "Number must be a valid phone number"
+
+# The verdicts of the common countries decided by the prefix of the number, built on first use
+_PREFIX_INDEX = PrefixIndex()
+
+
+def number_verdict(number: Any) -> str:
+    """
+    Checks a phone number in the international format with the phonenumbers library.
+
+    The numbers of the countries in `FAST_PATH_COUNTRY_CODES` are looked up in a table of prefixes first,
+    and only the ones the table cannot decide are parsed.
+
+    Parameters:
+    number (Any): The phone number without the leading '+', e.g. 79031234567.
+
+    Returns:
+    str: VALID, INVALID if the number does not exist in the numbering plan,
+        or UNPARSABLE if it is not a phone number at all.
+    """
+    if type(number) is int and MIN_NUMBER <= number <= MAX_NUMBER:  # pylint: disable=unidiomatic-typecheck
+        verdict = _PREFIX_INDEX.lookup(number)
+        if verdict is not None:
+            return verdict
+    return parse_verdict(number)
+
+
+def parse_verdict(number: Any) -> str:
+    """
+    The verdict of `number_verdict()` computed by parsing the number, without the prefix index.
+    """
+    # imported on first use, as its metadata tables make it the slowest import of the client
+    import phonenumbers  # pylint: disable=import-outside-toplevel
+
+    try:
+        parsed_number = phonenumbers.parse("+" + str(number), None)
+    except phonenumbers.phonenumberutil.NumberParseException:
+        return UNPARSABLE
+    return VALID if phonenumbers.is_valid_number(parsed_number) else INVALID
+
+
+class CacheInfo(NamedTuple):
+    """
+    The statistics of a PhoneValidationCache.
+
+    Attributes:
+    hits (int): The number of verdicts found in the cache.
+    misses (int): The number of verdicts computed.
+    maxsize (int): The maximum number of verdicts kept.
+    size (int): The number of verdicts currently kept.
+    """
+
+    hits: int
+    misses: int
+    maxsize: int
+    size: int
+
+
+class PhoneValidationCache:
+    """
+    A bounded cache of the phone number verdicts, the least recently used ones are evicted first.
+
+    The numbering plans change rarely, so a verdict stays valid for the life of the process.
+    An instance is thread-safe and may be shared by several SmsAero clients.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        """
+        Initializes the PhoneValidationCache class.
+
+        Parameters:
+        maxsize (int, optional): The maximum number of verdicts kept.
+        """
+        if not isinstance(maxsize, int) or maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer")
+        self.__maxsize = maxsize
+        self.__verdict: Callable[[int], str] = functools.lru_cache(maxsize=maxsize)(number_verdict)
+
+    def verdict(self, number: Any) -> str:
+        """
+        Returns the verdict of `number_verdict()` for the number, computing it on a cache miss.
+        Only integer numbers are cached.
+        """
+        if type(number) is not int:  # pylint: disable=unidiomatic-typecheck
+            # bool is an int too, and True must not share a slot with 1
+            return number_verdict(number)
+        return self.__verdict(number)
+
+    def get_info(self) -> CacheInfo:
+        """
+        Returns the hit and miss counters and the size of the cache.
+        """
+        info = self.__verdict.cache_info()  # type: ignore[attr-defined]
+        return CacheInfo(info.hits, info.misses, self.__maxsize, info.currsize)
+
+    def clear(self) -> None:
+        """
+        Removes all the verdicts and resets the counters.
+        """
+        self.__verdict.cache_clear()  # type: ignore[attr-defined]
+
+
+class Reject(NamedTuple):
+    """
+    A number rejected by `validate_numbers()`.
+
+    Attributes:
+    position (int): The position of the number in the input, starting from 0.
+    number (Any): The rejected value.
+    reason (str): Why the number was rejected.
+    """
+
+    position: int
+    number: Any
+    reason: str
+
+
+class ValidationReport(NamedTuple):
+    """
+    The outcome of `validate_numbers()`.
+
+    Attributes:
+    valid (List[int]): The valid numbers in the input order.
+    rejects (List[Reject]): The rejected numbers in the input order.
+    """
+
+    valid: List[int]
+    rejects: List[Reject]
+
+    @property
+    def ok(self) -> bool:
+        """
+        Returns True if no number was rejected.
+        """
+        return not self.rejects
+
+
+def check_number(number: Any, verdict: Optional[Callable[[Any], str]] = number_verdict) -> Optional[str]:
+    """
+    Checks one phone number with the same rules as `SmsAero.phone_validation()`.
+
+    Parameters:
+    number (Any): The phone number.
+    verdict (Callable[[Any], str], optional): The phonenumbers check, e.g. `PhoneValidationCache.verdict`.
+        None to check only the type and the length.
+
+    Returns:
+    str, optional: The reason the number is rejected, or None if it is valid.
+    """
+    if not isinstance(number, int):
+        return "Type of number must be integer"
+    # integer arithmetic instead of len(str(number)): the same range for the positive numbers
+    if not MIN_NUMBER <= number <= MAX_NUMBER:
+        return "Length of number must be between 7 and 15"
+    if verdict is not None and verdict(number) != VALID:
+        return INVALID_NUMBER
+    return None
+
+
+def _validate_chunk(
+    start: int, numbers: Iterable[Any], verdict: Optional[Callable[[Any], str]]
+) -> Tuple[List[int], List[Reject]]:
+    valid: List[int] = []
+    rejects: List[Reject] = []
+    for position, number in enumerate(numbers, start):
+        reason = check_number(number, verdict)
+        if reason is None:
+            valid.append(number)
+        else:
+            rejects.append(Reject(position, number, reason))
+    return valid, rejects
+
+
+def _verdict_chunk(numbers: "array[int]", verdict: Callable[[Any], str]) -> bytes:
+    # runs in a worker process: one byte per number, 1 for a valid one
+    return bytes(verdict(number) == VALID for number in numbers)
+
+
+class _Shard(NamedTuple):
+    # the numbers to check with phonenumbers and their positions in the input
+    positions: "array[int]"
+    numbers: "array[int]"
+    # the numbers rejected by the type and length checks since the previous shard
+    rejects: List[Reject]
+
+
+def _shards(numbers: Iterable[Any], size: int) -> Iterator[_Shard]:
+    positions, candidates, rejects = array("q"), array("q"), []
+    for position, number in enumerate(numbers):
+        reason = check_number(number, None)
+        if reason is not None:
+            rejects.append(Reject(position, number, reason))
+            continue
+        positions.append(position)
+        candidates.append(number)
+        if len(candidates) == size:
+            yield _Shard(positions, candidates, rejects)
+            positions, candidates, rejects = array("q"), array("q"), []
+    if candidates or rejects:
+        yield _Shard(positions, candidates, rejects)
+
+
+def _merge(report: ValidationReport, shard: _Shard, flags: bytes) -> None:
+    report.valid.extend(number for number, flag in zip(shard.numbers, flags) if flag)
+    invalid = [
+        Reject(position, number, INVALID_NUMBER)
+        for position, number, flag in zip(shard.positions, shard.numbers, flags)
+        if not flag
+    ]
+    report.rejects.extend(heapq.merge(shard.rejects, invalid, key=lambda reject: reject.position))
+
+
+def validate_numbers(
+    numbers: Iterable[Any],
+    verdict: Optional[Callable[[Any], str]] = number_verdict,
+    processes: int = 1,
+    chunk_size: int = 10_000,
+) -> ValidationReport:
+    """
+    Validates phone numbers in a single pass and reports every rejected number instead of stopping at the first one.
+
+    With several processes the calling process checks the types and lengths and sends the remaining numbers
+    to the workers in chunks packed as int64 arrays, which are much cheaper to pickle than lists of ints.
+    The workers answer with one byte per number, and the results are merged in the input order.
+    At most two chunks per worker are in flight, so the input is read only as fast as it is validated.
+
+    Parameters:
+    numbers (Iterable[Any]): The phone numbers.
+    verdict (Callable[[Any], str], optional): The phonenumbers check, e.g. `PhoneValidationCache.verdict`.
+        None to check only the type and the length. With several processes it must be picklable,
+        and the caches of the worker processes are not shared with the caller.
+    processes (int, optional): The number of worker processes. 1 validates in the calling process.
+    chunk_size (int, optional): The number of numbers sent to a worker process at once.
+
+    Returns:
+    ValidationReport: The valid numbers and the rejects, both in the input order.
+    """
+    if not isinstance(processes, int) or processes <= 0:
+        raise ValueError("processes must be a positive integer")
+    if not isinstance(chunk_size, int) or chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive integer")
+    if processes == 1 or verdict is None:
+        return ValidationReport(*_validate_chunk(0, numbers, verdict))
+
+    # imported on demand: it pulls in multiprocessing
+    from concurrent.futures import ProcessPoolExecutor  # pylint: disable=import-outside-toplevel
+
+    report = ValidationReport([], [])
+    pending: Deque[Tuple[_Shard, Future]] = collections.deque()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for shard in _shards(numbers, chunk_size):
+            pending.append((shard, executor.submit(_verdict_chunk, shard.numbers, verdict)))
+            if len(pending) >= 2 * processes:
+                shard, future = pending.popleft()
+                _merge(report, shard, future.result())
+        while pending:
+            shard, future = pending.popleft()
+            _merge(report, shard, future.result())
+    return report
@@ -4,3 +4,14 @@ DEFAULT_RESPONSE = {
     "data": False,
     "message": "test message",
 }
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
@@ -0,0 +1,183 @@
+"""Micro-benchmarks for the hot paths of the SmsAero client.
+
+Usage:
+    python -m tests.benchmarks            # run all benchmarks
+    python -m tests.benchmarks decode     # run one benchmark
+"""
+
+import json
+import os
+import random
+import subprocess
+import sys
+import timeit
+from typing import Callable, Dict
+from unittest.mock import patch
+
+import requests
+
+from smsaero import PhoneValidationCache, SmsAero
+from smsaero.cost import estimate_cost
+from smsaero.segments import analyze_text
+from smsaero.validation import number_verdict, parse_verdict, validate_numbers
+
+
+BENCHMARKS: Dict[str, Callable[[], None]] = {}
+
+
+def benchmark(func: Callable[[], None]) -> Callable[[], None]:
+    """Registers a benchmark under the name of the function without the `bench_` prefix."""
+    BENCHMARKS[func.__name__[len("bench_"):]] = func
+    return func
+
+
+def report(name: str, seconds: float, number: int) -> None:
+    """Prints the mean time of one call."""
+    print(f"  {name:<40} {seconds / number * 1000:9.3f} ms")
+
+
+def make_client() -> SmsAero:
+    """Creates a client without the network dependent e-mail deliverability check."""
+    with patch("smsaero.SmsAero.init_validate"):
+        return SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+
+
+def sms_list_page(records: int) -> bytes:
+    """Builds the JSON body of a large `sms/list` page."""
+    data: Dict = {
+        str(i): {
+            "id": i,
+            "from": "SMS Aero",
+            "number": str(79030000000 + i),
+            "text": "Hello, World!",
+            "status": 1,
+            "extendStatus": "delivery",
+            "channel": "FREE SIGN",
+            "cost": "5.49",
+            "dateCreate": 1697533302,
+            "dateSend": 1697533302,
+            "dateAnswer": 1697533306,
+        }
+        for i in range(records)
+    }
+    data["links"] = {"self": "/v2/sms/list?page=1", "last": "/v2/sms/list?page=1"}
+    return json.dumps({"success": True, "data": data, "message": None}).encode()
+
+
+@benchmark
+def bench_decode() -> None:
+    """Compares `request()` on a large page with the former three decodes of the same body."""
+    body = sms_list_page(5000)
+    response = requests.Response()
+    response._content = body  # pylint: disable=protected-access
+    response.status_code = 200
+    client = make_client()
+    number = 20
+
+    print(f"decode: sms/list page of {len(body) // 1024} KiB")
+    with patch("requests.Session.post", return_value=response):
+        report("request() + get_response()", timeit.timeit(
+            lambda: (client.request("sms/list"), client.get_response()), number=number
+        ), number)
+    report("3 x response.json() (before)", timeit.timeit(
+        lambda: [response.json() for _ in range(3)], number=number
+    ), number)
+
+
+@benchmark
+def bench_phone_cache() -> None:
+    """Validates 1000 recipients drawn from 200 subscribers with and without the verdict cache."""
+    numbers = [79030000000 + i % 200 for i in range(1000)]
+    cache = PhoneValidationCache()
+    number = 5
+
+    print("phone_cache: 1000 numbers, 200 distinct")
+    report("phonenumbers_validate()", timeit.timeit(
+        lambda: SmsAero.phonenumbers_validate(numbers), number=number
+    ), number)
+    report("phonenumbers_validate(cache=...)", timeit.timeit(
+        lambda: SmsAero.phonenumbers_validate(numbers, cache), number=number
+    ), number)
+
+
+@benchmark
+def bench_fast_path() -> None:
+    """Checks 10k distinct Russian mobile numbers with the prefix index and with the full parse."""
+    rng = random.Random(42)
+    numbers = [79000000000 + rng.randrange(10**9) for _ in range(10_000)]
+    number_verdict(numbers[0])  # builds the table of the 11-digit numbers of +7
+    number = 3
+
+    print(f"fast_path: {len(numbers)} numbers")
+    report("parse_verdict()", timeit.timeit(lambda: [parse_verdict(n) for n in numbers], number=number), number)
+    report("number_verdict()", timeit.timeit(lambda: [number_verdict(n) for n in numbers], number=number), number)
+
+
+@benchmark
+def bench_estimate_cost() -> None:
+    """Estimates the cost of a message to 1M random Russian mobile numbers from a tariffs response."""
+    rng = random.Random(42)
+    numbers = [79000000000 + rng.randrange(10**9) for _ in range(1_000_000)]
+    tariffs = {"FREE SIGN": {"MEGAFON": "8.99", "MTS": "4.99", "BEELINE": "5.49", "TELE2": "4.79", "OTHER": "5.19"}}
+    estimate_cost(numbers[:1], "Hello", tariffs, "FREE SIGN")  # loads the carrier data
+
+    print(f"estimate_cost: {len(numbers)} numbers")
+    report("estimate_cost()", timeit.timeit(
+        lambda: estimate_cost(numbers, "Привет, мир! " * 10, tariffs, "FREE SIGN"), number=1
+    ), 1)
+
+
+@benchmark
+def bench_analyze_text() -> None:
+    """Analyzes 100k campaign texts of mixed lengths, half of them Cyrillic, with transliteration suggested."""
+    rng = random.Random(42)
+    words = ["Hello", "order", "ready", "Привет", "заказ", "готов", "{code}", "№", "«sale»", "😀"]
+    texts = [" ".join(rng.choice(words) for _ in range(rng.randrange(5, 60))) for _ in range(100_000)]
+
+    print(f"analyze_text: {len(texts)} texts")
+    report("analyze_text()", timeit.timeit(lambda: [analyze_text(text) for text in texts], number=1), 1)
+    report("analyze_text(suggest=True)", timeit.timeit(
+        lambda: [analyze_text(text, suggest=True) for text in texts], number=1
+    ), 1)
+
+
+@benchmark
+def bench_validate_scaling() -> None:
+    """Validates 100k distinct numbers in process and with 2, 4, ... worker processes up to the number of cores."""
+    rng = random.Random(42)
+    numbers = [79000000000 + rng.randrange(10**9) for _ in range(100_000)]
+    cores = os.cpu_count() or 1
+
+    print(f"validate_scaling: {len(numbers)} numbers, {cores} cores")
+    report("validate_numbers()", timeit.timeit(lambda: validate_numbers(numbers), number=1), 1)
+    for processes in sorted(({2**i for i in range(1, cores.bit_length())} | {cores}) - {1}):
+        report(f"validate_numbers(processes={processes})", timeit.timeit(
+            lambda: validate_numbers(numbers, processes=processes), number=1  # pylint: disable=cell-var-from-loop
+        ), 1)
+
+
+@benchmark
+def bench_import() -> None:
+    """Measures `import smsaero` in a fresh interpreter with `python -X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import smsaero"], capture_output=True, text=True, check=True
+    )
+    rows = [line[len("import time:"):].split("|") for line in result.stderr.splitlines()[1:]]
+    # the module names are indented by two spaces per nesting level
+    modules = {name.strip(): int(cumulative) for _, cumulative, name in rows if len(name) - len(name.lstrip()) == 3}
+    total = next(int(cumulative) for _, cumulative, name in rows if name.strip() == "smsaero")
+
+    print("import: `import smsaero` and its slowest direct imports")
+    report("smsaero", total / 1e6, 1)
+    for name in sorted(modules, key=modules.__getitem__, reverse=True)[:8]:
+        report("  " + name, modules[name] / 1e6, 1)
+
+
+def main() -> None:
+    """Runs the benchmarks given on the command line, or all of them."""
+    for name in sys.argv[1:] or list(BENCHMARKS):
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
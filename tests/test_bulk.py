@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import unittest
+
+from unittest.mock import patch
+
+from smsaero import SmsAero, SmsAeroException, BulkResult
+from smsaero.bulk import iter_chunks, send_chunks, async_send_chunks
+
+
+class TestBulkHelpers(unittest.TestCase):
+    def test_iter_chunks(self):
+        self.assertEqual(list(iter_chunks(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(iter_chunks([], 2)), [])
+
+    def test_iter_chunks_is_lazy(self):
+        consumed = []
+
+        def numbers():
+            for number in range(10):
+                consumed.append(number)
+                yield number
+
+        chunks = iter_chunks(numbers(), 3)
+        self.assertEqual(next(chunks), [0, 1, 2])
+        self.assertEqual(consumed, [0, 1, 2])
+
+    def test_send_chunks_reports_errors_per_chunk(self):
+        def send(chunk):
+            if chunk[0] == 2:
+                raise SmsAeroException("rejected")
+            return {"count": len(chunk)}
+
+        results = sorted(send_chunks(send, range(5), 2, 2))
+
+        self.assertEqual([result.position for result in results], [0, 1, 2])
+        self.assertEqual(results[0], BulkResult(0, [0, 1], {"count": 2}, None))
+        self.assertTrue(results[0].ok)
+        self.assertFalse(results[1].ok)
+        self.assertEqual(str(results[1].error), "rejected")
+        self.assertIsNone(results[1].result)
+
+    def test_send_chunks_runs_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def send(chunk):
+            barrier.wait()
+            return chunk
+
+        results = list(send_chunks(send, range(30), 10, 3))
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result.ok for result in results))
+
+    def test_send_chunks_bounds_queued_chunks(self):
+        consumed = []
+        release = threading.Event()
+
+        def numbers():
+            for number in range(100):
+                consumed.append(number)
+                yield number
+
+        def send(chunk):
+            release.wait(5)
+            return chunk
+
+        results = send_chunks(send, numbers(), 1, 2)
+        release.set()
+        first = next(results)
+        self.assertTrue(first.ok)
+        self.assertLessEqual(len(consumed), 5)
+        results.close()
+        self.assertLess(len(consumed), 100)
+
+
+class TestAsyncBulkHelpers(unittest.IsolatedAsyncioTestCase):
+    async def test_async_send_chunks_cancels_pending_on_close(self):
+        cancelled = asyncio.Event()
+
+        async def send(chunk):
+            if chunk[0]:
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return chunk
+
+        results = async_send_chunks(send, range(10), 1, 2)
+        first = await results.__anext__()
+        await results.aclose()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        self.assertEqual(first, BulkResult(0, [0], [0], None))
+
+
+class TestSendSmsBulk(unittest.TestCase):
+    def setUp(self):
+        self.smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+
+    @patch.object(SmsAero, "request")
+    def test_send_sms_bulk(self, mock_request):
+        mock_request.side_effect = lambda selector, data: {"numbers": data["numbers"]}
+        numbers = [79031234567, 79038805678, 79038805679]
+
+        results = sorted(self.smsaero.send_sms_bulk(iter(numbers), "Hello, World!", chunk_size=2, concurrency=2))
+
+        self.assertEqual([result.numbers for result in results], [numbers[:2], numbers[2:]])
+        self.assertEqual([result.result for result in results], [{"numbers": numbers[:2]}, {"numbers": numbers[2:]}])
+        mock_request.assert_any_call(
+            "sms/send",
+            {"numbers": numbers[:2], "text": "Hello, World!", "sign": "SMS Aero", "callbackUrl": None},
+        )
+
+    @patch.object(SmsAero, "request")
+    def test_send_sms_bulk_invalid_chunk(self, mock_request):
+        mock_request.return_value = {}
+        results = sorted(self.smsaero.send_sms_bulk([79031234567, 70000000001], "Hello, World!", chunk_size=1))
+
+        self.assertTrue(results[0].ok)
+        self.assertIsInstance(results[1].error, ValueError)
+        mock_request.assert_called_once()
+
+    @patch.object(SmsAero, "request")
+    def test_send_sms_bulk_test_mode(self, mock_request):
+        self.smsaero.enable_test_mode()
+        mock_request.return_value = {}
+        list(self.smsaero.send_sms_bulk([79031234567], "Hello, World!", callback_format="json"))
+        mock_request.assert_called_once_with(
+            "sms/testsend",
+            {
+                "numbers": [79031234567],
+                "text": "Hello, World!",
+                "sign": "SMS Aero",
+                "callbackUrl": None,
+                "callbackFormat": "json",
+            },
+        )
+
+    def test_send_sms_bulk_validates_eagerly(self):
+        with self.assertRaises(ValueError):
+            self.smsaero.send_sms_bulk([79031234567], "t")
+        with self.assertRaises(ValueError):
+            self.smsaero.send_sms_bulk([79031234567], "Hello, World!", chunk_size=0)
@@ -0,0 +1,211 @@
+import asyncio
+import threading
+import unittest
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from smsaero import ClientOptions, ResponseCache, SmsAero, SmsAeroConnectionException
+from smsaero.aio import AsyncSmsAero
+from smsaero.cache import ResponseCacheInfo
+
+from . import FakeClock
+
+
+def wait_for(condition):
+    for _ in range(500):
+        if condition():
+            return
+        threading.Event().wait(0.01)
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(100.0)
+        self.cache = ResponseCache({"tariffs": 60, "balance": 10}, stale=30, maxsize=2, clock=self.clock)
+
+    def test_init_validate(self):
+        with self.assertRaises(ValueError):
+            ResponseCache({"balance": 0})
+        with self.assertRaises(ValueError):
+            ResponseCache(stale=-1)
+        with self.assertRaises(ValueError):
+            ResponseCache(maxsize=0)
+
+    def test_is_cached(self):
+        self.assertTrue(self.cache.is_cached("tariffs"))
+        self.assertFalse(self.cache.is_cached("sms/send"))
+        self.assertEqual(self.cache.get_ttl("balance"), 10)
+        self.assertIsNone(self.cache.get_ttl("sms/send"))
+        self.assertTrue(ResponseCache().is_cached("sign/list"))
+        self.assertEqual(ResponseCache.make_key("sign/list", None, 2), ResponseCache.make_key("sign/list", {}, 2))
+
+    def test_fresh_and_expired(self):
+        send = MagicMock(side_effect=[{"balance": 1}, {"balance": 2}])
+        self.assertEqual(self.cache.fetch("balance", None, None, send), {"balance": 1})
+        self.clock.now += 9
+        response = self.cache.fetch("balance", None, None, send)
+        self.assertEqual(response, {"balance": 1})
+        # the caller gets a copy
+        response["balance"] = 0
+        self.assertEqual(self.cache.fetch("balance", None, None, send), {"balance": 1})
+        self.clock.now += 31
+        self.assertEqual(self.cache.fetch("balance", None, None, send), {"balance": 2})
+        self.assertEqual(self.cache.get_info(), ResponseCacheInfo(2, 0, 2, 0, 1))
+
+    def test_keyed_by_data_and_page(self):
+        send = MagicMock(side_effect=lambda: {"call": send.call_count})
+        self.cache.fetch("tariffs", None, None, send)
+        self.cache.fetch("tariffs", {"a": 1}, None, send)
+        self.cache.fetch("tariffs", None, 2, send)
+        self.assertEqual(send.call_count, 3)
+        # the least recently used response was dropped
+        self.assertEqual(self.cache.fetch("tariffs", None, None, send), {"call": 4})
+
+    def test_stale_while_revalidate(self):
+        refreshed = threading.Event()
+        release = threading.Event()
+
+        def refresh():
+            release.wait(5)
+            refreshed.set()
+            return {"tariffs": 2}
+
+        self.cache.fetch("tariffs", None, None, lambda: {"tariffs": 1})
+        self.clock.now += 70
+        self.assertEqual(self.cache.fetch("tariffs", None, None, refresh), {"tariffs": 1})
+        # a single refresh is in flight
+        self.assertEqual(self.cache.fetch("tariffs", None, None, MagicMock()), {"tariffs": 1})
+        release.set()
+        refreshed.wait(5)
+        wait_for(lambda: self.cache.fetch("tariffs", None, None, MagicMock()) == {"tariffs": 2})
+        self.assertEqual(self.cache.fetch("tariffs", None, None, MagicMock()), {"tariffs": 2})
+        info = self.cache.get_info()
+        self.assertEqual((info.stale_hits, info.refreshes), (2, 1))
+
+    def test_failed_refresh_keeps_stale_response(self):
+        self.cache.fetch("balance", None, None, lambda: {"balance": 1})
+        self.clock.now += 20
+        failed = MagicMock(side_effect=SmsAeroConnectionException("All gates are down"))
+        with self.assertLogs("smsaero.cache", "WARNING"):
+            self.assertEqual(self.cache.fetch("balance", None, None, failed), {"balance": 1})
+            wait_for(lambda: failed.called)
+        # the next stale hit refreshes again
+        wait_for(lambda: self.cache.fetch("balance", None, None, lambda: {"balance": 2}) == {"balance": 2})
+        self.assertEqual(self.cache.fetch("balance", None, None, MagicMock()), {"balance": 2})
+        self.assertEqual(failed.call_count, 1)
+
+    def test_concurrent_misses_send_once(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def send():
+            started.set()
+            release.wait(5)
+            return {"tariffs": 1}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.fetch("tariffs", None, None, send)))]
+        threads[0].start()
+        started.wait(5)
+        threads += [
+            threading.Thread(target=lambda: results.append(self.cache.fetch("tariffs", None, None, MagicMock())))
+            for _ in range(3)
+        ]
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [{"tariffs": 1}] * 4)
+        self.assertEqual(self.cache.get_info().misses, 1)
+
+    def test_failed_miss_is_not_cached(self):
+        failed = MagicMock(side_effect=SmsAeroConnectionException("All gates are down"))
+        with self.assertRaises(SmsAeroConnectionException):
+            self.cache.fetch("tariffs", None, None, failed)
+        self.assertEqual(self.cache.fetch("tariffs", None, None, lambda: {"tariffs": 1}), {"tariffs": 1})
+
+    def test_invalidate(self):
+        self.cache.fetch("balance", None, None, lambda: {"balance": 1})
+        self.cache.fetch("tariffs", None, None, lambda: {"tariffs": 1})
+        self.assertEqual(self.cache.fetch("balance/add", {"sum": 100}, None, lambda: {"sum": 100}), {"sum": 100})
+        self.assertEqual(self.cache.get_info().size, 1)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.get_info().size, 0)
+
+    def test_invalidated_while_in_flight(self):
+        def send():
+            self.cache.invalidate("balance")
+            return {"balance": 1}
+
+        self.assertEqual(self.cache.fetch("balance", None, None, send), {"balance": 1})
+        self.assertEqual(self.cache.get_info().size, 0)
+
+
+class TestSmsAeroCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResponseCache()
+        self.smsaero = SmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(response_cache=self.cache)
+        )
+
+    def test_init_validate(self):
+        with self.assertRaises(TypeError):
+            ClientOptions(response_cache={})
+        self.assertIs(self.smsaero.get_response_cache(), self.cache)
+
+    @patch.object(SmsAero, "send_request")
+    def test_balance(self, send_request):
+        send_request.side_effect = [{"balance": 10.0}, {"sum": 100.0}, {"balance": 110.0}]
+        self.assertEqual(self.smsaero.balance(), {"balance": 10.0})
+        self.assertEqual(self.smsaero.balance(), {"balance": 10.0})
+        self.smsaero.balance_add(100, 1)
+        self.assertEqual(self.smsaero.balance(), {"balance": 110.0})
+        self.assertEqual(send_request.call_count, 3)
+        self.assertEqual(send_request.call_args.args, ("balance", None, None, "https"))
+
+    @patch.object(SmsAero, "send_request")
+    def test_tariffs_and_signs(self, send_request):
+        send_request.return_value = {"data": []}
+        for _ in range(3):
+            self.smsaero.tariffs()
+            self.smsaero.sign_list()
+            self.smsaero.viber_sign_list()
+            self.smsaero.cards()
+        self.assertEqual(send_request.call_count, 4)
+        self.assertEqual(self.cache.get_info().hits, 8)
+
+
+class TestAsyncSmsAeroCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.clock = FakeClock(100.0)
+        self.cache = ResponseCache(stale=60, clock=self.clock)
+        self.smsaero = AsyncSmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(response_cache=self.cache)
+        )
+
+    async def test_concurrent_misses_send_once(self):
+        async def send_request(selector, data, page, proto):
+            await asyncio.sleep(0.01)
+            return {"balance": 10.0}
+
+        with patch.object(AsyncSmsAero, "send_request", AsyncMock(side_effect=send_request)) as mock_send:
+            results = await asyncio.gather(*(self.smsaero.balance() for _ in range(5)))
+            self.assertEqual(results, [{"balance": 10.0}] * 5)
+            self.assertEqual(await self.smsaero.balance_add(100, 1), {"balance": 10.0})
+            self.assertEqual(self.cache.get_info().size, 0)
+        self.assertEqual(mock_send.await_count, 2)
+
+    async def test_stale_while_revalidate(self):
+        with patch.object(AsyncSmsAero, "send_request", AsyncMock(return_value={"tariffs": 1})):
+            await self.smsaero.tariffs()
+        self.clock.now += 3630
+        failed = AsyncMock(side_effect=SmsAeroConnectionException("All gates are down"))
+        with patch.object(AsyncSmsAero, "send_request", failed), self.assertLogs("smsaero.cache", "WARNING"):
+            self.assertEqual(await self.smsaero.tariffs(), {"tariffs": 1})
+            await asyncio.sleep(0)
+        with patch.object(AsyncSmsAero, "send_request", AsyncMock(return_value={"tariffs": 2})):
+            self.assertEqual(await self.smsaero.tariffs(), {"tariffs": 1})
+            await asyncio.sleep(0)
+            self.assertEqual(await self.smsaero.tariffs(), {"tariffs": 2})
+        self.assertEqual(self.cache.get_info().refreshes, 2)
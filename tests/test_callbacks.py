@@ -0,0 +1,106 @@
+import json
+import queue
+import threading
+import unittest
+
+from unittest.mock import MagicMock
+
+import requests
+
+from smsaero.callbacks import CallbackReceiver, DeliveryReport, parse_callback
+
+
+REPORT = {"id": 12345, "number": "79031234567", "status": 1, "extendStatus": "delivery", "dateAnswer": 1697533306}
+
+
+class TestParseCallback(unittest.TestCase):
+    def test_json(self):
+        self.assertEqual(
+            parse_callback(json.dumps(REPORT).encode(), "application/json"),
+            [DeliveryReport(12345, 1, "delivery", REPORT)],
+        )
+        reports = parse_callback(json.dumps([REPORT, dict(REPORT, id=12346)]).encode())
+        self.assertEqual([report.sms_id for report in reports], [12345, 12346])
+        reports = parse_callback(json.dumps({"0": REPORT, "1": dict(REPORT, status=2)}).encode())
+        self.assertEqual([report.status for report in reports], [1, 2])
+
+    def test_form_and_query(self):
+        self.assertEqual(
+            parse_callback(b"id=12345&status=2&extendStatus=undelivered", "application/x-www-form-urlencoded"),
+            [DeliveryReport(12345, 2, "undelivered", {"id": "12345", "status": "2", "extendStatus": "undelivered"})],
+        )
+        self.assertEqual(parse_callback(b"", query="id=1&status=6")[0][:3], (1, 6, ""))
+
+    def test_invalid(self):
+        for body, content_type in [
+            (b"{", ""),
+            (b"[1]", ""),
+            (b'{"id": 1}', ""),
+            (b'{"id": "x", "status": 1}', ""),
+            (b"status=1", ""),
+            (b"", ""),
+            (b"null", "application/json"),
+        ]:
+            with self.assertRaises(ValueError, msg=body):
+                parse_callback(body, content_type)
+
+
+class TestCallbackReceiver(unittest.TestCase):
+    def test_init_validate(self):
+        with self.assertRaises(ValueError):
+            CallbackReceiver()
+        with self.assertRaises(ValueError):
+            CallbackReceiver(print, dedupe_size=0)
+
+    def test_dispatch_and_dedupe(self):
+        reports = []
+        received = queue.Queue()
+        with CallbackReceiver(reports.append, received, path="/callback") as receiver:
+            url = f"http://127.0.0.1:{receiver.get_port()}/callback"
+            self.assertEqual(requests.post(url, json=REPORT, timeout=5).status_code, 200)
+            # the same report sent again, as a form this time
+            self.assertEqual(requests.post(url, data={"id": 12345, "status": 1}, timeout=5).text, "OK")
+            self.assertEqual(requests.get(url, params={"id": 12345, "status": 2}, timeout=5).status_code, 200)
+            self.assertEqual(requests.get(url + "x", timeout=5).status_code, 404)
+            self.assertEqual(requests.post(url, data="{", timeout=5).status_code, 400)
+
+        self.assertEqual([(report.sms_id, report.status) for report in reports], [(12345, 1), (12345, 2)])
+        self.assertEqual(received.qsize(), 2)
+        self.assertEqual(receiver.get_received(), 3)
+        self.assertEqual(receiver.get_duplicates(), 1)
+
+    def test_failed_handler_is_retried(self):
+        calls = []
+
+        def handler(report):
+            calls.append(report)
+            if len(calls) == 1:
+                raise RuntimeError("database is down")
+
+        with CallbackReceiver(handler) as receiver:
+            url = f"http://127.0.0.1:{receiver.get_port()}/"
+            self.assertEqual(requests.post(url, json=REPORT, timeout=5).status_code, 500)
+            self.assertEqual(requests.post(url, json=REPORT, timeout=5).status_code, 200)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(receiver.get_duplicates(), 0)
+
+    def test_dedupe_size(self):
+        handler = MagicMock()
+        receiver = CallbackReceiver(handler, dedupe_size=2)
+        received = [DeliveryReport(sms_id, 1, "", {}) for sms_id in (1, 2, 1, 3, 2)]
+        self.assertEqual([receiver.dispatch(report) for report in received], [True, True, False, True, True])
+        self.assertEqual(handler.call_count, 4)
+        receiver.stop()
+
+    def test_stop_ends_serve_forever(self):
+        reports = []
+        receiver = CallbackReceiver(reports.append)
+        # served by a thread of the caller's own instead of `start()`
+        thread = threading.Thread(target=receiver.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://127.0.0.1:{receiver.get_port()}/"
+        self.assertEqual(requests.post(url, json=REPORT, timeout=5).status_code, 200)
+        receiver.stop()
+        thread.join(3)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(reports), 1)
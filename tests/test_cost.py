@@ -0,0 +1,102 @@
+import unittest
+
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+from smsaero import ClientOptions, CostEstimate, ResponseCache, SmsAero
+from smsaero.aio import AsyncSmsAero
+from smsaero.cost import estimate_cost, number_operator_key
+
+
+TARIFFS = {
+    "FREE SIGN": {"MEGAFON": "8.99", "MTS": "4.99", "BEELINE": "5.49", "TELE2": "4.79", "OTHER": "5.19"},
+    "INFO": {"MEGAFON": "7.99", "BEELINE": "4.49"},
+}
+
+
+class TestNumberOperatorKey(unittest.TestCase):
+    def test_operators(self):
+        self.assertEqual(number_operator_key(79031234567), "BEELINE")
+        self.assertEqual(number_operator_key("79261234567"), "MEGAFON")
+        self.assertEqual(number_operator_key(79501234567), "TELE2")
+        # a range of 10,000 numbers which is split between two operators on the eighth digit
+        self.assertEqual(number_operator_key(79004650123), "GAZPROMTELEKOM")
+        self.assertEqual(number_operator_key(79004651123), "SIMTELECOM")
+        # a range of no known operator
+        self.assertEqual(number_operator_key(78001234567), "OTHER")
+
+    def test_other_numbers(self):
+        for number in (77011234567, 375291234567, 7903123456, "abc", None, True):
+            self.assertIsNone(number_operator_key(number), number)
+
+
+class TestEstimateCost(unittest.TestCase):
+    def test_estimate(self):
+        numbers = [79031234567, 79261234567, 79501234567, 79001234567, 77011234567]
+        self.assertEqual(
+            estimate_cost(iter(numbers), "Hello", TARIFFS, "FREE SIGN"),
+            CostEstimate("GSM-7", 1, 5, Decimal("24.06"), {"BEELINE": 1, "MEGAFON": 1, "TELE2": 2}, 1),
+        )
+        estimate = estimate_cost(numbers, "Привет" * 20, TARIFFS, "FREE SIGN")
+        self.assertEqual((estimate.encoding, estimate.segments, estimate.cost), ("UCS-2", 2, Decimal("48.12")))
+
+    def test_split_ranges(self):
+        numbers = [79004650123, 79004651123, 79004652123, 78001234567]
+        self.assertEqual(estimate_cost(numbers, "Hello", TARIFFS, "FREE SIGN").operators, {"OTHER": 4})
+        self.assertEqual(
+            estimate_cost(numbers, "Hello", {"INFO": {"SIMTELECOM": 1}}, "INFO"),
+            CostEstimate("GSM-7", 1, 4, Decimal(2), {"SIMTELECOM": 2}, 2),
+        )
+
+    def test_mixed_types(self):
+        estimate = estimate_cost(["79031234567", 79261234567, "+7"], "Hello", TARIFFS, "FREE SIGN")
+        self.assertEqual((estimate.recipients, estimate.cost, estimate.unpriced), (3, Decimal("14.48"), 1))
+
+    def test_operator_without_tariff(self):
+        estimate = estimate_cost([79031234567, 79501234567], "Hello", TARIFFS, "INFO")
+        self.assertEqual((estimate.cost, estimate.operators, estimate.unpriced), (Decimal("4.49"), {"BEELINE": 1}, 1))
+
+    def test_unknown_channel(self):
+        with self.assertRaisesRegex(ValueError, "FREE SIGN, INFO"):
+            estimate_cost([79031234567], "Hello", TARIFFS, "DIGITAL")
+
+
+class TestSmsAeroEstimateCost(unittest.TestCase):
+    def setUp(self):
+        self.smsaero = SmsAero(
+            "admin@smsaero.ru",
+            "test_api_key_lX8APMlgliHvkHk04i7",
+            options=ClientOptions(response_cache=ResponseCache()),
+        )
+
+    @patch.object(SmsAero, "send_request")
+    def test_tariffs_are_requested_once(self, send_request):
+        send_request.return_value = TARIFFS
+        for _ in range(3):
+            estimate = self.smsaero.estimate_cost([79031234567, 79261234567], "Hello, World!")
+        self.assertEqual(estimate.cost, Decimal("14.48"))
+        self.assertEqual(send_request.call_count, 1)
+
+    @patch.object(SmsAero, "send_request")
+    def test_given_tariffs(self, send_request):
+        estimate = self.smsaero.estimate_cost([79031234567], "Hello", sign="MySign", channel="INFO", tariffs=TARIFFS)
+        self.assertEqual(estimate.cost, Decimal("4.49"))
+        send_request.assert_not_called()
+
+    def test_validate(self):
+        with self.assertRaises(TypeError):
+            self.smsaero.estimate_cost([79031234567], None, tariffs=TARIFFS)
+        with self.assertRaises(TypeError):
+            self.smsaero.estimate_cost([79031234567], "Hello", channel=1, tariffs=TARIFFS)
+        with self.assertRaises(ValueError):
+            self.smsaero.estimate_cost([79031234567], "Hello", sign="MySign", tariffs=TARIFFS)
+
+
+class TestAsyncSmsAeroEstimateCost(unittest.IsolatedAsyncioTestCase):
+    async def test_estimate_cost(self):
+        smsaero = AsyncSmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+        with patch.object(AsyncSmsAero, "request", AsyncMock(return_value=TARIFFS)) as request:
+            estimate = await smsaero.estimate_cost([79031234567], "Hello")
+            self.assertEqual(await smsaero.estimate_cost([79031234567], "Hello", tariffs=TARIFFS), estimate)
+        self.assertEqual(estimate.cost, Decimal("5.49"))
+        self.assertEqual(request.await_count, 1)
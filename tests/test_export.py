@@ -0,0 +1,138 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from unittest.mock import patch, AsyncMock
+
+from smsaero import SmsAero, CsvExporter, FileExporter, NdjsonExporter
+from smsaero.aio import AsyncSmsAero
+
+from .test_pagination import make_request
+
+
+class CrashingNdjsonExporter(NdjsonExporter):
+    # writes the page but dies before saving the checkpoint
+    def __init__(self, path, crash_on):
+        super().__init__(path)
+        self.crash_on = crash_on
+
+    def write_page(self, number, records):
+        if number == self.crash_on:
+            with open(self.get_path(), "ab") as file:
+                file.write(self.encode_page(records))
+            raise KeyboardInterrupt
+        super().write_page(number, records)
+
+
+class TestExporters(unittest.TestCase):
+    def setUp(self):
+        self.smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.directory.name, "sms.jsonl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read_ids(self):
+        with open(self.path, encoding="utf-8") as file:
+            return [json.loads(line)["id"] for line in file]
+
+    @patch.object(SmsAero, "request")
+    def test_ndjson(self, mock_request):
+        mock_request.side_effect = make_request(3)
+        exporter = NdjsonExporter(self.path, fsync=True)
+        exported = self.smsaero.export_to_file(lambda page: self.smsaero.sms_list(page=page), exporter, concurrency=2)
+        self.assertEqual(exported, 6)
+        self.assertEqual(self.read_ids(), [0, 1, 2, 3, 4, 5])
+        with open(exporter.get_checkpoint_path(), encoding="utf-8") as file:
+            self.assertEqual(json.load(file)["page"], 3)
+
+    @patch.object(SmsAero, "request")
+    def test_resume_after_crash(self, mock_request):
+        mock_request.side_effect = make_request(5)
+        fetch = lambda page: self.smsaero.sms_list(page=page)  # noqa: E731
+        with self.assertRaises(KeyboardInterrupt):
+            self.smsaero.export_to_file(fetch, CrashingNdjsonExporter(self.path, crash_on=3), concurrency=1)
+        # page 3 was written after the last checkpoint
+        self.assertEqual(self.read_ids(), [0, 1, 2, 3, 4, 5])
+
+        mock_request.reset_mock()
+        exported = self.smsaero.export_to_file(fetch, NdjsonExporter(self.path), concurrency=1)
+        self.assertEqual(exported, 6)
+        self.assertEqual(self.read_ids(), list(range(10)))
+        self.assertEqual([call.args[2] for call in mock_request.call_args_list], [3, 4, 5])
+
+    @patch.object(SmsAero, "request")
+    def test_new_export_without_checkpoint(self, mock_request):
+        mock_request.side_effect = make_request(1)
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("old\n")
+        exporter = NdjsonExporter(self.path, checkpoint_path=os.path.join(self.directory.name, "checkpoint"))
+        self.smsaero.export_to_file(lambda page: self.smsaero.sms_list(page=page), exporter)
+        self.assertEqual(self.read_ids(), [0, 1])
+        self.assertEqual(exporter.get_next_page(), 2)
+
+        # the output was removed: the checkpoint is ignored
+        os.remove(self.path)
+        self.smsaero.export_to_file(lambda page: self.smsaero.sms_list(page=page), exporter)
+        self.assertEqual(self.read_ids(), [0, 1])
+
+    @patch.object(SmsAero, "request")
+    def test_csv(self, mock_request):
+        mock_request.side_effect = [
+            {"0": {"id": 1, "number": "79031234567", "operators": {"1": "MEGAFON"}}, "links": {"last": "?page=1"}},
+            {"0": {"id": 2, "number": "79031234568", "text": "ignored"}, "links": {"last": "?page=2"}},
+        ]
+        path = os.path.join(self.directory.name, "sms.csv")
+        self.assertEqual(self.smsaero.export_to_file(self.smsaero.sign_list, CsvExporter(path), concurrency=1), 1)
+        # resumed in a new process: the columns come from the checkpoint
+        self.assertEqual(self.smsaero.export_to_file(self.smsaero.sign_list, CsvExporter(path), concurrency=1), 1)
+        with open(path, encoding="utf-8", newline="") as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(
+            rows,
+            [["id", "number", "operators"], ["1", "79031234567", '{"1": "MEGAFON"}'], ["2", "79031234568", ""]],
+        )
+
+    @patch.object(SmsAero, "request")
+    def test_csv_fields(self, mock_request):
+        mock_request.side_effect = make_request(1)
+        path = os.path.join(self.directory.name, "sms.csv")
+        exporter = CsvExporter(path, fields=["id"], dialect="unix")
+        self.smsaero.export_to_file(lambda page: self.smsaero.sms_list(page=page), exporter)
+        with open(path, encoding="utf-8") as file:
+            self.assertEqual(file.read(), '"id"\n"0"\n"1"\n')
+
+    def test_errors(self):
+        with self.assertRaises(TypeError):
+            self.smsaero.export_to_file(lambda page: self.smsaero.sms_list(page=page), self.path)
+        with self.assertRaises(ValueError):
+            NdjsonExporter(self.path).write_page(1, [])
+        with self.assertRaises(TypeError):
+            FileExporter(self.path)
+
+    def test_open_exporter_is_not_reopened(self):
+        exporter = NdjsonExporter(self.path)
+        exporter.open()
+        exporter.write_page(1, [{"id": 0}])
+        with exporter:
+            exporter.write_page(2, [{"id": 1}])
+        exporter.close()
+        self.assertEqual(self.read_ids(), [0, 1])
+
+
+class TestAsyncExport(unittest.IsolatedAsyncioTestCase):
+    async def test_export_to_file(self):
+        smsaero = AsyncSmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "contacts.jsonl")
+            with patch.object(AsyncSmsAero, "request", AsyncMock(side_effect=make_request(2))):
+                exported = await smsaero.export_to_file(
+                    lambda page: smsaero.contact_list(page=page), NdjsonExporter(path)
+                )
+                with self.assertRaises(TypeError):
+                    await smsaero.export_to_file(smsaero.contact_list, path)
+            self.assertEqual(exported, 4)
+        await smsaero.close()
@@ -0,0 +1,117 @@
+import itertools
+import random
+import re
+import unittest
+
+from unittest.mock import patch
+
+from smsaero.fastpath import FAST_PATH_COUNTRY_CODES, Automaton, PrefixIndex, UnsupportedPattern
+from smsaero.validation import INVALID, VALID, number_verdict, parse_verdict
+
+
+def accepts(automaton, digits):
+    states = automaton.start
+    for digit in digits:
+        states = automaton.step(states, digit)
+    return automaton.accepts(states)
+
+
+class TestAutomaton(unittest.TestCase):
+    def test_matches_like_re(self):
+        patterns = [
+            "1?2",
+            "1*2",
+            "(?:12)+3",
+            "1{2,}",
+            "1{0}2",
+            "(?:1|23){0,2}4",
+            "[1-3]{1,3}",
+            "[^1-8]\\d?",
+            "[\\d]0",
+            "(1|2)*",
+            "(?:1?2?){2}3",
+            "",
+        ]
+        for pattern in patterns:
+            automaton = Automaton(pattern)
+            for length in range(6):
+                for digits in map("".join, itertools.product("0123", repeat=length)):
+                    self.assertEqual(
+                        accepts(automaton, digits), bool(re.fullmatch(pattern, digits)), (pattern, digits)
+                    )
+
+    def test_end_anchor(self):
+        with self.assertRaises(UnsupportedPattern):
+            Automaton("8$")
+        automaton = Automaton("(8)$", ignore_end_anchor=True)
+        self.assertTrue(accepts(automaton, "8"))
+
+    def test_unsupported_patterns(self):
+        for pattern in ["(?=1)2", "(12", "12)", "1{a}", "1{1,b}", "[a-z]", "a", "."]:
+            with self.assertRaises(UnsupportedPattern, msg=pattern):
+                Automaton(pattern)
+
+    def test_completions(self):
+        automaton = Automaton("9\\d{2}|8[01]\\d")
+        self.assertEqual(automaton.completions(automaton.start, 3), (True, False))
+        self.assertEqual(automaton.completions(automaton.step(automaton.start, "9"), 2), (True, True))
+        self.assertEqual(automaton.completions(automaton.step(automaton.start, "7"), 2), (False, False))
+        self.assertTrue(automaton.can_accept_within(automaton.start, 3))
+        self.assertFalse(automaton.can_accept_within(automaton.start, 2))
+
+
+class TestPrefixIndex(unittest.TestCase):
+    def test_russian_mobile(self):
+        index = PrefixIndex()
+        self.assertEqual(index.lookup(79031234567), VALID)
+        self.assertEqual(index.lookup(71000000001), INVALID)
+        self.assertEqual(index.get_table(7, 10)[0][9], VALID)
+
+    def test_other_numbers_are_parsed(self):
+        index = PrefixIndex()
+        # not an indexed country code
+        self.assertIsNone(index.lookup(4915123456789))
+        # the national number starts with 0
+        self.assertIsNone(index.lookup(3800501234567))
+        # too short for a national number
+        self.assertIsNone(index.lookup(3751))
+
+    def test_country_with_unsupported_pattern(self):
+        with patch("smsaero.fastpath._Country", side_effect=UnsupportedPattern("(?=1)")):
+            index = PrefixIndex()
+            self.assertIsNone(index.lookup(79031234567))
+        self.assertEqual(index.get_table(7, 10), [{}])
+
+    def test_limits(self):
+        index = PrefixIndex(max_depth=1)
+        self.assertEqual(len(index.get_table(7, 10)), 1)
+        self.assertIsNone(index.lookup(74951234567))
+        index = PrefixIndex(max_blocks=1)
+        self.assertEqual(number_verdict(74951234567), VALID)
+        self.assertIn(index.lookup(74951234567), (VALID, None))
+
+    def test_same_verdicts_as_parsing(self):
+        index = PrefixIndex()
+        rng = random.Random(42)
+        numbers = []
+        for code in FAST_PATH_COUNTRY_CODES:
+            for digits in range(7, 16):
+                length = digits - len(str(code))
+                numbers.extend(code * 10**length + rng.randrange(10**length) for _ in range(100))
+                # a number from every block the table decides
+                for depth, level in enumerate(index.get_table(code, length), 1):
+                    for prefix, verdict in level.items():
+                        if verdict is not None:
+                            rest = length - depth
+                            numbers.append((code * 10**depth + prefix) * 10**rest + rng.randrange(10**rest))
+        for number in numbers:
+            verdict = index.lookup(number)
+            if verdict is not None:
+                self.assertEqual(verdict, parse_verdict(number), number)
+            self.assertEqual(number_verdict(number), parse_verdict(number), number)
+
+    def test_most_russian_mobiles_are_indexed(self):
+        index = PrefixIndex()
+        rng = random.Random(42)
+        numbers = [79000000000 + rng.randrange(10**9) for _ in range(1000)]
+        self.assertEqual(sum(index.lookup(number) is not None for number in numbers), len(numbers))
@@ -0,0 +1,193 @@
+import unittest
+
+from unittest.mock import patch, MagicMock
+
+from requests.exceptions import ConnectionError, SSLError, Timeout
+
+from smsaero import ClientOptions, SmsAero, GateHealth, ProtocolMemory, SmsAeroConnectionException
+
+from . import DEFAULT_RESPONSE, FakeClock
+
+
+GATES = ["@a/v2/", "@b/v2/", "@c/v2/"]
+
+
+class TestGateHealth(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(1000.0)
+        self.health = GateHealth(cooldown=10, max_cooldown=25, clock=self.clock)
+
+    def test_init_validate(self):
+        with self.assertRaises(ValueError):
+            GateHealth(alpha=0)
+        with self.assertRaises(ValueError):
+            GateHealth(cooldown=-1)
+
+    def test_order_keeps_original_order_without_stats(self):
+        self.assertEqual(self.health.order(GATES), GATES)
+        self.assertIsNone(self.health.get_last_good())
+
+    def test_last_good_gate_is_first(self):
+        self.health.record_success("@c/v2/", 0.5)
+        self.health.record_success("@a/v2/", 0.1)
+        self.health.record_success("@c/v2/", 0.5)
+
+        self.assertEqual(self.health.get_last_good(), "@c/v2/")
+        self.assertEqual(self.health.order(GATES), ["@c/v2/", "@b/v2/", "@a/v2/"])
+
+    def test_failed_gate_cools_down(self):
+        self.health.record_success("@a/v2/", 0.1)
+        self.health.record_failure("@a/v2/")
+
+        self.assertTrue(self.health.is_cooling_down("@a/v2/"))
+        self.assertIsNone(self.health.get_last_good())
+        self.assertEqual(self.health.order(GATES), ["@b/v2/", "@c/v2/", "@a/v2/"])
+
+        self.clock.now += 10
+        self.assertFalse(self.health.is_cooling_down("@a/v2/"))
+        # the error rate still ranks the gate below the untried ones
+        self.assertEqual(self.health.order(GATES), ["@b/v2/", "@c/v2/", "@a/v2/"])
+        self.assertGreater(self.health.score("@a/v2/"), self.health.score("@b/v2/"))
+
+    def test_cooldown_grows_with_consecutive_failures(self):
+        self.health.record_failure("@a/v2/")
+        self.health.record_failure("@a/v2/")
+        self.assertEqual(self.health.get_stats("@a/v2/").cooldown_until, 1020)
+        self.health.record_failure("@a/v2/")
+        self.assertEqual(self.health.get_stats("@a/v2/").cooldown_until, 1025)
+        self.health.record_failure("@b/v2/")
+        # gates in cool-down are still tried, the one recovering sooner first
+        self.assertEqual(self.health.order(GATES), ["@c/v2/", "@b/v2/", "@a/v2/"])
+
+    def test_success_resets_cooldown_and_averages_latency(self):
+        self.health.record_failure("@a/v2/")
+        self.health.record_success("@a/v2/", 1.0)
+        self.health.record_success("@a/v2/", 2.0)
+
+        stats = self.health.get_stats("@a/v2/")
+        self.assertEqual(stats.failures, 0)
+        self.assertFalse(self.health.is_cooling_down("@a/v2/"))
+        self.assertAlmostEqual(stats.latency, 1.3)
+        self.assertAlmostEqual(stats.error_rate, 0.3 * 0.7 * 0.7)
+
+
+class TestProtocolMemory(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(1000.0)
+        self.memory = ProtocolMemory(ttl=60, clock=self.clock)
+
+    def test_init_validate(self):
+        with self.assertRaises(ValueError):
+            ProtocolMemory(ttl=0)
+
+    def test_downgrade_expires(self):
+        self.assertEqual(self.memory.protocol("@a/v2/"), "https")
+        self.memory.record_ssl_error("@a/v2/")
+
+        self.assertEqual(self.memory.protocol("@a/v2/"), "http")
+        self.assertEqual(self.memory.protocol("@b/v2/"), "https")
+        self.assertEqual(self.memory.get_downgraded(), ["@a/v2/"])
+
+        self.clock.now += 60
+        self.assertEqual(self.memory.get_downgraded(), [])
+        self.assertEqual(self.memory.protocol("@a/v2/"), "https")
+        self.assertEqual(self.memory.get_downgrades(), 1)
+        self.assertEqual(self.memory.get_skipped_handshakes(), 1)
+
+    def test_explicit_protocol_is_kept(self):
+        self.memory.record_ssl_error("@a/v2/")
+        self.assertEqual(self.memory.protocol("@a/v2/", "http"), "http")
+        self.assertEqual(self.memory.get_skipped_handshakes(), 0)
+
+    def test_forget(self):
+        self.memory.record_ssl_error("@a/v2/")
+        self.memory.record_ssl_error("@b/v2/")
+        self.memory.forget("@a/v2/")
+        self.assertEqual(self.memory.get_downgraded(), ["@b/v2/"])
+        self.memory.forget()
+        self.assertEqual(self.memory.get_downgraded(), [])
+
+
+class TestSmsAeroGateHealth(unittest.TestCase):
+    def setUp(self):
+        self.smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+
+    def test_gate_health_type(self):
+        with self.assertRaises(TypeError):
+            ClientOptions(gate_health="sticky")
+        health = GateHealth()
+        smsaero = SmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(gate_health=health)
+        )
+        self.assertIs(smsaero.get_gate_health(), health)
+
+    @patch("requests.Session.post")
+    def test_failed_gate_is_skipped_by_next_request(self, mock_post):
+        response = MagicMock(json=MagicMock(return_value=DEFAULT_RESPONSE))
+        mock_post.side_effect = [Timeout, response, response]
+
+        self.smsaero.balance()
+        self.smsaero.balance()
+
+        urls = [call[0][0] for call in mock_post.call_args_list]
+        self.assertIn("@gate.smsaero.ru/v2/balance", urls[0])
+        self.assertIn("@gate.smsaero.org/v2/balance", urls[1])
+        self.assertIn("@gate.smsaero.org/v2/balance", urls[2])
+        self.assertTrue(self.smsaero.get_gate_health().is_cooling_down("@gate.smsaero.ru/v2/"))
+
+    @patch("requests.Session.post")
+    def test_all_gates_failed(self, mock_post):
+        mock_post.side_effect = ConnectionError
+
+        with self.assertRaises(SmsAeroConnectionException):
+            self.smsaero.balance()
+
+        health = self.smsaero.get_gate_health()
+        self.assertTrue(all(health.is_cooling_down(gate) for gate in SmsAero.GATE_URLS))
+        self.assertEqual(mock_post.call_count, 3)
+
+
+class TestSmsAeroProtocolMemory(unittest.TestCase):
+    def test_protocol_memory_type(self):
+        with self.assertRaises(TypeError):
+            ClientOptions(protocol_memory=True)
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+        self.assertIsNone(smsaero.get_protocol_memory())
+
+    @patch("requests.Session.post")
+    def test_ssl_error_is_forgotten_without_memory(self, mock_post):
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", url_gate="@local.host/v2/")
+        response = MagicMock(json=MagicMock(return_value=DEFAULT_RESPONSE))
+        mock_post.side_effect = [SSLError, response]
+
+        with self.assertRaises(SmsAeroConnectionException):
+            smsaero.balance()
+        smsaero.balance()
+
+        self.assertTrue(mock_post.call_args_list[1][0][0].startswith("https://"))
+
+    @patch("requests.Session.post")
+    def test_ssl_error_is_remembered(self, mock_post):
+        memory = ProtocolMemory()
+        smsaero = SmsAero(
+            "admin@smsaero.ru",
+            "test_api_key_lX8APMlgliHvkHk04i7",
+            url_gate="@local.host/v2/",
+            options=ClientOptions(protocol_memory=memory),
+        )
+        response = MagicMock(json=MagicMock(return_value=DEFAULT_RESPONSE))
+        mock_post.side_effect = [SSLError, response, response]
+
+        with self.assertRaises(SmsAeroConnectionException):
+            smsaero.balance()
+        smsaero.balance()
+        smsaero.balance()
+
+        urls = [call[0][0] for call in mock_post.call_args_list]
+        self.assertTrue(urls[0].startswith("https://"))
+        self.assertTrue(urls[1].startswith("http://"))
+        self.assertTrue(urls[2].startswith("http://"))
+        self.assertIs(smsaero.get_protocol_memory(), memory)
+        self.assertEqual(memory.get_downgraded(), ["@local.host/v2/"])
+        self.assertEqual(memory.get_downgrades(), 1)
+        self.assertEqual(memory.get_skipped_handshakes(), 2)
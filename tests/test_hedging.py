@@ -0,0 +1,314 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock, AsyncMock
+
+import aiohttp
+
+from requests.exceptions import ConnectionError, SSLError
+
+from smsaero import ClientOptions, SmsAero, HedgePolicy, SmsAeroConnectionException
+from smsaero.aio import AsyncSmsAero
+from smsaero.hedging import hedge, async_hedge
+
+from . import DEFAULT_RESPONSE
+
+
+class TestHedgePolicy(unittest.TestCase):
+    def test_init_validate(self):
+        with self.assertRaises(ValueError):
+            HedgePolicy(percentile=0)
+        with self.assertRaises(ValueError):
+            HedgePolicy(delay=10, max_delay=5)
+        with self.assertRaises(ValueError):
+            HedgePolicy(max_hedges=0)
+
+    def test_only_reads_are_hedged(self):
+        policy = HedgePolicy()
+        self.assertTrue(policy.is_hedged("sms/status"))
+        self.assertTrue(policy.is_hedged("balance"))
+        self.assertFalse(policy.is_hedged("sms/send"))
+        self.assertFalse(policy.is_hedged("mobile-id/verify"))
+        self.assertTrue(HedgePolicy(selectors=["sms/send"]).is_hedged("sms/send"))
+
+    def test_delay_is_latency_percentile(self):
+        policy = HedgePolicy(delay=0.1, percentile=95, min_delay=0.05, max_delay=0.15, min_samples=20)
+        for i in range(19):
+            policy.record_latency((i + 1) / 100)
+        self.assertEqual(policy.get_delay(), 0.1)
+        policy.record_latency(0.2)
+        self.assertEqual(policy.get_delay(), 0.15)
+
+        policy = HedgePolicy(percentile=50, min_samples=4)
+        for latency in (0.1, 0.4, 0.2, 0.3):
+            policy.record_latency(latency)
+        self.assertEqual(policy.get_delay(), 0.2)
+
+    def test_counters(self):
+        policy = HedgePolicy()
+        policy.record_hedge(True)
+        policy.record_hedge(False)
+        self.assertEqual(policy.get_hedges(), 2)
+        self.assertEqual(policy.get_hedge_wins(), 1)
+        self.assertEqual(policy.get_max_hedges(), 1)
+
+
+class TestHedge(unittest.TestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=3)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown()
+
+    def attempt(self, gate):
+        if gate == "slow":
+            self.release.wait(5)
+        if gate == "down":
+            raise ConnectionError
+        if gate == "broken":
+            raise KeyError(gate)
+        return gate.upper()
+
+    def test_slow_gate_is_hedged(self):
+        result = hedge(self.attempt, ["slow", "fast", "other"], 0.01, 1, self.executor, (ConnectionError,))
+        self.assertEqual(result, ("fast", "FAST", True))
+
+    def test_fast_gate_is_not_hedged(self):
+        result = hedge(self.attempt, ["fast", "slow"], 1, 1, self.executor, (ConnectionError,))
+        self.assertEqual(result, ("fast", "FAST", False))
+
+    def test_failed_gate_is_replaced(self):
+        result = hedge(self.attempt, ["down", "fast"], 1, 1, self.executor, (ConnectionError,))
+        self.assertEqual(result, ("fast", "FAST", False))
+
+    def test_every_gate_failed(self):
+        with self.assertRaises(LookupError):
+            hedge(self.attempt, ["down", "down"], 1, 1, self.executor, (ConnectionError,))
+
+    def test_unexpected_error_is_raised(self):
+        with self.assertRaises(KeyError):
+            hedge(self.attempt, ["broken", "fast"], 1, 1, self.executor, (ConnectionError,))
+
+    def test_delay_starts_with_the_attempt(self):
+        starts = {}
+
+        def attempt(gate):
+            starts[gate] = time.monotonic()
+            return self.attempt(gate.rstrip("0123456789"))
+
+        busy = ThreadPoolExecutor(max_workers=3)
+        for _ in range(2):
+            busy.submit(time.sleep, 0.2)
+        # the extra gates wait for a worker; the second one is not asked until 0.05s after the first one started
+        started = time.monotonic()
+        result = hedge(attempt, ["slow1", "slow2", "fast"], 0.05, 2, busy, (ConnectionError,))
+        self.assertEqual(result, ("fast", "FAST", True))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertGreaterEqual(starts["fast"] - starts["slow2"], 0.05)
+        self.release.set()
+        busy.shutdown()
+
+    def test_attempts_run_on_the_executor(self):
+        threads = {}
+
+        def attempt(gate):
+            threads[gate] = threading.current_thread().name
+            return self.attempt(gate)
+
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pool")
+        result = hedge(attempt, ["slow", "fast"], 0.01, 1, executor, (ConnectionError,))
+        self.assertEqual(result, ("fast", "FAST", True))
+        self.assertTrue(all(name.startswith("pool") for name in threads.values()))
+        self.release.set()
+        executor.shutdown()
+
+    def test_queued_attempt_is_not_sent(self):
+        asked = []
+
+        def attempt(gate):
+            asked.append(gate)
+            # keeps the only worker busy after this attempt, ahead of the extra gate
+            busy.submit(time.sleep, 0.2)
+            time.sleep(0.1)
+            return gate.upper()
+
+        busy = ThreadPoolExecutor(max_workers=1)
+        result = hedge(attempt, ["first", "extra"], 0.05, 1, busy, (ConnectionError,))
+        self.assertEqual(result, ("first", "FIRST", True))
+        busy.shutdown()
+        self.assertEqual(asked, ["first"])
+
+
+class TestAsyncHedge(unittest.IsolatedAsyncioTestCase):
+    async def attempt(self, gate):
+        if gate == "slow":
+            await asyncio.sleep(5)
+        if gate == "down":
+            raise ConnectionError
+        if gate == "broken":
+            raise KeyError(gate)
+        return gate.upper()
+
+    async def test_slow_gate_is_hedged_and_cancelled(self):
+        started = time.monotonic()
+        result = await async_hedge(self.attempt, ["slow", "fast"], 0.01, 1, (ConnectionError,))
+        self.assertEqual(result, ("fast", "FAST", True))
+        self.assertLess(time.monotonic() - started, 1)
+
+    async def test_failed_gate_is_replaced(self):
+        result = await async_hedge(self.attempt, ["down", "fast"], 1, 1, (ConnectionError,))
+        self.assertEqual(result, ("fast", "FAST", False))
+
+    async def test_every_gate_failed(self):
+        with self.assertRaises(LookupError):
+            await async_hedge(self.attempt, ["down"], 1, 1, (ConnectionError,))
+
+    async def test_unexpected_error_is_raised(self):
+        with self.assertRaises(KeyError):
+            await async_hedge(self.attempt, ["broken", "fast"], 1, 1, (ConnectionError,))
+
+
+class TestSmsAeroHedging(unittest.TestCase):
+    def setUp(self):
+        self.policy = HedgePolicy(delay=0.01, min_delay=0)
+        self.smsaero = SmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(hedge_policy=self.policy)
+        )
+
+    def tearDown(self):
+        self.smsaero.close()
+
+    def test_close_shuts_the_executor_down(self):
+        executor = self.smsaero.get_hedge_executor()
+        with self.smsaero:
+            self.assertIs(self.smsaero.get_hedge_executor(), executor)
+        with self.assertRaises(RuntimeError):
+            executor.submit(int)
+        self.assertIsNot(self.smsaero.get_hedge_executor(), executor)
+
+    def test_hedge_policy_type(self):
+        with self.assertRaises(TypeError):
+            SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(hedge_policy=0.95))
+        self.assertIs(self.smsaero.get_hedge_policy(), self.policy)
+
+    @patch("requests.Session.post")
+    def test_slow_read_is_hedged(self, mock_post):
+        def post(url, **kwargs):
+            if "gate.smsaero.ru" in url:
+                time.sleep(0.2)
+            return MagicMock(status_code=200, json=MagicMock(return_value=DEFAULT_RESPONSE))
+
+        mock_post.side_effect = post
+
+        self.assertEqual(self.smsaero.balance(), False)
+        self.assertEqual(self.smsaero.get_last_result().gate, "@gate.smsaero.org/v2/")
+        self.assertEqual(self.policy.get_hedges(), 1)
+        self.assertEqual(self.policy.get_hedge_wins(), 1)
+        self.assertEqual(self.smsaero.get_gate_health().get_last_good(), "@gate.smsaero.org/v2/")
+
+    @patch("requests.Session.post")
+    def test_concurrent_reads_are_not_hedged(self, mock_post):
+        def post(url, **kwargs):
+            time.sleep(0.05)
+            return MagicMock(status_code=200, json=MagicMock(return_value=DEFAULT_RESPONSE))
+
+        mock_post.side_effect = post
+        policy = HedgePolicy(delay=0.2, min_delay=0.2)
+        smsaero = SmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(hedge_policy=policy)
+        )
+        # many more callers than the 10 workers of the pool: the time spent waiting for a worker is not a delay
+        threads = [threading.Thread(target=smsaero.balance) for _ in range(100)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        smsaero.close()
+
+        self.assertEqual(mock_post.call_count, 100)
+        self.assertEqual(policy.get_hedges(), 0)
+
+    @patch("requests.Session.post")
+    def test_write_is_not_hedged(self, mock_post):
+        def post(url, **kwargs):
+            time.sleep(0.05)
+            return MagicMock(status_code=200, json=MagicMock(return_value=DEFAULT_RESPONSE))
+
+        mock_post.side_effect = post
+
+        self.smsaero.send_sms(79031234567, "test message")
+        mock_post.assert_called_once()
+        self.assertEqual(self.policy.get_hedges(), 0)
+
+    @patch("requests.Session.post")
+    def test_ssl_error_switches_next_gates_to_http(self, mock_post):
+        response = MagicMock(status_code=200, json=MagicMock(return_value=DEFAULT_RESPONSE))
+        mock_post.side_effect = [SSLError, response]
+
+        self.smsaero.balance()
+
+        urls = [call[0][0] for call in mock_post.call_args_list]
+        self.assertTrue(urls[0].startswith("https://"))
+        self.assertTrue(urls[1].startswith("http://"))
+        self.assertEqual(self.policy.get_hedges(), 0)
+
+    @patch("requests.Session.post")
+    def test_every_gate_failed(self, mock_post):
+        mock_post.side_effect = ConnectionError
+
+        with self.assertRaises(SmsAeroConnectionException):
+            self.smsaero.balance()
+        self.assertEqual(mock_post.call_count, 3)
+
+
+class TestAsyncSmsAeroHedging(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.policy = HedgePolicy(delay=0.01, min_delay=0)
+        self.smsaero = AsyncSmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(hedge_policy=self.policy)
+        )
+
+    async def asyncTearDown(self):
+        await self.smsaero.close()
+
+    @staticmethod
+    def post(url, json):
+        async def decode(**kwargs):
+            if "gate.smsaero.ru" in url:
+                await asyncio.sleep(5)
+            return DEFAULT_RESPONSE
+
+        context = MagicMock()
+        context.__aenter__ = AsyncMock(return_value=MagicMock(status=200, json=decode))
+        context.__aexit__ = AsyncMock(return_value=False)
+        return context
+
+    async def test_slow_read_is_hedged(self):
+        with patch("aiohttp.ClientSession.post", MagicMock(side_effect=self.post)):
+            self.assertEqual(await self.smsaero.sms_status(1), False)
+
+        self.assertEqual(self.smsaero.get_last_result().gate, "@gate.smsaero.org/v2/")
+        self.assertEqual(self.policy.get_hedge_wins(), 1)
+
+    async def test_ssl_error_and_failures(self):
+        post = MagicMock(
+            side_effect=[aiohttp.ClientSSLError(MagicMock(), OSError()), aiohttp.ClientConnectionError(), OSError()]
+        )
+        with patch("aiohttp.ClientSession.post", post):
+            with self.assertRaises(OSError):
+                await self.smsaero.balance()
+
+        urls = [call[0][0] for call in post.call_args_list]
+        self.assertTrue(urls[0].startswith("https://"))
+        self.assertTrue(urls[1].startswith("http://"))
+
+    async def test_every_gate_failed(self):
+        post = MagicMock(side_effect=aiohttp.ClientConnectionError())
+        with patch("aiohttp.ClientSession.post", post):
+            with self.assertRaises(SmsAeroConnectionException):
+                await self.smsaero.balance()
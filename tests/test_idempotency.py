@@ -0,0 +1,274 @@
+import asyncio
+import datetime
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from smsaero import ClientOptions, IdempotencyStore, SmsAero, SmsAeroConnectionException
+from smsaero.aio import AsyncSmsAero
+
+from . import FakeClock
+
+
+class TestIdempotencyStore(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = IdempotencyStore(window=60, maxsize=2, clock=self.clock)
+
+    def test_init_validate(self):
+        with self.assertRaises(ValueError):
+            IdempotencyStore(window=0)
+        with self.assertRaises(ValueError):
+            IdempotencyStore(maxsize=0)
+
+    def test_make_key(self):
+        key = IdempotencyStore.make_key("send_sms", 79031234567, "Привет", None)
+        self.assertEqual(len(key), 64)
+        self.assertEqual(key, IdempotencyStore.make_key("send_sms", 79031234567, "Привет", None))
+        self.assertNotEqual(key, IdempotencyStore.make_key("send_sms", 79031234567, "Привет", "order-1"))
+
+    def test_window_and_maxsize(self):
+        self.assertEqual(self.store.get_window(), 60)
+        self.store.put("a", {"id": 1})
+        self.clock.now += 59
+        self.assertEqual(self.store.get("a"), {"id": 1})
+        self.clock.now += 1
+        self.assertIsNone(self.store.get("a"))
+
+        for key in ("a", "b", "c"):
+            self.store.put(key, {"id": key})
+        self.assertIsNone(self.store.get("a"))
+        self.assertEqual(self.store.get("c"), {"id": "c"})
+        self.store.clear()
+        self.assertIsNone(self.store.get("c"))
+
+    def test_run(self):
+        send = MagicMock(side_effect=[SmsAeroConnectionException("All gates are down"), {"id": 1}, {"id": 2}])
+        with self.assertRaises(SmsAeroConnectionException):
+            self.store.run("a", send)
+        # a failed send is not remembered
+        self.assertEqual(self.store.run("a", send), {"id": 1})
+        self.assertEqual(self.store.run("a", send), {"id": 1})
+        self.assertEqual(send.call_count, 2)
+        self.assertEqual((self.store.get_sends(), self.store.get_hits()), (2, 1))
+
+    def test_concurrent_duplicates_wait(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def send():
+            started.set()
+            release.wait(5)
+            return {"id": 1}
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(self.store.run("a", send)))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=lambda: results.append(self.store.run("a", MagicMock())))
+        second.start()
+        release.set()
+        first.join()
+        second.join()
+        self.assertEqual(results, [{"id": 1}, {"id": 1}])
+        self.assertEqual((self.store.get_sends(), self.store.get_hits()), (1, 1))
+
+    def test_waiter_sends_when_first_send_fails(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def send():
+            started.set()
+            release.wait(5)
+            raise SmsAeroConnectionException("All gates are down")
+
+        errors = []
+
+        def run_first():
+            try:
+                self.store.run("a", send)
+            except SmsAeroConnectionException as e:
+                errors.append(e)
+
+        first = threading.Thread(target=run_first)
+        first.start()
+        started.wait(5)
+        results = []
+        second = threading.Thread(target=lambda: results.append(self.store.run("a", lambda: {"id": 2})))
+        second.start()
+        release.set()
+        first.join()
+        second.join()
+        self.assertEqual(results, [{"id": 2}])
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(self.store.get_sends(), 2)
+
+    def test_file(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "sent.sqlite3")
+        try:
+            store = IdempotencyStore(window=60, path=path, clock=self.clock)
+            store.put("a", {"id": 1})
+            store.close()
+            # another process, or the same one restarted
+            store = IdempotencyStore(window=60, path=path, clock=self.clock)
+            self.assertEqual(store.get("a"), {"id": 1})
+            self.clock.now += 60
+            store.put("b", {"id": 2})
+            store.clear()
+            self.assertIsNone(store.get("b"))
+            store.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_file_is_purged_periodically(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "sent.sqlite3")
+        try:
+            store = IdempotencyStore(window=30, path=path, clock=self.clock)
+            reader = sqlite3.connect(path)
+            plan = reader.execute("EXPLAIN QUERY PLAN DELETE FROM idempotency WHERE created <= 0").fetchall()
+            self.assertIn("idempotency_created", str(plan))
+
+            def keys():
+                return [key for (key,) in reader.execute("SELECT key FROM idempotency ORDER BY key")]
+
+            store.put("a", {"id": 1})
+            self.clock.now += 40
+            # the first result expired, but the last purge was less than a minute ago
+            store.put("b", {"id": 2})
+            self.assertEqual(keys(), ["a", "b"])
+            self.assertIsNone(store.get("a"))
+            self.clock.now += 20
+            store.put("c", {"id": 3})
+            self.assertEqual(keys(), ["b", "c"])
+            reader.close()
+            store.close()
+        finally:
+            shutil.rmtree(directory)
+
+
+class TestSendOnce(unittest.TestCase):
+    def setUp(self):
+        self.store = IdempotencyStore()
+        self.smsaero = SmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(idempotency_store=self.store)
+        )
+
+    def test_init_validate(self):
+        with self.assertRaises(TypeError):
+            ClientOptions(idempotency_store={})
+        self.assertIs(self.smsaero.get_idempotency_store(), self.store)
+
+    @patch.object(SmsAero, "request")
+    def test_send_sms(self, mock_request):
+        mock_request.side_effect = [{"id": 1}, {"id": 2}, {"id": 3}, {"id": 4}]
+        self.assertEqual(self.smsaero.send_sms(79031234567, "Hello"), {"id": 1})
+        self.assertEqual(self.smsaero.send_sms(79031234567, "Hello", sign="SMS Aero"), {"id": 1})
+        self.assertEqual(self.smsaero.send_sms(79031234567, "Hello", idempotency_key="2"), {"id": 2})
+        self.assertEqual(self.smsaero.send_sms(79031234568, "Hello"), {"id": 3})
+        self.assertEqual(self.smsaero.send_sms([79031234567, 79031234568], "Hello"), {"id": 4})
+        self.assertEqual(mock_request.call_count, 4)
+
+    @patch.object(SmsAero, "request")
+    def test_viber_and_telegram(self, mock_request):
+        mock_request.side_effect = [{"id": 1}, {"id": 2}, {"id": 3}]
+        for _ in range(2):
+            self.assertEqual(self.smsaero.viber_send("Sign", "INFO", "Hello", 79031234567), {"id": 1})
+            self.assertEqual(self.smsaero.send_telegram(79031234567, 1234), {"id": 2})
+        self.assertEqual(self.smsaero.send_telegram(79031234567, 1234, idempotency_key="again"), {"id": 3})
+        self.assertEqual(mock_request.call_count, 3)
+
+    @patch.object(SmsAero, "request")
+    def test_callback_url_and_date_are_part_of_the_send(self, mock_request):
+        mock_request.side_effect = [{"id": 1}, {"id": 2}, {"id": 3}]
+        self.assertEqual(self.smsaero.send_sms(79031234567, "Hello"), {"id": 1})
+        self.assertEqual(self.smsaero.send_sms(79031234567, "Hello", callback_url="https://example.com/cb"), {"id": 2})
+        date = datetime.datetime.now() + datetime.timedelta(days=1)
+        self.assertEqual(self.smsaero.send_sms(79031234567, "Hello", date_to_send=date), {"id": 3})
+        self.assertEqual(mock_request.call_count, 3)
+
+    @patch.object(SmsAero, "request")
+    def test_test_send_is_not_taken_for_a_real_one(self, mock_request):
+        mock_request.side_effect = [{"id": 1}, {"id": 2}]
+        smsaero = SmsAero(
+            "admin@smsaero.ru",
+            "test_api_key_lX8APMlgliHvkHk04i7",
+            test_mode=True,
+            options=ClientOptions(idempotency_store=self.store),
+        )
+        self.assertEqual(smsaero.send_sms(79031234567, "Hello"), {"id": 1})
+        smsaero.disable_test_mode()
+        self.assertEqual(smsaero.send_sms(79031234567, "Hello"), {"id": 2})
+        self.assertEqual([call.args[0] for call in mock_request.call_args_list], ["sms/testsend", "sms/send"])
+
+    @patch.object(SmsAero, "request")
+    def test_accounts_sharing_a_store_are_apart(self, mock_request):
+        mock_request.side_effect = [{"id": 1}, {"id": 2}]
+        other = SmsAero(
+            "other@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(idempotency_store=self.store)
+        )
+        same = SmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(idempotency_store=self.store)
+        )
+        self.assertEqual(self.smsaero.send_sms(79031234567, "Hello"), {"id": 1})
+        self.assertEqual(other.send_sms(79031234567, "Hello"), {"id": 2})
+        self.assertEqual(same.send_sms(79031234567, "Hello"), {"id": 1})
+        self.assertEqual(mock_request.call_count, 2)
+
+    @patch.object(SmsAero, "request")
+    def test_without_store(self, mock_request):
+        mock_request.return_value = {"id": 1}
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+        smsaero.send_sms(79031234567, "Hello")
+        smsaero.send_sms(79031234567, "Hello")
+        self.assertEqual(mock_request.call_count, 2)
+
+
+class TestAsyncSendOnce(unittest.IsolatedAsyncioTestCase):
+    async def test_send_sms(self):
+        store = IdempotencyStore()
+        smsaero = AsyncSmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(idempotency_store=store)
+        )
+
+        async def request(selector, data):
+            await asyncio.sleep(0.01)
+            return {"id": data["number"]}
+
+        with patch.object(AsyncSmsAero, "request", AsyncMock(side_effect=request)) as mock_request:
+            results = await asyncio.gather(*(smsaero.send_sms(79031234567, "Hello") for _ in range(5)))
+            self.assertEqual(results, [{"id": 79031234567}] * 5)
+            self.assertEqual(await smsaero.send_sms(79031234568, "Hello"), {"id": 79031234568})
+            self.assertEqual(await smsaero.send_sms(79031234567, "Hello"), {"id": 79031234567})
+        self.assertEqual(mock_request.await_count, 2)
+        self.assertEqual((store.get_sends(), store.get_hits()), (2, 5))
+
+    async def test_failed_send_is_made_again(self):
+        store = IdempotencyStore()
+        smsaero = AsyncSmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(idempotency_store=store)
+        )
+        error = SmsAeroConnectionException("All gates are down")
+
+        async def request(selector, data):
+            await asyncio.sleep(0.01)
+            if mock_request.await_count == 1:
+                raise error
+            return {"id": 1}
+
+        with patch.object(AsyncSmsAero, "request", AsyncMock(side_effect=request)) as mock_request:
+            results = await asyncio.gather(
+                smsaero.send_sms(79031234567, "Hello"), smsaero.send_sms(79031234567, "Hello"), return_exceptions=True
+            )
+        self.assertEqual(results, [error, {"id": 1}])
+
+    async def test_without_store(self):
+        smsaero = AsyncSmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+        with patch.object(AsyncSmsAero, "request", AsyncMock(return_value={"id": 1})):
+            self.assertEqual(await smsaero.send_telegram(79031234567, 1234), {"id": 1})
@@ -0,0 +1,36 @@
+import subprocess
+import sys
+import unittest
+
+
+def import_times(statement):
+    """Runs the statement in a fresh interpreter and returns the cumulative import time of every module in us."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+    def test_heavy_modules_are_imported_lazily(self):
+        times = import_times("import smsaero")
+
+        self.assertIn("smsaero", times)
+        for module in ("phonenumbers", "email_validator", "asyncio", "aiohttp"):
+            self.assertNotIn(module, times, f"{module} is imported by `import smsaero`")
+
+    def test_heavy_modules_are_imported_on_first_use(self):
+        times = import_times(
+            "import email_validator; email_validator.CHECK_DELIVERABILITY = False\n"
+            "import smsaero\n"
+            "smsaero.SmsAero('admin@smsaero.ru', 'test_api_key_lX8APMlgliHvkHk04i7').phonenumbers_validate(79031234567)"
+        )
+
+        self.assertIn("phonenumbers", times)
+        self.assertIn("email_validator", times)
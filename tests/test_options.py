@@ -0,0 +1,41 @@
+import unittest
+
+from smsaero import ClientOptions, GateHealth, RetryPolicy, SmsAero
+
+
+class TestClientOptions(unittest.TestCase):
+    def test_defaults(self):
+        options = ClientOptions()
+        self.assertIsNone(options.get_gate_health())
+        self.assertIsNone(options.get_protocol_memory())
+        self.assertIsNone(options.get_hedge_policy())
+        self.assertIsNone(options.get_retry_policy())
+        self.assertIsNone(options.get_rate_limiter())
+        self.assertIsNone(options.get_phone_cache())
+        self.assertIsNone(options.get_idempotency_store())
+        self.assertIsNone(options.get_response_cache())
+
+    def test_options_type(self):
+        with self.assertRaises(TypeError):
+            SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options={"retry_policy": None})
+
+    def test_shared_options(self):
+        health = GateHealth()
+        policy = RetryPolicy(max_attempts=2)
+        options = ClientOptions(gate_health=health, retry_policy=policy)
+        first = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=options)
+        second = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=options)
+        self.assertIs(first.get_options(), options)
+        self.assertIs(second.get_gate_health(), health)
+        self.assertIs(second.get_retry_policy(), policy)
+
+    def test_own_defaults(self):
+        options = ClientOptions()
+        first = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=options)
+        second = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=options)
+        self.assertIsNot(first.get_gate_health(), second.get_gate_health())
+        self.assertIsNot(first.get_retry_policy(), second.get_retry_policy())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+import datetime
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from unittest.mock import MagicMock, patch
+
+from smsaero import SmsAero, SmsAeroConnectionException, SmsAeroException
+from smsaero.outbox import FAILED, PENDING, SENDING, SENT, UNKNOWN, Outbox, OutboxEntry
+
+
+class TestOutbox(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "outbox.sqlite3")
+        self.smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+        self.outbox = Outbox(self.smsaero, self.path, clock=lambda: 1_000_000.0)
+
+    def tearDown(self):
+        self.outbox.close()
+        shutil.rmtree(self.directory)
+
+    def test_init_validate(self):
+        with self.assertRaises(ValueError):
+            Outbox(self.smsaero, self.path, synchronous="SOMETIMES")
+        with self.assertRaises(ValueError):
+            self.outbox.start(workers=0)
+
+    def test_enqueue_validate(self):
+        with self.assertRaises(ValueError):
+            self.outbox.enqueue("balance")
+        with self.assertRaises(TypeError):
+            self.outbox.enqueue("send_sms", number=79031234567)
+        with self.assertRaises(TypeError):
+            self.outbox.enqueue("send_sms", number=79031234567, text="Hello", sign=object())
+        self.assertEqual(self.outbox.get_counts(), {})
+
+    def test_enqueue_is_durable(self):
+        when = datetime.datetime(2024, 6, 23, 12, 30)
+        entry_id = self.outbox.enqueue("send_sms", number=79031234567, text="Hello", date_to_send=when)
+        self.outbox.close()
+        with Outbox(self.smsaero, self.path) as outbox:
+            entry = outbox.get_entry(entry_id)
+            self.assertIsNone(outbox.get_entry(entry_id + 1))
+        self.assertEqual(
+            entry,
+            OutboxEntry(
+                entry_id,
+                "send_sms",
+                {"number": 79031234567, "text": "Hello", "date_to_send": when},
+                PENDING,
+                0,
+                1_000_000.0,
+                None,
+                None,
+            ),
+        )
+
+    def test_concurrent_enqueues_share_commits(self):
+        threads = [
+            threading.Thread(target=lambda i=i: self.outbox.enqueue("send_telegram", number=79031234567, code=i))
+            for i in range(50)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.outbox.get_counts(), {PENDING: 50})
+        self.assertLessEqual(self.outbox.get_commits(), 50)
+
+    def test_failed_commit(self):
+        with sqlite3.connect(self.path) as db:
+            db.execute(
+                "CREATE TRIGGER reject BEFORE INSERT ON outbox WHEN NEW.method = 'send_telegram' "
+                "BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+            )
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.outbox.enqueue("send_telegram", number=79031234567, code=1234)
+        self.assertEqual(self.outbox.get_counts(), {})
+        self.outbox.enqueue("send_sms", number=79031234567, text="Hello")
+        self.assertEqual(self.outbox.get_counts(), {PENDING: 1})
+
+    @patch.object(SmsAero, "request")
+    def test_drain(self, mock_request):
+        mock_request.side_effect = [
+            {"id": 1, "status": 8},
+            SmsAeroConnectionException("All gates are down"),
+            SmsAeroException("Insufficient funds"),
+        ]
+        ids = [
+            self.outbox.enqueue("send_sms", number=79031234567, text="Hello"),
+            self.outbox.enqueue("viber_send", sign="Sign", channel="INFO", text="Hello", number=79031234567),
+            self.outbox.enqueue("send_telegram", number=79031234567, code=1234),
+            self.outbox.enqueue("send_sms", number=79031234567, text="Bye"),
+        ]
+        self.assertEqual(self.outbox.drain(limit=3), 3)
+        entries = [self.outbox.get_entry(entry_id) for entry_id in ids]
+        self.assertEqual([entry.state for entry in entries], [SENT, UNKNOWN, FAILED, PENDING])
+        self.assertEqual(entries[0].result, {"id": 1, "status": 8})
+        self.assertEqual(entries[0].attempts, 1)
+        self.assertEqual(entries[2].error, "Insufficient funds")
+        self.assertEqual(self.outbox.get_counts(), {SENT: 1, UNKNOWN: 1, FAILED: 1, PENDING: 1})
+
+    @patch.object(SmsAero, "request")
+    def test_workers(self, mock_request):
+        mock_request.return_value = {"id": 1, "status": 8}
+        self.outbox.start(workers=3)
+        for i in range(20):
+            self.outbox.enqueue("send_sms", number=79031234567, text=f"Hello {i}")
+        for _ in range(500):
+            if self.outbox.get_counts() == {SENT: 20}:
+                break
+            threading.Event().wait(0.01)
+        self.outbox.stop()
+        self.assertEqual(self.outbox.get_counts(), {SENT: 20})
+        self.assertEqual(mock_request.call_count, 20)
+
+    def test_recover(self):
+        self.smsaero = MagicMock(spec=SmsAero)
+        self.outbox.close()
+        self.outbox = Outbox(self.smsaero, self.path, clock=lambda: 1_000_000.0)
+        ids = [
+            self.outbox.enqueue("send_sms", number=[79031234567, 79031234568], text="All"),
+            self.outbox.enqueue("send_sms", number=[79031234567, 79031234568], text="Some"),
+            self.outbox.enqueue("send_sms", number=79031234567, text="None"),
+            self.outbox.enqueue("send_telegram", number=79031234567, code=1234),
+            self.outbox.enqueue("send_sms", number=79031234567, text="Later"),
+        ]
+        # the process died while sending the first four messages
+        self.smsaero.send_sms.side_effect = SystemExit
+        self.smsaero.send_telegram.side_effect = SystemExit
+        for _ in range(4):
+            with self.assertRaises(SystemExit):
+                self.outbox.drain(limit=1)
+        self.assertEqual(self.outbox.get_counts(), {SENDING: 4, PENDING: 1})
+
+        listed = {
+            "All": [
+                {"number": "79031234567", "dateCreate": 1_000_010},
+                {"number": "79031234568", "dateCreate": 1_000_010},
+            ],
+            # sent a day before, by another entry
+            "Some": [
+                {"number": "79031234567", "dateCreate": 1_000_001},
+                {"number": "79031234568", "dateCreate": 900_000},
+            ],
+            "None": [],
+        }
+        self.smsaero.iter_sms_list.side_effect = lambda number, text: iter(listed[text])
+        self.assertEqual(self.outbox.recover(), {ids[0]: SENT, ids[1]: PENDING, ids[2]: PENDING, ids[3]: UNKNOWN})
+        self.assertEqual(self.outbox.get_entry(ids[0]).result, {"reconciled": [79031234567, 79031234568]})
+        self.assertEqual(self.outbox.get_entry(ids[1]).params["number"], [79031234568])
+        self.assertEqual(self.outbox.recover(resend_unknown=True), {ids[3]: PENDING})
+        self.assertEqual(self.outbox.get_counts(), {SENT: 1, PENDING: 4})
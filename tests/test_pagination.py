@@ -0,0 +1,284 @@
+import itertools
+import threading
+import time
+import unittest
+
+from unittest.mock import patch, AsyncMock
+
+from smsaero import SmsAero
+from smsaero.aio import AsyncSmsAero
+from smsaero.pagination import (
+    async_fetch_pages,
+    async_iter_pages,
+    fetch_pages,
+    has_next_page,
+    iter_pages,
+    iter_records,
+    last_page_number,
+    page_records,
+)
+
+
+def make_page(selector, number, last, size=2):
+    page = {str(i): {"id": (number - 1) * size + i} for i in range(size)}
+    page["links"] = {"self": f"/v2/{selector}?page={number}", "last": f"/v2/{selector}?page={last}"}
+    if number < last:
+        page["links"]["next"] = f"/v2/{selector}?page={number + 1}"
+    return page
+
+
+def make_request(last):
+    def request(selector, data=None, page=None):
+        return make_page(selector, page, last)
+
+    return request
+
+
+class TestPages(unittest.TestCase):
+    def test_page_records(self):
+        self.assertEqual(page_records({"10": "c", "2": "b", "0": "a", "links": {}, "totalCount": "3"}), ["a", "b", "c"])
+        self.assertEqual(page_records({0: "a"}), ["a"])
+        self.assertEqual(page_records([]), [])
+        self.assertEqual(page_records(None), [])
+
+    def test_has_next_page(self):
+        self.assertTrue(has_next_page(make_page("sms/list", 1, 3), 1))
+        self.assertFalse(has_next_page(make_page("sms/list", 3, 3), 3))
+        # only "last" is given
+        self.assertTrue(has_next_page({"0": {}, "links": {"last": "/v2/group/list?page=2"}}, 1))
+        self.assertFalse(has_next_page({"0": {}, "links": {"last": "/v2/group/list?page=2"}}, 2))
+        self.assertFalse(has_next_page({"0": {}, "links": {"last": "/v2/group/list"}}, 1))
+        self.assertFalse(has_next_page({"0": {}, "links": {"last": None}}, 1))
+        self.assertFalse(has_next_page({"0": {}}, 1))
+        # an empty page ends the iteration even if the links disagree
+        self.assertFalse(has_next_page({"links": {"next": "/v2/sms/list?page=2"}}, 1))
+
+    def test_iter_pages_stops_on_last_page(self):
+        fetched = []
+
+        def fetch(number):
+            fetched.append(number)
+            return make_page("sms/list", number, 3)
+
+        self.assertEqual([record["id"] for record in iter_records(fetch)], [0, 1, 2, 3, 4, 5])
+        self.assertEqual(fetched, [1, 2, 3])
+
+    def test_iter_pages_is_lazy(self):
+        fetched = []
+
+        def fetch(number):
+            fetched.append(number)
+            return make_page("sms/list", number, 3)
+
+        pages = iter_pages(fetch)
+        next(pages)
+        self.assertEqual(fetched, [1])
+
+    def test_prefetch_overlaps_next_page(self):
+        requested = threading.Event()
+
+        def fetch(number):
+            if number == 2:
+                requested.set()
+            return make_page("sms/list", number, 2)
+
+        pages = iter_pages(fetch, prefetch=True)
+        next(pages)
+        # the second page is requested while the first one is being consumed
+        self.assertTrue(requested.wait(5))
+        self.assertEqual(len(list(pages)), 1)
+
+    def test_prefetch_stops_early(self):
+        release = threading.Event()
+        fetched = []
+
+        def fetch(number):
+            fetched.append(number)
+            release.wait(5)
+            return make_page("sms/list", number, 10)
+
+        pages = iter_pages(fetch, prefetch=True)
+        release.set()
+        next(pages)
+        pages.close()
+        self.assertLessEqual(len(fetched), 2)
+
+    def test_prefetch_same_records(self):
+        def fetch(number):
+            return make_page("sms/list", number, 4)
+
+        self.assertEqual(list(iter_records(fetch, prefetch=True)), list(iter_records(fetch)))
+
+
+class TestFetchPages(unittest.TestCase):
+    def test_last_page_number(self):
+        self.assertEqual(last_page_number(make_page("contact/list", 1, 7)), 7)
+        self.assertEqual(last_page_number({"0": {}, "1": {}, "totalCount": "5"}), 3)
+        self.assertEqual(last_page_number({"0": {}, "links": {"self": "/v2/contact/list?page=1"}, "totalCount": 2}), 2)
+        self.assertIsNone(last_page_number({"0": {}, "links": {"next": "/v2/contact/list?page=2"}}))
+        self.assertIsNone(last_page_number([]))
+
+    def test_pages_in_order(self):
+        def fetch(number):
+            # the later pages answer first
+            time.sleep((10 - number) / 1000)
+            return make_page("contact/list", number, 10)
+
+        pages = list(fetch_pages(fetch, concurrency=4))
+        self.assertEqual([number for number, _ in pages], list(range(1, 11)))
+        self.assertEqual([page["1"]["id"] for _, page in pages], list(range(1, 20, 2)))
+
+    def test_bounded_concurrency(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def fetch(number):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.005)
+            with lock:
+                running[0] -= 1
+            return make_page("contact/list", number, 20)
+
+        self.assertEqual(len(list(fetch_pages(fetch, concurrency=3))), 20)
+        self.assertLessEqual(running[1], 3)
+
+    def test_start_and_stop_early(self):
+        fetched = []
+
+        def fetch(number):
+            fetched.append(number)
+            return make_page("contact/list", number, 100)
+
+        pages = fetch_pages(fetch, concurrency=2, start=50)
+        self.assertEqual([number for number, _ in itertools.islice(pages, 3)], [50, 51, 52])
+        pages.close()
+        self.assertLess(len(fetched), 10)
+
+    def test_unknown_page_count(self):
+        def fetch(number):
+            page = make_page("contact/list", number, 3)
+            del page["links"]["last"]
+            return page
+
+        self.assertEqual([number for number, _ in fetch_pages(fetch, concurrency=4)], [1, 2, 3])
+
+
+class TestIterMethods(unittest.TestCase):
+    def setUp(self):
+        self.smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+
+    @patch.object(SmsAero, "request")
+    def test_iter_sms_list(self, mock_request):
+        mock_request.side_effect = make_request(2)
+        messages = list(self.smsaero.iter_sms_list(79031234567, "Hello"))
+        self.assertEqual([message["id"] for message in messages], [0, 1, 2, 3])
+        mock_request.assert_called_with("sms/list", {"number": 79031234567, "text": "Hello"}, 2)
+
+    @patch.object(SmsAero, "request")
+    def test_iter_sms_list_validates_before_request(self, mock_request):
+        with self.assertRaises(TypeError):
+            self.smsaero.iter_sms_list(text=1)
+        mock_request.assert_not_called()
+
+    @patch.object(SmsAero, "request")
+    def test_iter_contact_list(self, mock_request):
+        mock_request.side_effect = make_request(1)
+        self.assertEqual(len(list(self.smsaero.iter_contact_list(group_id=1, prefetch=True))), 2)
+        self.assertEqual(mock_request.call_args.args[0], "contact/list")
+        self.assertEqual(mock_request.call_args.args[1]["groupId"], 1)
+        with self.assertRaises(TypeError):
+            self.smsaero.iter_contact_list(group_id="1")
+
+    @patch.object(SmsAero, "request")
+    def test_export(self, mock_request):
+        mock_request.side_effect = make_request(5)
+        pages = []
+        exported = self.smsaero.export(
+            lambda page: self.smsaero.contact_list(page=page), lambda number, records: pages.append((number, records))
+        )
+        self.assertEqual(exported, 10)
+        self.assertEqual([number for number, _ in pages], [1, 2, 3, 4, 5])
+        self.assertEqual(pages[4][1], [{"id": 8}, {"id": 9}])
+
+    def test_export_validate(self):
+        cases = [("2", 1, TypeError), (0, 1, ValueError), (2, "1", TypeError), (2, 0, ValueError)]
+        for concurrency, start, error in cases:
+            with self.assertRaises(error):
+                self.smsaero.export(self.smsaero.contact_list, print, concurrency, start)
+
+    @patch.object(SmsAero, "request")
+    def test_iter_other_lists(self, mock_request):
+        mock_request.side_effect = make_request(2)
+        iterators = {
+            "sign/list": self.smsaero.iter_sign_list(),
+            "group/list": self.smsaero.iter_group_list(),
+            "blacklist/list": self.smsaero.iter_blacklist_list(79031234567),
+            "viber/list": self.smsaero.iter_viber_list(),
+            "viber/statistic": self.smsaero.iter_viber_statistics(1),
+        }
+        for selector, records in iterators.items():
+            mock_request.reset_mock()
+            self.assertEqual(len(list(records)), 4, selector)
+            self.assertEqual(mock_request.call_count, 2)
+            self.assertEqual(mock_request.call_args.args[0], selector)
+
+
+    @patch.object(SmsAero, "request")
+    def test_iter_other_lists_validate_before_request(self, mock_request):
+        with self.assertRaises(TypeError):
+            self.smsaero.iter_blacklist_list(number="bad")
+        with self.assertRaises(ValueError):
+            self.smsaero.iter_blacklist_list(number=[123])
+        with self.assertRaises(ValueError):
+            self.smsaero.iter_viber_statistics("bad")
+        mock_request.assert_not_called()
+
+
+class TestAsyncIterMethods(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.smsaero = AsyncSmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+
+    async def asyncTearDown(self):
+        await self.smsaero.close()
+
+    async def test_iter_sms_list(self):
+        for prefetch in (False, True):
+            with patch.object(AsyncSmsAero, "request", AsyncMock(side_effect=make_request(3))) as request:
+                messages = [message async for message in self.smsaero.iter_sms_list(prefetch=prefetch)]
+            self.assertEqual([message["id"] for message in messages], [0, 1, 2, 3, 4, 5])
+            self.assertEqual(request.await_count, 3)
+
+    async def test_prefetch_is_cancelled_when_stopped_early(self):
+        with patch.object(AsyncSmsAero, "request", AsyncMock(side_effect=make_request(3))):
+            pages = async_iter_pages(lambda page: self.smsaero.sms_list(page=page), prefetch=True)
+            await pages.__anext__()
+            await pages.aclose()
+
+    async def test_export(self):
+        with patch.object(AsyncSmsAero, "request", AsyncMock(side_effect=make_request(5))) as request:
+            pages = []
+            exported = await self.smsaero.export(
+                lambda page: self.smsaero.contact_list(page=page),
+                lambda number, records: pages.append(number),
+                concurrency=2,
+                start=2,
+            )
+        self.assertEqual(exported, 8)
+        self.assertEqual(pages, [2, 3, 4, 5])
+        self.assertEqual(request.await_count, 4)
+
+    async def test_fetch_pages(self):
+        async def fetch(number):
+            page = make_page("contact/list", number, 3)
+            del page["links"]["last"]
+            return page
+
+        self.assertEqual([number async for number, _ in async_fetch_pages(fetch, 4)], [1, 2, 3])
+
+        pages = async_fetch_pages(lambda page: self.smsaero.contact_list(page=page), 2)
+        with patch.object(AsyncSmsAero, "request", AsyncMock(side_effect=make_request(9))):
+            self.assertEqual((await pages.__anext__())[0], 1)
+            self.assertEqual((await pages.__anext__())[0], 2)
+            await pages.aclose()
@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from unittest.mock import patch, MagicMock
+
+import aiohttp
+
+from smsaero import ClientOptions, SmsAero, FileTokenBucket, RateLimiter, SmsAeroConnectionException, TokenBucket
+from smsaero.aio import AsyncSmsAero
+
+from . import DEFAULT_RESPONSE
+
+
+def reserve_many(path, count, queue):
+    bucket = FileTokenBucket(path, rate=1, capacity=1)
+    queue.put([bucket.reserve() for _ in range(count)])
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_init_validate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0.5, capacity=0.5)
+        bucket = TokenBucket(rate=0.5, capacity=2)
+        self.assertEqual((bucket.get_rate(), bucket.get_capacity()), (0.5, 2))
+        self.assertEqual(TokenBucket(rate=10).get_capacity(), 10)
+
+    def test_fractional_rate(self):
+        # e.g. hlr/check once every two seconds
+        bucket = TokenBucket(rate=0.5)
+        self.assertEqual(bucket.get_capacity(), 1)
+        state, delay = bucket.take(None, 100.0, 1)
+        self.assertEqual(delay, 0)
+        state, delay = bucket.take(state, 100.5, 1)
+        self.assertEqual(delay, 1.5)
+
+    def test_take(self):
+        bucket = TokenBucket(rate=2, capacity=2)
+        state, delay = bucket.take(None, 100.0, 1)
+        self.assertEqual((state, delay), ((1, 100.0), 0))
+        state, delay = bucket.take(state, 100.0, 1)
+        self.assertEqual(delay, 0)
+        # the third request borrows from the future and waits for its turn
+        state, delay = bucket.take(state, 100.0, 1)
+        self.assertEqual(delay, 0.5)
+        state, delay = bucket.take(state, 100.0, 1)
+        self.assertEqual(delay, 1.0)
+        # the bucket refills up to its capacity only
+        state, delay = bucket.take(state, 200.0, 1)
+        self.assertEqual((state, delay), ((1, 200.0), 0))
+
+    def test_reserve(self):
+        bucket = TokenBucket(rate=1, capacity=1)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertGreater(bucket.reserve(), 0.9)
+
+
+class TestFileTokenBucket(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_buckets_with_same_file_share_tokens(self):
+        first = FileTokenBucket(self.path, rate=1, capacity=2)
+        second = FileTokenBucket(self.path, rate=1, capacity=2)
+        self.assertEqual(first.get_path(), self.path)
+        self.assertEqual(first.reserve(), 0)
+        self.assertEqual(second.reserve(), 0)
+        self.assertGreater(first.reserve(), 0.9)
+        self.assertGreater(second.reserve(), 1.9)
+
+    def test_processes_share_tokens(self):
+        queue = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=reserve_many, args=(self.path, 20, queue)) for _ in range(2)]
+        for process in processes:
+            process.start()
+        delays = sorted(queue.get(timeout=30) + queue.get(timeout=30))
+        for process in processes:
+            process.join()
+
+        # one token per second: no update is lost, so every request gets its own second
+        self.assertEqual(len(delays), 40)
+        for turn, delay in enumerate(delays):
+            self.assertAlmostEqual(delay, turn, delta=0.5)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_init_validate(self):
+        with self.assertRaises(TypeError):
+            RateLimiter({"sms/send": 10})
+        with self.assertRaises(TypeError):
+            RateLimiter({}, default=10)
+
+    def test_reserve_per_selector(self):
+        send = TokenBucket(rate=1, capacity=1)
+        limiter = RateLimiter({"sms/send": send, "sms/testsend": send})
+
+        self.assertIs(limiter.get_bucket("sms/testsend"), send)
+        self.assertIsNone(limiter.get_bucket("balance"))
+        self.assertEqual(limiter.reserve("balance"), 0)
+        self.assertEqual(limiter.reserve("sms/send"), 0)
+        self.assertGreater(limiter.reserve("sms/testsend"), 0.9)
+        self.assertEqual(limiter.get_waits(), 1)
+        self.assertGreater(limiter.get_waited(), 0.9)
+
+    def test_default_bucket(self):
+        limiter = RateLimiter({}, default=TokenBucket(rate=1, capacity=1))
+        limiter.reserve("balance")
+        self.assertGreater(limiter.reserve("tariffs"), 0.9)
+
+
+class TestSmsAeroRateLimit(unittest.TestCase):
+    def test_rate_limiter_type(self):
+        with self.assertRaises(TypeError):
+            SmsAero(
+                "admin@smsaero.ru",
+                "test_api_key_lX8APMlgliHvkHk04i7",
+                options=ClientOptions(rate_limiter={"sms/send": 1}),
+            )
+        self.assertIsNone(SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7").get_rate_limiter())
+
+    @patch("time.sleep")
+    @patch("requests.Session.post")
+    def test_requests_wait_for_their_turn(self, mock_post, mock_sleep):
+        mock_post.return_value = MagicMock(json=MagicMock(return_value=DEFAULT_RESPONSE))
+        limiter = RateLimiter({"sms/send": TokenBucket(rate=1, capacity=1)})
+        smsaero = SmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(rate_limiter=limiter)
+        )
+
+        smsaero.send_sms(79031234567, "test message")
+        mock_sleep.assert_not_called()
+        smsaero.balance()
+        mock_sleep.assert_not_called()
+        smsaero.send_sms(79031234567, "test message")
+        mock_sleep.assert_called_once()
+        self.assertGreater(mock_sleep.call_args[0][0], 0.9)
+        self.assertIs(smsaero.get_rate_limiter(), limiter)
+
+
+class TestAsyncSmsAeroRateLimit(unittest.IsolatedAsyncioTestCase):
+    async def test_requests_wait_for_their_turn(self):
+        limiter = RateLimiter({}, default=TokenBucket(rate=1, capacity=1))
+        smsaero = AsyncSmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(rate_limiter=limiter)
+        )
+        post = MagicMock(side_effect=aiohttp.ClientConnectionError())
+        with patch("aiohttp.ClientSession.post", post), patch("asyncio.sleep") as mock_sleep:
+            for _ in range(2):
+                with self.assertRaises(SmsAeroConnectionException):
+                    await smsaero.balance()
+        await smsaero.close()
+
+        mock_sleep.assert_called_once()
@@ -0,0 +1,213 @@
+import unittest
+
+from unittest.mock import patch, MagicMock
+
+import aiohttp
+
+from requests.exceptions import ConnectionError, ConnectTimeout, InvalidURL, ReadTimeout, Timeout
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from smsaero import ClientOptions, IdempotencyStore, SmsAero, RetryBudget, RetryPolicy, SmsAeroConnectionException
+from smsaero.aio import AsyncSmsAero
+from smsaero.retry import is_connect_error
+
+from . import DEFAULT_RESPONSE
+
+
+class TestRetryBudget(unittest.TestCase):
+    def test_init_validate(self):
+        with self.assertRaises(ValueError):
+            RetryBudget(ratio=-1)
+        with self.assertRaises(ValueError):
+            RetryBudget(reserve=0.5)
+
+    def test_budget(self):
+        budget = RetryBudget(ratio=0.5, reserve=2)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+        for _ in range(10):
+            budget.deposit()
+        self.assertEqual(budget.get_tokens(), 2)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_init_validate(self):
+        with self.assertRaises(ValueError):
+            RetryPolicy(max_attempts=0)
+        with self.assertRaises(ValueError):
+            RetryPolicy(multiplier=0.5)
+        with self.assertRaises(ValueError):
+            RetryPolicy(jitter=2)
+
+    def test_backoff(self):
+        policy = RetryPolicy(backoff=1, multiplier=2, max_backoff=3, jitter=0.5, rng=lambda: 1.0)
+        self.assertEqual([policy.backoff(n) for n in range(4)], [0, 0.5, 1, 1.5])
+        self.assertEqual(RetryPolicy(backoff=1, jitter=0).backoff(2), 2)
+
+    def test_classification(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retryable(ConnectionError()))
+        self.assertFalse(policy.is_retryable(InvalidURL()))
+        policy = RetryPolicy(retryable=lambda error, selector: isinstance(error, Timeout))
+        self.assertTrue(policy.is_retryable(Timeout()))
+        self.assertFalse(policy.is_retryable(ConnectionError()))
+
+    def test_writes_are_retried_only_when_replay_safe(self):
+        policy = RetryPolicy(retryable=lambda error, selector: True)
+        self.assertTrue(policy.is_retryable(ReadTimeout(), "sms/status"))
+        self.assertFalse(policy.is_retryable(ReadTimeout(), "sms/send"))
+        self.assertTrue(policy.is_retryable(ReadTimeout(), "sms/send", replay_safe=True))
+        self.assertFalse(policy.should_retry(1, 3, ReadTimeout(), "balance/add"))
+
+    def test_is_connect_error(self):
+        refused = NewConnectionError(None, "refused")
+        self.assertTrue(is_connect_error(ConnectionError(MaxRetryError(None, "/", refused))))
+        self.assertTrue(is_connect_error(ConnectionError(refused)))
+        self.assertTrue(is_connect_error(ConnectTimeout()))
+        self.assertFalse(is_connect_error(ConnectionError(ProtocolError("Connection aborted."))))
+        self.assertFalse(is_connect_error(ConnectionError()))
+        self.assertFalse(is_connect_error(ReadTimeout()))
+
+    def test_should_retry(self):
+        self.assertEqual(RetryPolicy(max_attempts=None).get_max_attempts(3), 3)
+        budget = RetryBudget(ratio=0, reserve=1)
+        policy = RetryPolicy(max_attempts=4, budget=budget)
+        self.assertIs(policy.get_budget(), budget)
+        self.assertTrue(policy.should_retry(1, 3, ConnectionError()))
+        self.assertFalse(policy.should_retry(2, 3, ConnectionError()))
+        self.assertFalse(RetryPolicy(max_attempts=4).should_retry(4, 3, ConnectionError()))
+        self.assertFalse(RetryPolicy(max_attempts=4).should_retry(1, 3, InvalidURL()))
+
+    def test_plan_orders_every_round(self):
+        order = MagicMock(side_effect=[["a", "b"], ["b", "a"]])
+        plan = RetryPolicy(backoff=1, jitter=0).plan(["a", "b"], order)
+        self.assertEqual([next(plan) for _ in range(4)], [("a", 0), ("b", 0), ("b", 1), ("a", 0)])
+
+
+class TestSmsAeroRetry(unittest.TestCase):
+    def test_retry_policy_type(self):
+        with self.assertRaises(TypeError):
+            SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(retry_policy=3))
+
+    @patch("time.sleep")
+    @patch("requests.Session.post")
+    def test_default_policy_tries_every_gate_once(self, mock_post, mock_sleep):
+        mock_post.side_effect = ConnectionError("refused")
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+
+        with self.assertRaises(SmsAeroConnectionException) as context:
+            smsaero.balance()
+
+        attempts = context.exception.attempts
+        self.assertEqual([attempt.gate for attempt in attempts], SmsAero.GATE_URLS)
+        self.assertIsInstance(attempts[0].error, ConnectionError)
+        self.assertIn("@gate.smsaero.ru/v2/: ConnectionError('refused')", str(context.exception))
+        mock_sleep.assert_not_called()
+
+    @patch("time.sleep")
+    @patch("requests.Session.post")
+    def test_rounds_with_backoff(self, mock_post, mock_sleep):
+        response = MagicMock(json=MagicMock(return_value=DEFAULT_RESPONSE))
+        mock_post.side_effect = [Timeout, Timeout, Timeout, Timeout, response]
+        policy = RetryPolicy(max_attempts=6, backoff=0.5, jitter=0)
+        smsaero = SmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(retry_policy=policy)
+        )
+
+        self.assertEqual(smsaero.balance(), False)
+        self.assertIs(smsaero.get_retry_policy(), policy)
+        self.assertEqual(mock_post.call_count, 5)
+        mock_sleep.assert_called_once_with(0.5)
+
+    @patch("requests.Session.post")
+    def test_non_retryable_error_stops(self, mock_post):
+        mock_post.side_effect = InvalidURL
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+
+        with self.assertRaises(SmsAeroConnectionException) as context:
+            smsaero.balance()
+        self.assertEqual(len(context.exception.attempts), 1)
+        mock_post.assert_called_once()
+
+    @patch("requests.Session.post")
+    def test_read_timeout_of_a_send_is_not_retried(self, mock_post):
+        mock_post.side_effect = ReadTimeout
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+
+        with self.assertRaises(SmsAeroConnectionException) as context:
+            smsaero.send_sms(79031234567, "test message")
+        self.assertEqual(len(context.exception.attempts), 1)
+        mock_post.assert_called_once()
+
+    @patch("requests.Session.post")
+    def test_refused_send_fails_over(self, mock_post):
+        response = MagicMock(json=MagicMock(return_value=DEFAULT_RESPONSE))
+        mock_post.side_effect = [ConnectionError(MaxRetryError(None, "/", NewConnectionError(None, "refused"))), response]
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+
+        self.assertEqual(smsaero.send_sms(79031234567, "test message"), False)
+        self.assertEqual(mock_post.call_count, 2)
+
+    @patch("requests.Session.post")
+    def test_deduplicated_send_is_retried(self, mock_post):
+        response = MagicMock(json=MagicMock(return_value=DEFAULT_RESPONSE))
+        mock_post.side_effect = [ReadTimeout, response]
+        smsaero = SmsAero(
+            "admin@smsaero.ru",
+            "test_api_key_lX8APMlgliHvkHk04i7",
+            options=ClientOptions(idempotency_store=IdempotencyStore()),
+        )
+
+        self.assertEqual(smsaero.send_sms(79031234567, "test message"), False)
+        self.assertEqual(mock_post.call_count, 2)
+
+    @patch("requests.Session.post")
+    def test_budget_stops_retry_storm(self, mock_post):
+        mock_post.side_effect = ConnectionError
+        policy = RetryPolicy(max_attempts=None, budget=RetryBudget(ratio=0, reserve=2))
+        smsaero = SmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(retry_policy=policy)
+        )
+
+        for _ in range(3):
+            with self.assertRaises(SmsAeroConnectionException):
+                smsaero.balance()
+        # 3 requests, 2 retries in the budget
+        self.assertEqual(mock_post.call_count, 5)
+
+
+class TestAsyncSmsAeroRetry(unittest.IsolatedAsyncioTestCase):
+    async def test_rounds_with_backoff(self):
+        policy = RetryPolicy(max_attempts=4, backoff=0.01, jitter=0)
+        smsaero = AsyncSmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(retry_policy=policy)
+        )
+        post = MagicMock(side_effect=aiohttp.ClientConnectionError())
+        with patch("aiohttp.ClientSession.post", post), patch("asyncio.sleep") as mock_sleep:
+            with self.assertRaises(SmsAeroConnectionException) as context:
+                await smsaero.balance()
+        await smsaero.close()
+
+        self.assertEqual(len(context.exception.attempts), 4)
+        self.assertEqual(context.exception.attempts[3].gate, context.exception.attempts[0].gate)
+        mock_sleep.assert_called_once_with(0.01)
+
+    async def test_send_is_retried_only_after_a_connect_error(self):
+        smsaero = AsyncSmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+        post = MagicMock(side_effect=aiohttp.ServerDisconnectedError())
+        with patch("aiohttp.ClientSession.post", post):
+            with self.assertRaises(SmsAeroConnectionException):
+                await smsaero.send_sms(79031234567, "test message")
+        self.assertEqual(post.call_count, 1)
+
+        post = MagicMock(side_effect=aiohttp.ClientConnectorError(MagicMock(), OSError()))
+        with patch("aiohttp.ClientSession.post", post):
+            with self.assertRaises(SmsAeroConnectionException):
+                await smsaero.send_sms(79031234567, "test message")
+        self.assertEqual(post.call_count, 3)
+        await smsaero.close()
@@ -0,0 +1,68 @@
+import unittest
+
+from smsaero import SmsAero, TextAnalysis
+from smsaero.segments import GSM7, UCS2, SegmentInfo, analyze_text, count_segments, transliterate
+
+
+class TestCountSegments(unittest.TestCase):
+    def test_gsm7(self):
+        self.assertEqual(count_segments(""), SegmentInfo(GSM7, 0, 0))
+        self.assertEqual(count_segments("Hello, World!"), SegmentInfo(GSM7, 13, 1))
+        self.assertEqual(count_segments("a" * 160), SegmentInfo(GSM7, 160, 1))
+        self.assertEqual(count_segments("a" * 161), SegmentInfo(GSM7, 161, 2))
+        self.assertEqual(count_segments("a" * 306), SegmentInfo(GSM7, 306, 2))
+        self.assertEqual(count_segments("a" * 307), SegmentInfo(GSM7, 307, 3))
+
+    def test_gsm7_extended(self):
+        self.assertEqual(count_segments("€" * 80), SegmentInfo(GSM7, 160, 1))
+        self.assertEqual(count_segments("{}" * 41), SegmentInfo(GSM7, 164, 2))
+        # the escape and its character are not split between two parts
+        self.assertEqual(count_segments("a" * 152 + "€" + "a" * 152), SegmentInfo(GSM7, 306, 3))
+
+    def test_ucs2(self):
+        self.assertEqual(count_segments("Привет"), SegmentInfo(UCS2, 6, 1))
+        self.assertEqual(count_segments("я" * 70), SegmentInfo(UCS2, 70, 1))
+        self.assertEqual(count_segments("я" * 71), SegmentInfo(UCS2, 71, 2))
+        self.assertEqual(count_segments("a" * 159 + "ё"), SegmentInfo(UCS2, 160, 3))
+        self.assertEqual(count_segments("😀" * 35), SegmentInfo(UCS2, 70, 1))
+        # a surrogate pair is not split between two parts
+        self.assertEqual(count_segments("я" * 66 + "😀" + "я" * 66), SegmentInfo(UCS2, 134, 3))
+
+
+class TestTransliterate(unittest.TestCase):
+    def test_transliterate(self):
+        self.assertEqual(transliterate("Заказ №5 «готов» — Щука, Ёж и Юля"), 'Zakaz N5 "gotov" - Schuka, Ezh i Yulya')
+        self.assertEqual(transliterate("объявление\u00a0съезд"), "obyavlenie sezd")
+        self.assertEqual(transliterate("Hello 😀"), "Hello 😀")
+
+
+class TestAnalyzeText(unittest.TestCase):
+    def test_gsm7(self):
+        self.assertEqual(analyze_text(""), TextAnalysis(GSM7, 0, 0, 0, "", [], None))
+        self.assertEqual(analyze_text("Hi {name}"), TextAnalysis(GSM7, 11, 1, 2, "", [(0, 9)], None))
+        self.assertEqual(analyze_text("a" * 307).boundaries, [(0, 153), (153, 306), (306, 307)])
+        analysis = analyze_text("a" * 152 + "€" + "a" * 152, suggest=True)
+        self.assertEqual(analysis.boundaries, [(0, 152), (152, 304), (304, 305)])
+        self.assertIsNone(analysis.suggestion)
+
+    def test_ucs2(self):
+        analysis = analyze_text("Привет, мир! " * 6, suggest=True)
+        self.assertEqual((analysis.encoding, analysis.units, analysis.segments), (UCS2, 78, 2))
+        self.assertEqual(analysis.non_gsm, "Приветм")
+        self.assertEqual(analysis.boundaries, [(0, 67), (67, 78)])
+        self.assertEqual(analysis.suggestion, "Privet, mir! " * 6)
+        self.assertEqual(analyze_text("😀" * 36).boundaries, [(0, 33), (33, 36)])
+
+    def test_no_suggestion(self):
+        # the same number of parts
+        self.assertIsNone(analyze_text("Привет", suggest=True).suggestion)
+        # still UCS-2
+        self.assertIsNone(analyze_text("Привет 😀 " * 10, suggest=True).suggestion)
+        self.assertIsNone(analyze_text("Привет, мир! " * 6).suggestion)
+
+    def test_smsaero(self):
+        self.assertEqual(SmsAero.analyze_text("Привет" * 20, suggest=True).suggestion, "Privet" * 20)
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+        self.assertEqual(smsaero.analyze_text("Hello").segments, 1)
+        with self.assertRaises(TypeError):
+            smsaero.analyze_text(None)
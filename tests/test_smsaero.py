@@ -1,12 +1,20 @@
+import contextvars
 import datetime
+import gc
+import threading
 import time
 import unittest
 
 from unittest.mock import patch, MagicMock
 
 from requests.exceptions import SSLError, ConnectionError
+from urllib3.exceptions import MaxRetryError, NewConnectionError
 
-from smsaero import SmsAero, SmsAeroException, SmsAeroNoMoneyException, SmsAeroConnectionException
+import requests
+
+from smsaero import transport
+
+from smsaero import SmsAero, SmsAeroException, SmsAeroNoMoneyException, SmsAeroConnectionException, RequestResult
 
 from . import DEFAULT_RESPONSE
 
@@ -28,6 +36,11 @@ class TestSmsAero(unittest.TestCase):
         result = smsaero.get_gate_urls()
         self.assertEqual(result, SmsAero.GATE_URLS)
 
+    def test_get_timeout(self):
+        self.assertEqual(self.smsaero.get_timeout(), 15)
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", timeout=30)
+        self.assertEqual(smsaero.get_timeout(), 30)
+
     def test_check_and_format_user_gate_with_at_prefix(self):
         smsaero = SmsAero(
             "admin@smsaero.ru",
@@ -117,6 +130,12 @@ class TestSmsAero(unittest.TestCase):
 
         self.assertEqual(str(context.exception), "Unexpected format is received")
 
+    def test_check_content_not_an_object(self):
+        for content in (None, [], "ok"):
+            with self.assertRaises(SmsAeroException) as context:
+                SmsAero.check_content(content)
+            self.assertEqual(str(context.exception), "Unexpected format is received")
+
     @patch("requests.Session.post")
     def test_check_response_not_success(self, mock_post):
         mock_response = MagicMock()
@@ -172,6 +191,97 @@ class TestSmsAero(unittest.TestCase):
 
         self.assertEqual(result, DEFAULT_RESPONSE)
 
+    def test_get_response_without_request(self):
+        with self.assertRaises(SmsAeroException) as context:
+            self.smsaero.get_response()
+        self.assertEqual(str(context.exception), "No response received")
+
+    @patch("requests.Session.post")
+    def test_get_response_after_reject(self, mock_post):
+        mock_post.return_value.json.return_value = {"result": "reject", "reason": "test reason"}
+        mock_post.return_value.status_code = 400
+
+        with self.assertRaises(SmsAeroException):
+            self.smsaero.balance()
+
+        self.assertEqual(self.smsaero.get_response(), {"result": "reject", "reason": "test reason"})
+        self.assertEqual(self.smsaero.get_last_result().status_code, 400)
+
+    @patch("requests.Session.post")
+    def test_get_last_result(self, mock_post):
+        mock_post.side_effect = [ConnectionError, MagicMock(status_code=200, json=MagicMock(return_value=DEFAULT_RESPONSE))]
+
+        self.smsaero.balance()
+        result = self.smsaero.get_last_result()
+
+        self.assertIsInstance(result, RequestResult)
+        self.assertEqual(result.content, DEFAULT_RESPONSE)
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.gate, "@gate.smsaero.org/v2/")
+        self.assertGreaterEqual(result.latency, 0)
+
+    @patch("requests.Session.post")
+    def test_get_response_is_thread_local(self, mock_post):
+        barrier = threading.Barrier(2, timeout=5)
+        responses = {}
+
+        def post(url, json, timeout):
+            barrier.wait()
+            return MagicMock(status_code=200, json=MagicMock(return_value={"success": True, "data": json}))
+
+        def worker(name):
+            self.smsaero.request("balance", {"name": name})
+            barrier.wait()
+            responses[name] = self.smsaero.get_response()
+
+        mock_post.side_effect = post
+        threads = [threading.Thread(target=worker, args=(name,)) for name in ("first", "second")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(responses["first"]["data"], {"name": "first"})
+        self.assertEqual(responses["second"]["data"], {"name": "second"})
+        with self.assertRaises(SmsAeroException):
+            self.smsaero.get_response()
+
+    @patch("requests.Session.post")
+    def test_last_result_is_dropped_with_client(self, mock_post):
+        mock_post.return_value.json.return_value = DEFAULT_RESPONSE
+
+        def run():
+            for _ in range(20):
+                smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+                smsaero.sms_list()
+                self.assertEqual(smsaero.get_last_result().content, DEFAULT_RESPONSE)
+            self.smsaero.sms_list()
+            del smsaero
+            gc.collect()
+            return list(transport._LAST_RESULTS.get().keys())
+
+        self.assertEqual(contextvars.copy_context().run(run), [self.smsaero])
+
+    @patch("requests.Session.post")
+    def test_request_decodes_response_once(self, mock_post):
+        mock_post.return_value.json.return_value = DEFAULT_RESPONSE
+
+        with self.assertLogs("smsaero", level="DEBUG"):
+            self.smsaero.request("sms/list")
+        self.smsaero.get_response()
+        self.smsaero.get_last_result()
+
+        mock_post.return_value.json.assert_called_once_with()
+
+    @patch("requests.Session.post")
+    def test_request_invalid_json_tries_next_gate(self, mock_post):
+        invalid = requests.Response()
+        invalid._content = b"<html>Bad Gateway</html>"
+        mock_post.side_effect = [invalid, MagicMock(json=MagicMock(return_value=DEFAULT_RESPONSE))]
+
+        self.assertEqual(self.smsaero.request("balance"), False)
+        self.assertEqual(self.smsaero.get_last_result().gate, "@gate.smsaero.org/v2/")
+
     @patch("requests.Session.post")
     def test_request_success(self, mock_post):
         mock_response = MagicMock()
@@ -208,7 +318,7 @@ class TestSmsAero(unittest.TestCase):
 
     @patch("requests.Session.post")
     def test_request_connection_error(self, mock_post):
-        mock_post.side_effect = ConnectionError
+        mock_post.side_effect = ConnectionError(MaxRetryError(None, "/", NewConnectionError(None, "refused")))
 
         with self.assertRaises(SmsAeroConnectionException):
             self.smsaero.request("sms/send", {"number": 79031234567, "text": "test message"})
@@ -0,0 +1,160 @@
+import threading
+import time
+import unittest
+
+from unittest.mock import MagicMock
+
+from smsaero import SmsAeroException, StatusEvent, StatusTracker
+
+from . import FakeClock
+
+
+def make_smsaero(timeline, sent_at=1_000_000):
+    # timeline: sms_id -> [(seconds after sending, status), ...]
+    smsaero = MagicMock()
+
+    def sms_status(sms_id):
+        now = smsaero.clock()
+        status = None
+        for at, value in timeline[sms_id]:
+            if now - sent_at >= at:
+                status = value
+        if status is None:
+            raise SmsAeroException("not found")
+        return {"id": sms_id, "status": status, "extendStatus": f"status {status}", "dateSend": sent_at}
+
+    smsaero.sms_status.side_effect = sms_status
+    return smsaero
+
+
+class TestStatusTracker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def make_tracker(self, smsaero, **kwargs):
+        smsaero.clock = self.clock
+        return StatusTracker(smsaero, clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_init_validate(self):
+        with self.assertRaises(ValueError):
+            StatusTracker(MagicMock(), concurrency=0)
+        with self.assertRaises(ValueError):
+            StatusTracker(MagicMock(), min_interval=10, max_interval=5)
+        with self.assertRaises(ValueError):
+            StatusTracker(MagicMock(), factor=0)
+
+    def test_interval_grows_with_age(self):
+        tracker = StatusTracker(MagicMock())
+        self.assertEqual(tracker.get_interval(0), 5.0)
+        self.assertEqual(tracker.get_interval(400), 100.0)
+        self.assertEqual(tracker.get_interval(86400), 600.0)
+
+    def test_events_until_terminal(self):
+        smsaero = make_smsaero({1: [(0, 0), (30, 3), (100, 1)], 2: [(0, 0), (3000, 2)], 3: [(10, 8), (20, 6)]})
+        tracker = self.make_tracker(smsaero)
+        for sms_id in (1, 2, 3):
+            tracker.add(sms_id, 1_000_000)
+        tracker.add(1)
+
+        events = list(tracker.events())
+        self.assertEqual(tracker.get_pending(), 0)
+        self.assertEqual(
+            [(event.sms_id, event.previous, event.status, event.terminal) for event in events],
+            [
+                (1, None, 0, False),
+                (2, None, 0, False),
+                (3, None, 8, False),
+                (3, 8, 6, True),
+                (1, 0, 3, False),
+                (1, 3, 1, True),
+                (2, 0, 2, True),
+            ],
+        )
+        self.assertIsInstance(events[0], StatusEvent)
+        self.assertEqual(events[-1].extend_status, "status 2")
+        # message 3 was not found by the first poll
+        self.assertEqual(tracker.get_errors(), 1)
+        # far fewer requests than polling every message every 5 seconds for 50 minutes
+        self.assertLess(tracker.get_polls(), 50)
+        self.assertEqual(smsaero.sms_status.call_count, tracker.get_polls())
+
+    def test_old_message_is_polled_at_once(self):
+        smsaero = make_smsaero({1: [(0, 1)]}, sent_at=1_000_000 - 3600)
+        tracker = self.make_tracker(smsaero)
+        tracker.add(1, 1_000_000 - 3600)
+        self.assertEqual(tracker.get_next_poll(), 1_000_000)
+        self.assertEqual([event.status for event in tracker.poll()], [1])
+
+    def test_remove(self):
+        smsaero = make_smsaero({1: [(0, 0)], 2: [(0, 1)]})
+        tracker = self.make_tracker(smsaero)
+        tracker.add(1)
+        tracker.add(2)
+        tracker.remove(1)
+        tracker.remove(3)
+        self.assertEqual([event.sms_id for event in tracker.events()], [2])
+        self.assertIsNone(tracker.get_next_poll())
+
+    def test_removed_while_polling(self):
+        smsaero = make_smsaero({1: [(0, 0)]})
+        tracker = self.make_tracker(smsaero)
+
+        def sms_status(sms_id):
+            tracker.remove(sms_id)
+            return {"id": sms_id, "status": 0}
+
+        smsaero.sms_status.side_effect = sms_status
+        tracker.add(1)
+        self.clock.sleep(5)
+        self.assertEqual(tracker.poll(), [])
+        self.assertEqual(tracker.get_pending(), 0)
+
+    def test_stop(self):
+        smsaero = make_smsaero({1: [(0, 0)]})
+        tracker = self.make_tracker(smsaero)
+        stop = threading.Event()
+        tracker.add(1, self.clock() - 5)
+        events = tracker.events(stop)
+        self.assertEqual(next(events).status, 0)
+        stop.set()
+        self.assertEqual(list(events), [])
+        self.assertEqual(tracker.get_pending(), 1)
+
+    def test_stop_while_waiting(self):
+        tracker = StatusTracker(make_smsaero({1: [(0, 1)]}), min_interval=60)
+        tracker.add(1)
+        stop = threading.Event()
+        timer = threading.Timer(0.05, stop.set)
+        timer.start()
+        self.assertEqual(list(tracker.events(stop)), [])
+        timer.join()
+
+    def test_add_wakes_the_wait(self):
+        smsaero = MagicMock()
+        smsaero.sms_status.side_effect = lambda sms_id: {"id": sms_id, "status": 1}
+        tracker = StatusTracker(smsaero, min_interval=60)
+        tracker.add(1)
+        # the message sent an hour ago is due at once, long before the first one
+        timer = threading.Timer(0.05, tracker.add, (2, time.time() - 3600))
+        timer.start()
+        started = time.monotonic()
+        for event in tracker.events():
+            self.assertEqual(event.sms_id, 2)
+            tracker.remove(1)
+        timer.join()
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(tracker.get_pending(), 0)
+
+    def test_waits_for_messages_until_stop(self):
+        smsaero = MagicMock()
+        smsaero.sms_status.side_effect = lambda sms_id: {"id": sms_id, "status": 1}
+        tracker = StatusTracker(smsaero)
+        stop = threading.Event()
+        timer = threading.Timer(0.05, tracker.add, (1, time.time() - 3600))
+        timer.start()
+        events = []
+        for event in tracker.events(stop):
+            events.append(event.sms_id)
+            stop.set()
+        timer.join()
+        self.assertEqual(events, [1])
@@ -0,0 +1,94 @@
+import socket
+import unittest
+
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from requests.adapters import HTTPAdapter
+
+from smsaero import SmsAero
+from smsaero.transport import KeepAliveAdapter
+
+from . import DEFAULT_RESPONSE
+
+
+URL_PREFIX = "https://admin%40smsaero.ru:test_api_key_lX8APMlgliHvkHk04i7@"
+
+
+class TestSmsAeroTransport(unittest.TestCase):
+    def test_default_session_mounts_adapter_per_gate(self):
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+        session = smsaero.get_session()
+
+        adapters = {
+            session.get_adapter(smsaero.build_url(proto, "sms/send", gate))
+            for gate in SmsAero.GATE_URLS
+            for proto in ("https", "http")
+        }
+        self.assertEqual(len(adapters), 6)
+        self.assertTrue(all(isinstance(adapter, KeepAliveAdapter) for adapter in adapters))
+        self.assertEqual(session.headers["User-Agent"], SmsAero.USER_AGENT)
+        self.assertEqual(session.headers["Connection"], "keep-alive")
+
+    def test_session_is_built_once_on_first_use(self):
+        with patch("requests.session", wraps=requests.session) as session:
+            smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7")
+            session.assert_not_called()
+            self.assertIs(smsaero.get_session(), smsaero.get_session())
+        session.assert_called_once_with()
+
+    def test_close_closes_the_built_session(self):
+        with SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7") as smsaero:
+            session = smsaero.get_session()
+            with patch.object(session, "close", wraps=session.close) as close:
+                smsaero.close()
+        close.assert_called_once_with()
+        self.assertIsNot(smsaero.get_session(), session)
+
+    def test_close_keeps_the_injected_session(self):
+        session = MagicMock(spec=requests.Session, headers={})
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", session=session)
+        smsaero.close()
+        session.close.assert_not_called()
+        self.assertIs(smsaero.get_session(), session)
+
+    def test_pool_options(self):
+        smsaero = SmsAero(
+            "admin@smsaero.ru",
+            "test_api_key_lX8APMlgliHvkHk04i7",
+            pool_connections=2,
+            pool_maxsize=200,
+            pool_block=True,
+        )
+        adapter = smsaero.get_session().get_adapter(URL_PREFIX + "gate.smsaero.org/v2/sms/send")
+
+        self.assertEqual(adapter.poolmanager.connection_pool_kw["maxsize"], 200)
+        self.assertTrue(adapter.poolmanager.connection_pool_kw["block"])
+        self.assertIn((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1), adapter.poolmanager.connection_pool_kw["socket_options"])
+
+    def test_user_gate_adapter(self):
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", url_gate="@local.host/v2/")
+        adapter = smsaero.get_session().get_adapter(URL_PREFIX + "local.host/v2/sms/send")
+        self.assertIsInstance(adapter, KeepAliveAdapter)
+        self.assertNotIsInstance(smsaero.get_session().get_adapter(URL_PREFIX + "gate.smsaero.ru/v2/"), KeepAliveAdapter)
+
+    def test_without_keep_alive(self):
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", keep_alive=False)
+        session = smsaero.get_session()
+        adapter = session.get_adapter(URL_PREFIX + "gate.smsaero.ru/v2/sms/send")
+
+        self.assertIs(type(adapter), HTTPAdapter)
+        self.assertEqual(session.headers["Connection"], "close")
+
+    def test_injected_session(self):
+        session = requests.Session()
+        session.post = MagicMock()
+        session.post.return_value.json.return_value = DEFAULT_RESPONSE
+
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", session=session)
+        self.assertIs(smsaero.get_session(), session)
+        self.assertEqual(session.headers["User-Agent"], SmsAero.USER_AGENT)
+
+        self.assertEqual(smsaero.balance(), False)
+        session.post.assert_called_once_with(URL_PREFIX + "gate.smsaero.ru/v2/balance", json={}, timeout=15)
@@ -0,0 +1,151 @@
+import unittest
+
+from array import array
+
+from unittest.mock import patch, MagicMock
+
+from smsaero import ClientOptions, SmsAero, PhoneValidationCache, Reject, ValidationReport
+from smsaero.validation import INVALID, UNPARSABLE, VALID, CacheInfo, check_number, number_verdict, validate_numbers
+from smsaero.validation import _verdict_chunk
+
+from . import DEFAULT_RESPONSE
+
+
+class TestNumberVerdict(unittest.TestCase):
+    def test_verdicts(self):
+        self.assertEqual(number_verdict(79031234567), VALID)
+        self.assertEqual(number_verdict(70000000001), INVALID)
+        self.assertEqual(number_verdict("invalid_number"), UNPARSABLE)
+
+
+class TestPhoneValidationCache(unittest.TestCase):
+    def test_init_validate(self):
+        with self.assertRaises(ValueError):
+            PhoneValidationCache(maxsize=0)
+        with self.assertRaises(ValueError):
+            PhoneValidationCache(maxsize="10")
+
+    def test_hits_and_misses(self):
+        cache = PhoneValidationCache(maxsize=10)
+        self.assertEqual(cache.verdict(79031234567), VALID)
+        self.assertEqual(cache.verdict(79031234567), VALID)
+        self.assertEqual(cache.verdict(70000000001), INVALID)
+        self.assertEqual(cache.get_info(), CacheInfo(hits=1, misses=2, maxsize=10, size=2))
+
+        cache.clear()
+        self.assertEqual(cache.get_info(), CacheInfo(hits=0, misses=0, maxsize=10, size=0))
+
+    def test_least_recently_used_is_evicted(self):
+        with patch("smsaero.validation.number_verdict", return_value=VALID) as verdict:
+            cache = PhoneValidationCache(maxsize=2)
+            cache.verdict(79031234567)
+            cache.verdict(79038805678)
+            cache.verdict(79031234567)
+            cache.verdict(79038805679)
+            cache.verdict(79031234567)
+            cache.verdict(79038805678)
+
+        self.assertEqual(
+            [call[0][0] for call in verdict.call_args_list], [79031234567, 79038805678, 79038805679, 79038805678]
+        )
+        self.assertEqual(cache.get_info().size, 2)
+
+    def test_only_integers_are_cached(self):
+        cache = PhoneValidationCache()
+        self.assertEqual(cache.verdict("invalid_number"), UNPARSABLE)
+        self.assertEqual(cache.verdict(True), UNPARSABLE)
+        self.assertEqual(cache.get_info().size, 0)
+
+
+class TestSmsAeroPhoneCache(unittest.TestCase):
+    def test_phone_cache_type(self):
+        with self.assertRaises(TypeError):
+            ClientOptions(phone_cache={})
+
+    @patch("requests.Session.post")
+    def test_cache_is_shared_by_methods(self, mock_post):
+        mock_post.return_value = MagicMock(json=MagicMock(return_value=DEFAULT_RESPONSE))
+        cache = PhoneValidationCache()
+        smsaero = SmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(phone_cache=cache)
+        )
+
+        smsaero.send_sms([79031234567, 79038805678], "test message")
+        smsaero.send_sms(79031234567, "test message")
+        smsaero.sms_list(number=79038805678)
+        with self.assertRaises(ValueError) as context:
+            smsaero.send_sms(70000000001, "test message")
+        self.assertEqual(str(context.exception), "Number must be a valid phone number")
+        with self.assertRaises(ValueError):
+            smsaero.send_sms(70000000001, "test message")
+
+        self.assertIs(smsaero.get_options().get_phone_cache(), cache)
+        self.assertEqual(cache.get_info()[:2], (3, 3))
+
+
+NUMBERS = [79031234567, "79038805678", 123, 70000000001, 79038805678, None, -79031234567, 10**15]
+
+
+class TestValidateNumbers(unittest.TestCase):
+    def test_init_validate(self):
+        with self.assertRaises(ValueError):
+            validate_numbers([], processes=0)
+        with self.assertRaises(ValueError):
+            validate_numbers([], chunk_size=0)
+
+    def test_check_number(self):
+        self.assertIsNone(check_number(79031234567))
+        self.assertEqual(check_number("79031234567"), "Type of number must be integer")
+        self.assertEqual(check_number(123456), "Length of number must be between 7 and 15")
+        self.assertEqual(check_number(123456789012345), "Number must be a valid phone number")
+        self.assertIsNone(check_number(70000000001, None))
+
+    def test_every_reject_is_reported(self):
+        report = validate_numbers(iter(NUMBERS))
+
+        self.assertFalse(report.ok)
+        self.assertEqual(report.valid, [79031234567, 79038805678])
+        self.assertEqual(
+            report.rejects,
+            [
+                Reject(1, "79038805678", "Type of number must be integer"),
+                Reject(2, 123, "Length of number must be between 7 and 15"),
+                Reject(3, 70000000001, "Number must be a valid phone number"),
+                Reject(5, None, "Type of number must be integer"),
+                Reject(6, -79031234567, "Length of number must be between 7 and 15"),
+                Reject(7, 10**15, "Length of number must be between 7 and 15"),
+            ],
+        )
+        self.assertTrue(validate_numbers([79031234567]).ok)
+
+    def test_worker_answers_one_byte_per_number(self):
+        numbers = array("q", [79031234567, 70000000001, 79038805678])
+        self.assertEqual(_verdict_chunk(numbers, number_verdict), b"\x01\x00\x01")
+
+    def test_processes_keep_input_order(self):
+        numbers = NUMBERS * 5
+        self.assertEqual(validate_numbers(numbers, processes=2, chunk_size=3), validate_numbers(numbers))
+
+
+class TestSmsAeroValidateNumbers(unittest.TestCase):
+    def test_validate_numbers(self):
+        cache = PhoneValidationCache()
+        smsaero = SmsAero(
+            "admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", options=ClientOptions(phone_cache=cache)
+        )
+
+        report = smsaero.validate_numbers([79031234567, 70000000001, 79031234567])
+        self.assertEqual(report.valid, [79031234567, 79031234567])
+        self.assertEqual([reject.position for reject in report.rejects], [1])
+        self.assertEqual(cache.get_info()[:2], (1, 2))
+
+        report = smsaero.validate_numbers([79031234567, 70000000001], processes=2)
+        self.assertEqual([reject.position for reject in report.rejects], [1])
+
+    def test_validate_numbers_without_phonenumbers(self):
+        smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", allow_phone_validation=False)
+        report = smsaero.validate_numbers([79031234567, 70000000001, 123])
+        self.assertEqual(
+            report,
+            ValidationReport([79031234567, 70000000001], [Reject(2, 123, "Length of number must be between 7 and 15")]),
+        )
@@ -31,6 +31,21 @@ class TestSmsAeroValidators(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.smsaero.send_sms_validate(number=[123, 1234567890123456], text="Test message")
 
+    def test_send_sms_bulk_validate(self):
+        self.smsaero.send_sms_bulk_validate("test text", chunk_size=1, concurrency=1)
+        with self.assertRaises(TypeError):
+            self.smsaero.send_sms_bulk_validate(123)
+        with self.assertRaises(ValueError):
+            self.smsaero.send_sms_bulk_validate("test text", callback_url="invalid_url")
+        with self.assertRaises(TypeError):
+            self.smsaero.send_sms_bulk_validate("test text", chunk_size="50")
+        with self.assertRaises(ValueError):
+            self.smsaero.send_sms_bulk_validate("test text", chunk_size=0)
+        with self.assertRaises(TypeError):
+            self.smsaero.send_sms_bulk_validate("test text", concurrency=1.5)
+        with self.assertRaises(ValueError):
+            self.smsaero.send_sms_bulk_validate("test text", concurrency=-1)
+
     def test_send_sms_validate_without_phonenumbers(self):
         smsaero = SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", allow_phone_validation=False)
         smsaero.send_sms_validate(number=[70000000000], text="Test message")
@@ -463,6 +478,25 @@ class TestSmsAeroValidators(unittest.TestCase):
                 False,
             )
 
+    def test_pool_validate(self):
+        self.smsaero.pool_validate(None, 1, 1, True, False)
+        with self.assertRaises(TypeError):
+            self.smsaero.pool_validate(session="invalid_session")
+        with self.assertRaises(TypeError):
+            self.smsaero.pool_validate(pool_connections="10")
+        with self.assertRaises(ValueError):
+            self.smsaero.pool_validate(pool_connections=0)
+        with self.assertRaises(TypeError):
+            self.smsaero.pool_validate(pool_maxsize=None)
+        with self.assertRaises(ValueError):
+            self.smsaero.pool_validate(pool_maxsize=-1)
+        with self.assertRaises(TypeError):
+            self.smsaero.pool_validate(pool_block=1)
+        with self.assertRaises(TypeError):
+            self.smsaero.pool_validate(keep_alive="yes")
+        with self.assertRaises(ValueError):
+            SmsAero("admin@smsaero.ru", "test_api_key_lX8APMlgliHvkHk04i7", pool_maxsize=0)
+
     def test_send_telegram_validate(self):
         with self.assertRaises(TypeError):
             self.smsaero.send_telegram_validate("invalid_number", 1234)